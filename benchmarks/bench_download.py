@@ -0,0 +1,45 @@
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bench_utils import make_config
+from src.configuration.download_requests_parser import DownloadRequestsParser
+from src.data_downloader import DataDownloader
+from src.file_manager import FileManager
+from src.normalization_tracker import NormalizationTracker
+from src.providers.fake_client import FakeClient
+
+
+def run(tickers: int = 20, days: int = 30, granularity: str = '5M', latency_seconds: float = 0.01, failure_rate: float = 0.0, storage_backend: str = 'csv') -> dict:
+    """Times one full DataDownloader.run() cycle against the fake provider with unlimited pacing, then a second no-op cycle"""
+    starting_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    download_requests = [{'provider': 'fake', 'name': 'bench', 'starting_date': starting_date, 'granularities': [granularity],
+                          'tickers': [f"T{i:04d}" for i in range(tickers)]}]
+    with tempfile.TemporaryDirectory() as base_dir:
+        config = make_config(base_dir, download_requests, Storage={'backend': storage_backend},
+                             Fake={'latency_seconds': latency_seconds, 'failure_rate': failure_rate})
+        config.pacing['fake'] = {'max_concurrent_requests': 8, 'requests_per_window': 1000000, 'window_seconds': 1, 'identical_request_cooldown_seconds': 0,
+                                 'contract_requests_per_window': 1000000, 'contract_window_seconds': 1}
+        file_manager = FileManager(config)
+        downloader = DataDownloader({'fake': FakeClient(config)}, file_manager, DownloadRequestsParser(config), config,
+                                    {('fake', 'TRADES'): NormalizationTracker(config.processed_data_dir, 'fake', 'TRADES')})
+        units = downloader._plan_requests(download_requests)
+        started = time.perf_counter()
+        asyncio.run(downloader.run())
+        cycle_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        asyncio.run(downloader.run())
+        noop_cycle_seconds = time.perf_counter() - started
+        statuses = [status for dates in file_manager.status_store.index.values() for status in dates.values()]
+        downloader.write_pipeline.close()
+    completed = statuses.count('completed')
+    return {'tickers': tickers, 'days': days, 'granularity': granularity, 'storage_backend': storage_backend, 'latency_seconds': latency_seconds,
+            'units': len(units), 'dates_completed': completed, 'dates_failed': statuses.count('corrupted'),
+            'cycle_seconds': cycle_seconds, 'units_per_second': len(units) / cycle_seconds, 'dates_per_second': completed / cycle_seconds,
+            'noop_cycle_seconds': noop_cycle_seconds}
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,59 @@
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from bench_utils import make_config
+from src.file_manager import FileManager
+from src.providers.fake_client import FakeClient
+from src.write_pipeline import WritePipeline
+
+
+def get_tree_bytes(config) -> int:
+    """Returns bytes stored under the raw and processed data directories"""
+    return sum(path.stat().st_size for root in [config.raw_data_dir, config.processed_data_dir]
+               for path in Path(root).rglob('*') if path.is_file() and path.name != 'status.log')
+
+
+def run(files: int = 200, granularity: str = '1M', storage_backend: str = 'csv', write_workers: int = 4, tickers: int = 8) -> dict:
+    """Times FileManager.commit_data for files dates of synthetic bars spread over tickers, serially and through the write pipeline"""
+    days = [datetime(2024, 1, 1) + timedelta(days=i) for i in range(files * 2)]
+    days = [day for day in days if day.weekday() < 5][:files]
+    results = {'files': len(days), 'granularity': granularity, 'storage_backend': storage_backend, 'write_workers': write_workers}
+    with tempfile.TemporaryDirectory() as base_dir:
+        config = make_config(base_dir, Storage={'backend': storage_backend})
+        fake = FakeClient(config)
+        frames = [(f"T{i % tickers:02d}", f"{day:%Y-%m-%d}", pd.DataFrame(fake._make_day('BENCH', day, fake._get_bar_seconds(granularity)))) for i, day in enumerate(days)]
+        results['bars_per_file'] = len(frames[0][2])
+        for mode in ['serial', 'pipeline']:
+            file_manager = FileManager(config)
+            started = time.perf_counter()
+            if mode == 'serial':
+                for ticker, date_str, frame in frames:
+                    file_manager.commit_data(f"{mode}-{ticker}", granularity, date_str, 'TRADES', 'fake', frame, frame)
+            else:
+                asyncio.run(commit_all(file_manager, mode, granularity, frames, write_workers))
+            seconds = time.perf_counter() - started
+            file_manager.status_store.close()
+            results[f'{mode}_seconds'] = seconds
+            results[f'{mode}_files_per_second'] = len(frames) / seconds
+        results['megabytes_written'] = get_tree_bytes(config) / 2 ** 20
+        results['megabytes_per_second'] = results['megabytes_written'] / (results['serial_seconds'] + results['pipeline_seconds'])
+    return results
+
+
+async def commit_all(file_manager: FileManager, prefix: str, granularity: str, frames: list, write_workers: int):
+    """Commits every (ticker, date_str, frame) through a WritePipeline and waits for all writes"""
+    pipeline = WritePipeline(write_workers, write_workers * 4)
+    for ticker, date_str, frame in frames:
+        await pipeline.submit(file_manager.commit_data, f"{prefix}-{ticker}", granularity, date_str, 'TRADES', 'fake', frame, frame)
+    await pipeline.drain()
+    pipeline.close()
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,82 @@
+import json
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from ib_async import BarData
+
+from bench_utils import best_of
+from src.providers.ibkr_client import IBKRClient
+from src.providers.saxo_client import SaxoClient
+
+
+def make_ibkr_bars(count: int = 23400) -> list[BarData]:
+    """Returns count synthetic 1-second ib_async bars (one regular trading session)"""
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 2, 14, 30, tzinfo=timezone.utc)
+    closes = 100 + np.cumsum(rng.normal(0, 0.05, count))
+    return [BarData(date=start + timedelta(seconds=i), open=float(closes[i]), high=float(closes[i]) + 0.02, low=float(closes[i]) - 0.02, close=float(closes[i]),
+                    volume=float(rng.integers(0, 500)), average=float(closes[i]), barCount=int(rng.integers(0, 20))) for i in range(count)]
+
+
+def make_saxo_bars(count: int = 23400) -> list[dict]:
+    """Returns count synthetic 1-second Saxo chart bars as decoded from the JSON response"""
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 2, 14, 30)
+    bids = 100 + np.cumsum(rng.normal(0, 0.05, count))
+    return [{'Time': (start + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%S.000000Z'), 'OpenBid': float(bids[i]), 'OpenAsk': float(bids[i]) + 0.01,
+             'HighBid': float(bids[i]) + 0.02, 'HighAsk': float(bids[i]) + 0.03, 'LowBid': float(bids[i]) - 0.02, 'LowAsk': float(bids[i]) - 0.01,
+             'CloseBid': float(bids[i]), 'CloseAsk': float(bids[i]) + 0.01} for i in range(count)]
+
+
+def ibkr_per_bar(bars: list[BarData]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Previous IBKR path kept as the baseline: a dict per bar, then one DataFrame for normalization and one for the CSV writer"""
+    data = [{'date': bar.date, 'open': bar.open, 'high': bar.high, 'low': bar.low, 'close': bar.close, 'volume': bar.volume,
+             'average': bar.average, 'barCount': bar.barCount} for bar in bars]
+    return pd.DataFrame(data), pd.DataFrame(data)
+
+
+def saxo_per_bar(bars: list[dict]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Previous Saxo path kept as the baseline: fromisoformat and mid-price arithmetic per bar, then two DataFrames like ibkr_per_bar"""
+    data = [{'date': datetime.fromisoformat(bar['Time'].replace('Z', '+00:00')), 'open': (bar['OpenBid'] + bar['OpenAsk']) / 2,
+             'high': (bar['HighBid'] + bar['HighAsk']) / 2, 'low': (bar['LowBid'] + bar['LowAsk']) / 2, 'close': (bar['CloseBid'] + bar['CloseAsk']) / 2,
+             'volume': 0, 'average': (bar['CloseBid'] + bar['CloseAsk']) / 2, 'barCount': 0} for bar in bars]
+    return pd.DataFrame(data), pd.DataFrame(data)
+
+
+def saxo_columnar(bars: list[dict]) -> pd.DataFrame:
+    """Columnar Saxo path of SaxoClient.fetch_historical_data after paging"""
+    frame = pd.DataFrame(bars)
+    frame['Time'] = pd.to_datetime(frame['Time'], utc=True, format='ISO8601')
+    return SaxoClient._convert_saxo_data(frame, 'TRADES')
+
+
+def measure(func) -> dict:
+    """Returns peak traced bytes and bytes still held by the result of one func() call, plus its best-of timing"""
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {'peak_bytes': peak, 'retained_bytes': retained, 'seconds': best_of(func)}
+
+
+def run(count: int = 23400) -> dict:
+    """Measures allocations and time of turning one session of 1-second bars into the frames handed to normalization and the writers"""
+    ibkr_bars = make_ibkr_bars(count)
+    saxo_bars = make_saxo_bars(count)
+    results = {'bars': count,
+               'ibkr_per_bar_dict': measure(lambda: ibkr_per_bar(ibkr_bars)),
+               'ibkr_columnar': measure(lambda: IBKRClient._bars_to_frame(ibkr_bars)),
+               'saxo_per_bar_dict': measure(lambda: saxo_per_bar(saxo_bars)),
+               'saxo_columnar': measure(lambda: saxo_columnar(saxo_bars))}
+    for provider in ('ibkr', 'saxo'):
+        baseline, columnar = results[f'{provider}_per_bar_dict'], results[f'{provider}_columnar']
+        results[f'{provider}_peak_reduction'] = baseline['peak_bytes'] / columnar['peak_bytes']
+        results[f'{provider}_speedup'] = baseline['seconds'] / columnar['seconds']
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,50 @@
+import json
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from bench_utils import best_of
+from src.normalization_tracker import NormalizationTracker
+
+
+def make_bars(count: int = 23400) -> list[dict]:
+    """Returns count synthetic 1-second bars (one regular trading session)"""
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 2, 9, 30)
+    closes = 100 + np.cumsum(rng.normal(0, 0.05, count))
+    return [{'date': start + timedelta(seconds=i), 'open': closes[i], 'high': closes[i] + 0.02, 'low': closes[i] - 0.02, 'close': closes[i],
+             'volume': int(rng.integers(0, 500)), 'average': closes[i], 'barCount': int(rng.integers(0, 20))} for i in range(count)]
+
+
+def normalize_per_bar(norm_data: dict, values: list[dict]) -> list[dict]:
+    """Previous per-bar implementation of NormalizationTracker.normalize_value, kept as the baseline"""
+    ret = []
+    for value in values:
+        normalized = {'date': value['date']}
+        normalized.update({k: value[k] / norm_data[k] * 2 - 1 for k in value.keys() if k != 'date'})
+        ret.append(normalized)
+    return ret
+
+
+def run(count: int = 23400) -> dict:
+    """Times per-bar dict normalization against the vectorized DataFrame and NumPy column paths"""
+    bars = make_bars(count)
+    frame = pd.DataFrame(bars)
+    columns = {col: frame[col].to_numpy() for col in frame.columns}
+    with tempfile.TemporaryDirectory() as base_dir:
+        tracker = NormalizationTracker(base_dir, 'bench', 'TRADES')
+        tracker.add_entry('BENCH', '1S', bars)
+        results = {'bars': count,
+                   'per_bar_dict_seconds': best_of(lambda: normalize_per_bar(tracker.data[('BENCH', '1S')], bars)),
+                   'list_wrapper_seconds': best_of(lambda: tracker.normalize_value('BENCH', '1S', bars)),
+                   'frame_seconds': best_of(lambda: tracker.normalize_frame('BENCH', '1S', frame)),
+                   'numpy_columns_seconds': best_of(lambda: tracker.normalize_frame('BENCH', '1S', columns))}
+    results['frame_speedup'] = results['per_bar_dict_seconds'] / results['frame_seconds']
+    results['numpy_columns_speedup'] = results['per_bar_dict_seconds'] / results['numpy_columns_seconds']
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
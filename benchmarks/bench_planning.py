@@ -0,0 +1,53 @@
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bench_utils import best_of, make_config
+from src.configuration.download_requests_parser import DownloadRequestsParser
+from src.data_downloader import DataDownloader
+from src.file_manager import FileManager
+from src.providers.fake_client import FakeClient
+from src.status_store import StatusStore
+
+
+def write_status_log(raw_data_dir: str, tickers: list[str], granularity: str, dates: list[str]) -> int:
+    """Writes a manifest marking every date of every ticker completed, except every 50th date left incomplete; returns line count"""
+    store = StatusStore(raw_data_dir)
+    lines = [store._format_line('fake', 'TRADES', granularity, ticker, date_str, 'incomplete' if i % 50 == 0 else 'completed')
+             for ticker in tickers for i, date_str in enumerate(dates)]
+    store.close()
+    with open(store.log_path, 'w') as f:
+        f.writelines(lines)
+    return len(lines)
+
+
+def run(tickers: int = 200, years: int = 5, granularity: str = '1M') -> dict:
+    """Times manifest load, date range generation, pending-date lookups and full planning over a large status tree"""
+    starting_date = (datetime.now() - timedelta(days=365 * years)).strftime('%Y-%m-%d')
+    ticker_names = [f"T{i:04d}" for i in range(tickers)]
+    download_requests = [{'provider': 'fake', 'name': 'bench', 'starting_date': starting_date, 'granularities': [granularity], 'tickers': ticker_names}]
+    with tempfile.TemporaryDirectory() as base_dir:
+        config = make_config(base_dir, download_requests)
+        planner = DataDownloader({}, None, None, config, {})
+        dates = planner._generate_date_ranges(granularity, starting_date, None, 'SMART')
+        entries = write_status_log(config.raw_data_dir, ticker_names, granularity, dates)
+        started = time.perf_counter()
+        file_manager = FileManager(config)
+        load_seconds = time.perf_counter() - started
+        downloader = DataDownloader({'fake': FakeClient(config)}, file_manager, DownloadRequestsParser(config), config, {})
+        results = {'tickers': tickers, 'dates_per_ticker': len(dates), 'status_entries': entries, 'status_load_seconds': load_seconds,
+                   'generate_date_ranges_seconds': best_of(lambda: downloader._generate_date_ranges(granularity, starting_date, None, 'SMART')),
+                   'pending_lookup_seconds': best_of(lambda: [file_manager.get_pending_dates(ticker, granularity, dates, 'TRADES', 'fake') for ticker in ticker_names])}
+        started = time.perf_counter()
+        units = downloader._plan_requests(download_requests)
+        results['first_plan_seconds'] = time.perf_counter() - started
+        results['first_plan_units'] = len(units)
+        results['watermarked_plan_seconds'] = best_of(lambda: downloader._plan_requests(download_requests))
+        file_manager.status_store.close()
+        downloader.write_pipeline.close()
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
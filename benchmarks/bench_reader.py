@@ -0,0 +1,59 @@
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from bench_utils import make_config
+from src.data_reader import DataReader
+from src.file_manager import FileManager
+from src.providers.fake_client import FakeClient
+from src.storage.compaction import Compactor
+
+
+def read_by_glob(raw_data_dir: str, granularity: str, ticker: str) -> pd.DataFrame:
+    """Previous consumer approach: glob the ticker's CSV files, concatenate them and parse the dates, kept as the baseline"""
+    files = sorted(Path(raw_data_dir, 'fake', 'TRADES', granularity).glob(f"{ticker}-*.csv"))
+    frame = pd.concat([pd.read_csv(file_path) for file_path in files], ignore_index=True)
+    frame['date'] = pd.to_datetime(frame['date'], utc=True)
+    return frame
+
+
+def run(days: int = 250, granularity: str = '1M') -> dict:
+    """Times DataReader.read over days stored dates, cold and cached, against glob-and-concat, then cold again once the days are compacted into segments"""
+    all_days = [datetime(2024, 1, 1) + timedelta(days=i) for i in range(days * 2)]
+    all_days = [day for day in all_days if day.weekday() < 5][:days]
+    with tempfile.TemporaryDirectory() as base_dir:
+        config = make_config(base_dir)
+        file_manager = FileManager(config)
+        fake = FakeClient(config)
+        for day in all_days:
+            frame = pd.DataFrame(fake._make_day('BENCH', day, fake._get_bar_seconds(granularity)))
+            file_manager.commit_data('BENCH', granularity, f"{day:%Y-%m-%d}", 'TRADES', 'fake', frame, frame)
+        start, end = f"{all_days[0]:%Y-%m-%d}", f"{all_days[-1]:%Y-%m-%d}"
+        reader = DataReader(config, file_manager)
+        started = time.perf_counter()
+        bars = len(read_by_glob(config.raw_data_dir, granularity, 'BENCH'))
+        glob_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        reader.read('fake', 'TRADES', granularity, 'BENCH', start, end)
+        cold_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        reader.read('fake', 'TRADES', granularity, 'BENCH', start, end)
+        cached_seconds = time.perf_counter() - started
+        Compactor(config, file_manager).compact(f"{all_days[-1] + timedelta(days=31):%Y-%m}")
+        reader.clear_cache()
+        started = time.perf_counter()
+        reader.read('fake', 'TRADES', granularity, 'BENCH', start, end)
+        compacted_seconds = time.perf_counter() - started
+        reader.close()
+        file_manager.status_store.close()
+    return {'dates': len(all_days), 'bars': bars, 'glob_concat_seconds': glob_seconds, 'reader_cold_seconds': cold_seconds,
+            'reader_cached_seconds': cached_seconds, 'reader_compacted_cold_seconds': compacted_seconds, 'cold_speedup': glob_seconds / cold_seconds,
+            'cached_speedup': glob_seconds / cached_seconds, 'compacted_cold_speedup': glob_seconds / compacted_seconds}
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
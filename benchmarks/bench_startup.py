@@ -0,0 +1,71 @@
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_utils import REPO_DIR, make_config
+
+# Runs main.py's startup up to the first connection attempt in a fresh interpreter and reports the time and heavy modules loaded
+STARTUP = '''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import main
+from src.configuration.config import Config
+from src.configuration.download_requests_parser import DownloadRequestsParser
+from src.file_manager import FileManager
+config = Config({config!r})
+FileManager(config)
+download_requests = DownloadRequestsParser(config).get_download_requests()
+{build}
+print(json.dumps({{'seconds': time.perf_counter() - started, 'modules': [name for name in ('ib_async', 'aiohttp', 'pyarrow') if name in sys.modules]}}))
+'''
+
+LAZY = '''
+from src.providers import registry
+registry.create_normalization_trackers(config, download_requests)
+registry.create_provider_clients(config, download_requests)
+'''
+
+# Previous main.py startup kept as the baseline: every provider client and all six trackers
+EAGER = '''
+from src.normalization_tracker import NormalizationTracker
+from src.providers.ibkr_client import IBKRClient
+from src.providers.saxo_client import SaxoClient
+from src.providers.fake_client import FakeClient
+for provider in ['ibkr', 'saxo', 'fake']:
+    for what_to_show in ['TRADES', 'BID_ASK']:
+        NormalizationTracker(config.processed_data_dir, provider, what_to_show)
+clients = {'ibkr': IBKRClient(config), 'saxo': SaxoClient(config), 'fake': FakeClient(config)}
+'''
+
+
+def measure(config_file: str, build: str, repeat: int = 5) -> dict:
+    """Returns the fastest of repeat cold starts in fresh interpreters: in-process startup seconds, process wall seconds and heavy modules loaded"""
+    code = STARTUP.format(repo=str(REPO_DIR), config=config_file, build=build)
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['process_seconds'] = time.perf_counter() - started
+        runs.append(result)
+    best = min(runs, key=lambda run: run['seconds'])
+    return {'seconds': best['seconds'], 'process_seconds': min(run['process_seconds'] for run in runs), 'modules': best['modules']}
+
+
+def run() -> dict:
+    """Times cold startup of a fake-provider-only setup with lazy registry construction against building every provider and tracker"""
+    download_requests = [{'provider': 'fake', 'name': 'bench', 'starting_date': '2024-01-01', 'granularities': ['1M'], 'tickers': ['AAA']}]
+    with tempfile.TemporaryDirectory() as base_dir:
+        make_config(base_dir, download_requests)
+        config_file = str(Path(base_dir) / 'config.ini')
+        results = {'lazy': measure(config_file, LAZY), 'eager': measure(config_file, EAGER)}
+    results['speedup'] = results['eager']['seconds'] / results['lazy']['seconds']
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,37 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+from src.configuration.config import Config
+
+
+def best_of(func, repeat: int = 5) -> float:
+    """Returns the fastest of repeat timings of func() in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def make_config(base_dir: str, download_requests: list[dict] = None, **sections) -> Config:
+    """Writes a config.ini (and download_requests.json) under base_dir pointing all data there; sections override {section: {key: value}}"""
+    base = Path(base_dir)
+    settings = {'IBKR': {'host': '127.0.0.1', 'port': '4002', 'client_id': ''},
+                'Paths': {'processed_data_dir': base / 'processed-data', 'raw_data_dir': base / 'raw-data',
+                          'download_requests_file': base / 'download_requests.json', 'trading_calendar_file': REPO_DIR / 'config' / 'trading_calendars.json'},
+                'Timing': {'connection_retry_seconds': 30, 'download_cycle_seconds': 1800, 'error_retry_seconds': 30},
+                'Workers': {'queue_file': base / 'work-queue.sqlite'},
+                'Fake': {'latency_seconds': 0}}
+    for section, values in sections.items():
+        settings.setdefault(section, {}).update(values)
+    with open(base / 'config.ini', 'w') as f:
+        for section, values in settings.items():
+            f.write(f"[{section}]\n" + ''.join(f"{key} = {value}\n" for key, value in values.items()) + "\n")
+    with open(base / 'download_requests.json', 'w') as f:
+        json.dump(download_requests or [], f)
+    return Config(str(base / 'config.ini'))
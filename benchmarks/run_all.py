@@ -0,0 +1,52 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import bench_download
+import bench_file_manager
+import bench_ingestion
+import bench_normalization
+import bench_planning
+import bench_reader
+import bench_startup
+from bench_utils import REPO_DIR
+
+BENCHMARKS = {'download': bench_download.run, 'planning': bench_planning.run, 'file_manager': bench_file_manager.run, 'normalization': bench_normalization.run,
+              'reader': bench_reader.run, 'ingestion': bench_ingestion.run,
+              'startup': bench_startup.run}
+
+
+def get_commit() -> str:
+    """Returns the current git commit of the repository, or None outside a checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names: list[str] = None) -> dict:
+    """Runs the selected benchmarks (all by default) and returns their results with run metadata"""
+    results = {'commit': get_commit(), 'timestamp': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(), 'benchmarks': {}}
+    for name in names or BENCHMARKS:
+        started = time.perf_counter()
+        results['benchmarks'][name] = BENCHMARKS[name]()
+        print(f"BENCHMARK: {name} - {time.perf_counter() - started:.1f}s")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run DataHandler benchmarks and report JSON results')
+    parser.add_argument('names', nargs='*', help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--output', help='Also write results to this JSON file, e.g. for regression tracking across commits')
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    results = run(args.names)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
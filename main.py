@@ -1,68 +1,133 @@
+import argparse
 import asyncio
+import os
+import socket
+import time
 
-from ib_async.contract import Index
-
-# Create event loop before importing ib_insync (required for Python 3.14)
+# Create event loop before ib_async is imported by the IBKR client (required for Python 3.14)
 loop = asyncio.new_event_loop()
 asyncio.set_event_loop(loop)
 
 from src.configuration.config import Config
 from src.file_manager import FileManager
-from src.providers.ibkr_client import IBKRClient
-from src.providers.saxo_client import SaxoClient
+from src.providers import registry
 from src.configuration.download_requests_parser import DownloadRequestsParser
 from src.data_downloader import DataDownloader
-from src.normalization_tracker import NormalizationTracker
+from src.live_stream import LiveStream
+from src.storage.compaction import Compactor
+from src.metrics import METRICS, MetricsExporter
+from src.profiling import profile_cycle
+from src.work_queue import WorkQueue
+
+def parse_args():
+    """Parses command line arguments"""
+    parser = argparse.ArgumentParser(description='Market data downloader')
+    parser.add_argument('--config', default='config/config.ini', help='Path of config.ini')
+    parser.add_argument('--worker', action='store_true', help='Claim shards from the shared work queue instead of running all requests in this process')
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}", help='Unique worker name used for queue leases')
+    parser.add_argument('--live', action='store_true', help='Also stream today\'s bars of requests with "live": true while backfill cycles run')
+    parser.add_argument('--profile-cycle', metavar='FILE', help='Profile the first download cycle and write pstats to FILE')
+    return parser.parse_args()
 
-async def main():
+async def main(args):
     """Main entry point with infinite loop for periodic downloads"""
-    config = Config()
+    config = Config(args.config)
     file_manager = FileManager(config)
-    normalization_trackers = {(
-        'ibkr', 'TRADES'): NormalizationTracker(config.processed_data_dir, 'ibkr', 'TRADES'), 
-        ('ibkr', 'BID_ASK'): NormalizationTracker(config.processed_data_dir, 'ibkr', 'BID_ASK'), 
-        ('saxo', 'TRADES'): NormalizationTracker(config.processed_data_dir, 'saxo', 'TRADES'), 
-        ('saxo', 'BID_ASK'): NormalizationTracker(config.processed_data_dir, 'saxo', 'BID_ASK')}
-    ibkr_client = IBKRClient(config)
-    saxo_client = SaxoClient(config)
-    provider_clients = {'ibkr': ibkr_client, 'saxo': saxo_client}
     download_requests_parser = DownloadRequestsParser(config)
+    download_requests = download_requests_parser.get_download_requests()
+    # Workers share the journal, so none of them compacts it
+    compact_after_entries = 0 if args.worker else 1000
+    normalization_trackers = registry.create_normalization_trackers(config, download_requests, compact_after_entries)
+    clients = registry.create_provider_clients(config, download_requests)
+    if not clients:
+        raise ValueError("No provider used by the download requests is configured")
+    # Filled as providers come up; download cycles only run requests of providers in it
+    provider_clients = {}
+    provider_up = asyncio.Event()
     downloader = DataDownloader(provider_clients, file_manager, download_requests_parser, config, normalization_trackers)
+    work_queue = WorkQueue(config.work_queue_file, config.worker_lease_seconds) if args.worker else None
+    metrics_exporter = MetricsExporter(METRICS, config.metrics_host, config.metrics_port, config.metrics_snapshot_file, config.metrics_snapshot_seconds)
+    await metrics_exporter.start()
 
-    if not config.client_id and not config.saxo_client_id:
-        raise ValueError("At least one provider client_id must be configured")
-
-    print("Attempting to connect to providers...")
-    if config.client_id:
-        while True:
-            try:
-                await ibkr_client.connect()
-                print("Connected to IBKR successfully")
-                break
-            except Exception as e:
-                error_msg = str(e) if str(e) else "Connection failed"
-                print(f"\nFailed to connect to IBKR: {error_msg}")
-                print(f"Retrying in {config.connection_retry_seconds} seconds...\n")
-                await asyncio.sleep(config.connection_retry_seconds)
-    if config.saxo_client_id and config.saxo_client_secret:
+    async def bring_up(provider, client):
         try:
-            await saxo_client.connect()
-            print("Connected to Saxo successfully")
+            await registry.connect_provider(provider, client, download_requests, config)
         except Exception as e:
-            print(f"Failed to connect to Saxo: {e}")
+            print(f"Failed to connect to {provider}: {e}")
+            return
+        provider_clients[provider] = client
+        provider_up.set()
+
+    print(f"Attempting to connect to providers: {', '.join(clients)}")
+    connect_tasks = [asyncio.create_task(bring_up(provider, client)) for provider, client in clients.items()]
+
+    async def run_cycle():
+        if work_queue:
+            await downloader.run_worker(work_queue, args.worker_id)
+        else:
+            await downloader.run()
 
+    background_tasks = []
+    # Compaction takes the same cross-process series locks as writers, so workers may run it too
+    if config.compaction_interval_seconds:
+        background_tasks.append(asyncio.create_task(Compactor(config, file_manager).run_periodically(), name='compaction'))
+    if args.live:
+        background_tasks.append(asyncio.create_task(LiveStream(provider_clients, file_manager, download_requests_parser, config, normalization_trackers).run(), name='live'))
+    for task in background_tasks:
+        task.add_done_callback(report_task_failure)
+
+    profile_file = args.profile_cycle
+    try:
+        await run_cycles(provider_clients, provider_up, run_cycle, config, profile_file)
+    finally:
+        for task in connect_tasks + background_tasks:
+            task.cancel()
+        await asyncio.gather(*connect_tasks, *background_tasks, return_exceptions=True)
+        # Writes queued by an interrupted cycle finish before their normalization entries are flushed
+        await downloader.write_pipeline.drain()
+        downloader.write_pipeline.close()
+        for normalization_tracker in normalization_trackers.values():
+            normalization_tracker.flush()
+            normalization_tracker.close()
+        await metrics_exporter.stop()
+
+def report_task_failure(task: asyncio.Task):
+    """Prints the exception a background task stopped with; cancelled tasks are not reported"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"FAILED: background task {task.get_name()} stopped - {task.exception()!r}")
+
+async def run_cycles(provider_clients, provider_up, run_cycle, config, profile_file):
+    """Runs download cycles forever, waking early when a provider comes up"""
     while True:
         try:
-            print(f"Starting download cycle")
-            await downloader.run()
+            if not provider_clients:
+                await provider_up.wait()
+            provider_up.clear()
+            print(f"Starting download cycle for {', '.join(provider_clients)}")
+            with METRICS.timer('cycle_seconds'):
+                if profile_file:
+                    await profile_cycle(run_cycle, profile_file, config.profiler)
+                    profile_file = None
+                else:
+                    await run_cycle()
+            METRICS.set_gauge('last_cycle_timestamp_seconds', time.time())
             print(f"Download cycle completed, sleeping for {config.download_cycle_seconds} seconds(s)")
-            await asyncio.sleep(config.download_cycle_seconds)
+            # A provider coming up ends the sleep early so its requests start right away
+            try:
+                await asyncio.wait_for(provider_up.wait(), config.download_cycle_seconds)
+            except asyncio.TimeoutError:
+                pass
         except Exception as e:
             print(f"Error during download: {e}")
             await asyncio.sleep(config.error_retry_seconds)
 
 if __name__ == '__main__':
+    main_task = loop.create_task(main(parse_args()))
     try:
-        loop.run_until_complete(main())
+        loop.run_until_complete(main_task)
+    except KeyboardInterrupt:
+        # Cancelling main runs its finally, which stops the connect, compaction and live tasks
+        main_task.cancel()
+        loop.run_until_complete(asyncio.gather(main_task, return_exceptions=True))
     finally:
         loop.close()
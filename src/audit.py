@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.configuration.config import Config
+from src.configuration.download_requests_parser import DownloadRequestsParser
+from src.file_manager import FileManager
+from src.resampler import BAR_SECONDS
+from src.storage.base_storage import StorageBackend
+from src.trading_calendar import TradingCalendar
+
+# Issues a new download of the date can repair; zero-volume stretches and bars outside the session are reported only
+REQUEUE_ISSUES = ('missing_file', 'missing_bars', 'duplicates', 'unordered')
+
+
+class Auditor:
+    """Checks stored raw intraday bars of completed dates for missing bars, duplicate timestamps and zero-volume stretches, and can re-queue affected dates"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, config: Config, file_manager: FileManager, download_requests_parser: DownloadRequestsParser):
+        self.config = config
+        self.file_manager = file_manager
+        self.download_requests_parser = download_requests_parser
+        self.trading_calendar = TradingCalendar(config.trading_calendar_file)
+
+    # Business Logic --------------------------------------------------------
+    def run(self, requeue: bool = False) -> dict:
+        """Audits every intraday series of the download requests, one process pool task per series; writes the gap report and returns its summary"""
+        started = time.perf_counter()
+        self.file_manager.refresh_status()
+        futures = {}
+        with ProcessPoolExecutor(max_workers=self.config.audit_workers or os.cpu_count()) as pool:
+            for (provider, what_to_show, granularity, ticker), exchange in self._get_series().items():
+                statuses = self.file_manager.status_store.get_dates(provider, what_to_show, granularity, ticker)
+                dates = sorted(date_str for date_str, status in list(statuses.items()) if status == 'completed' and len(date_str) == 10)
+                if not dates:
+                    continue
+                sessions = {date_str: self.trading_calendar.get_session(exchange, date_str) for date_str in dates}
+                futures[(provider, what_to_show, granularity, ticker)] = (len(dates), pool.submit(
+                    _audit_series, self.file_manager.storage, provider, what_to_show, granularity, ticker, sessions, self.config.audit_zero_volume_bars))
+            series = {}
+            dates_total = failed = 0
+            for key, (date_count, future) in futures.items():
+                try:
+                    issues = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"AUDIT: FAILED {'/'.join(key)} - {e}")
+                    continue
+                dates_total += date_count
+                if issues:
+                    series['/'.join(key)] = issues
+        flagged = [(key, date_str) for key, issues in series.items() for date_str, date_issues in issues.items() if any(issue in date_issues for issue in REQUEUE_ISSUES)]
+        if requeue:
+            for key, date_str in flagged:
+                provider, what_to_show, granularity, ticker = key.split('/', 3)
+                self.file_manager.set_status(ticker, granularity, date_str, what_to_show, provider, 'incomplete')
+        all_issues = [date_issues for issues in series.values() for date_issues in issues.values()]
+        summary = {'series': len(futures) - failed, 'failed_series': failed, 'dates': dates_total, 'dates_with_issues': len(all_issues),
+                   'missing_bars': sum(date_issues.get('missing_bars', 0) for date_issues in all_issues),
+                   'duplicates': sum(date_issues.get('duplicates', 0) for date_issues in all_issues),
+                   'zero_volume_stretches': sum(len(date_issues.get('zero_volume', [])) for date_issues in all_issues),
+                   'repairable_dates': len(flagged), 'requeued_dates': len(flagged) if requeue else 0, 'seconds': time.perf_counter() - started}
+        report_file = self._write_report({'generated': datetime.now().isoformat(timespec='seconds'), 'summary': summary, 'series': series})
+        print(f"AUDIT: {dates_total} date(s) of {summary['series']} series in {summary['seconds']:.1f}s - {len(all_issues)} with issues, "
+              f"{summary['missing_bars']} missing bar(s), {summary['duplicates']} duplicate timestamp(s), {summary['zero_volume_stretches']} zero-volume stretch(es); "
+              f"{len(flagged)} repairable date(s){' re-queued' if requeue else ''}; report {report_file}")
+        return summary
+
+    def _get_series(self) -> dict:
+        """Returns {(provider, what_to_show, granularity, ticker): calendar exchange} of downloaded and derived intraday granularities"""
+        series = {}
+        for request in self.download_requests_parser.get_download_requests():
+            exchange = request.get('calendar', request.get('exchange', 'SMART'))
+            for granularity in request['granularities'] + request.get('derived_granularities', []):
+                if granularity not in BAR_SECONDS:
+                    continue
+                for ticker in request['tickers']:
+                    series[(request.get('provider', 'ibkr'), request.get('whatToShow', 'TRADES'), granularity, ticker)] = exchange
+        return series
+
+    # IO --------------------------------------------------------------------
+    def _write_report(self, report: dict) -> Path:
+        """Atomically writes the gap report; returns its path"""
+        report_file = Path(self.config.audit_report_file or Path(self.config.raw_data_dir) / 'audit_report.json')
+        report_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = report_file.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(report, f, separators=(',', ':'))
+        os.replace(tmp_path, report_file)
+        return report_file
+
+
+def _audit_series(storage: StorageBackend, provider: str, what_to_show: str, granularity: str, ticker: str, sessions: dict, zero_volume_bars: int) -> dict:
+    """Audits raw bars of each date of sessions ({date_str: session or None}); runs in a worker process; returns {date_str: issues} of dates with issues"""
+    issues = {}
+    for date_str, session in sessions.items():
+        frame = storage.read(ticker, granularity, date_str, True, what_to_show, provider)
+        date_issues = {'missing_file': True} if frame is None else audit_frame(frame, date_str, BAR_SECONDS[granularity], session, zero_volume_bars)
+        if date_issues:
+            issues[date_str] = date_issues
+    return issues
+
+
+def audit_frame(frame: pd.DataFrame, date_str: str, bar_seconds: int, session: tuple[str, str, str], zero_volume_bars: int) -> dict:
+    """Returns the issues of one date's bars from vectorized timestamp diffs against bar_seconds and the (timezone, open, close) session; {} if clean.
+    Gaps and zero-volume stretches are listed as [local start time, bars]"""
+    try:
+        times = pd.to_datetime(frame['date'], format='ISO8601')
+    except ValueError:
+        # Offsets change within the file, e.g. bars stored in exchange time across a DST switch
+        times = pd.to_datetime(frame['date'], format='ISO8601', utc=True)
+    if times.dt.tz is not None:
+        times = (times.dt.tz_convert(session[0]) if session else times).dt.tz_localize(None)
+    seconds = (times - pd.Timestamp(date_str)).dt.total_seconds().to_numpy()
+    diffs = np.diff(seconds)
+    ordered = np.unique(seconds)
+    issues = {'duplicates': len(seconds) - len(ordered), 'unordered': int((diffs < 0).sum())}
+    if session:
+        session_open, session_close = _to_seconds(session[1]), _to_seconds(session[2])
+        in_session = (ordered >= session_open) & (ordered < session_close)
+        issues['outside_session'] = int((~in_session).sum())
+        # Bounds stand in for virtual bars before the open and at the close, so leading and trailing gaps count like inner ones
+        ordered = np.r_[session_open - bar_seconds, ordered[in_session], session_close]
+    steps = np.diff(ordered)
+    missing = np.ceil(steps / bar_seconds).astype(np.int64) - 1
+    gap_at = np.flatnonzero(missing > 0)
+    if len(gap_at):
+        issues['missing_bars'] = int(missing[gap_at].sum())
+        issues['gaps'] = [[_format_seconds(ordered[i] + bar_seconds), int(missing[i])] for i in gap_at]
+    volume = frame['volume'].to_numpy(dtype=np.float64)
+    # Providers without volume (Saxo, BID_ASK bars) store 0 or -1 throughout
+    if (volume > 0).any():
+        edges = np.diff(np.r_[0, (volume == 0).astype(np.int8), 0])
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        long_runs = np.flatnonzero(ends - starts >= zero_volume_bars)
+        if len(long_runs):
+            issues['zero_volume'] = [[_format_seconds(seconds[starts[i]]), int(ends[i] - starts[i])] for i in long_runs]
+    return {issue: value for issue, value in issues.items() if value}
+
+
+def _to_seconds(clock: str) -> int:
+    """Returns seconds since midnight of an HH:MM time"""
+    hours, minutes = clock.split(':')
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def _format_seconds(seconds: float) -> str:
+    """Returns HH:MM:SS of seconds since midnight"""
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Audit stored raw intraday bars for gaps, duplicate timestamps and zero-volume stretches')
+    parser.add_argument('--config', default='config/config.ini', help='Path of config.ini')
+    parser.add_argument('--requeue', action='store_true', help='Mark dates with missing bars or duplicate timestamps incomplete so the next cycle downloads them again')
+    args = parser.parse_args()
+    config = Config(args.config)
+    Auditor(config, FileManager(config), DownloadRequestsParser(config)).run(args.requeue)
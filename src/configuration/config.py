@@ -1,6 +1,15 @@
 import configparser
 from pathlib import Path
 
+# Pacing budgets per provider, enforced over sliding windows; IBKR allows 60 historical requests in any 10 minutes, no identical request within 15 seconds
+# and at most 6 requests for the same contract within 2 seconds
+PACING_DEFAULTS = {
+    'ibkr': {'max_concurrent_requests': 5, 'requests_per_window': 60, 'window_seconds': 600, 'identical_request_cooldown_seconds': 15,
+             'contract_requests_per_window': 5, 'contract_window_seconds': 2},
+    'saxo': {'max_concurrent_requests': 4, 'requests_per_window': 120, 'window_seconds': 60, 'identical_request_cooldown_seconds': 0,
+             'contract_requests_per_window': 120, 'contract_window_seconds': 60},
+}
+
 class Config:
     """Application configuration from config.ini"""
 
@@ -12,14 +21,69 @@ class Config:
         self.port = parser.getint('IBKR', 'port')
         client_id_str = parser.get('IBKR', 'client_id', fallback='')
         self.client_id = int(client_id_str) if client_id_str else None
+        client_ids_str = parser.get('IBKR', 'client_ids', fallback='')
+        self.client_ids = [int(client_id) for client_id in client_ids_str.split(',') if client_id.strip()]
+        if self.client_ids and self.client_id is None:
+            self.client_id = self.client_ids[0]
+        self.ibkr_routing = parser.get('IBKR', 'routing', fallback='least_loaded')
+        self.contract_cache_file = parser.get('IBKR', 'contract_cache_file', fallback='config/ibkr_contracts.json')
+        self.contract_cache_ttl_seconds = parser.getint('IBKR', 'contract_cache_ttl_seconds', fallback=604800)
         self.saxo_client_id = parser.get('SAXO', 'client_id', fallback='')
         self.saxo_client_secret = parser.get('SAXO', 'client_secret', fallback='')
         self.saxo_redirect_uri = parser.get('SAXO', 'redirect_uri', fallback='http://localhost:5000/callback')
         self.saxo_token_file = parser.get('SAXO', 'token_file', fallback='config/saxo_tokens.json')
+        self.saxo_uic_cache_file = parser.get('SAXO', 'uic_cache_file', fallback='config/saxo_uics.json')
+        self.saxo_uic_cache_ttl_seconds = parser.getint('SAXO', 'uic_cache_ttl_seconds', fallback=604800)
+        self.saxo_connection_limit = parser.getint('SAXO', 'connection_limit', fallback=8)
+        self.saxo_max_window_days = parser.getint('SAXO', 'max_window_days', fallback=30)
         self.processed_data_dir = parser.get('Paths', 'processed_data_dir')
         self.raw_data_dir = parser.get('Paths', 'raw_data_dir')
         self.download_requests_file = parser.get('Paths', 'download_requests_file')
+        self.trading_calendar_file = parser.get('Paths', 'trading_calendar_file', fallback='config/trading_calendars.json')
+        self.storage_backend = parser.get('Storage', 'backend', fallback='csv')
+        self.write_workers = parser.getint('Storage', 'write_workers', fallback=4)
+        self.write_queue_size = parser.getint('Storage', 'write_queue_size', fallback=64)
+        self.compaction_interval_seconds = parser.getint('Storage', 'compaction_interval_seconds', fallback=86400)
+        self.reader_workers = parser.getint('Reader', 'workers', fallback=8)
+        self.reader_cache_megabytes = parser.getint('Reader', 'cache_megabytes', fallback=512)
+        self.renormalize_workers = parser.getint('Normalization', 'workers', fallback=0)
+        self.audit_workers = parser.getint('Audit', 'workers', fallback=0)
+        self.audit_zero_volume_bars = parser.getint('Audit', 'zero_volume_bars', fallback=30)
+        self.audit_report_file = parser.get('Audit', 'report_file', fallback='')
         self.connection_retry_seconds = parser.getint('Timing', 'connection_retry_seconds')
         self.download_cycle_seconds = parser.getint('Timing', 'download_cycle_seconds')
-        self.request_delay_seconds = parser.getint('Timing', 'request_delay_seconds')
         self.error_retry_seconds = parser.getint('Timing', 'error_retry_seconds')
+        self.normalization_flush_seconds = parser.getint('Timing', 'normalization_flush_seconds', fallback=60)
+        self.retry_base_seconds = parser.getint('Retry', 'base_seconds', fallback=300)
+        self.retry_max_seconds = parser.getint('Retry', 'max_seconds', fallback=86400)
+        self.retry_stuck_attempts = parser.getint('Retry', 'stuck_attempts', fallback=5)
+        self.work_queue_file = parser.get('Workers', 'queue_file', fallback='work-queue.sqlite')
+        self.worker_lease_seconds = parser.getint('Workers', 'lease_seconds', fallback=300)
+        self.worker_heartbeat_seconds = parser.getint('Workers', 'heartbeat_seconds', fallback=60)
+        self.fake_latency_seconds = parser.getfloat('Fake', 'latency_seconds', fallback=0.05)
+        self.fake_latency_jitter_seconds = parser.getfloat('Fake', 'latency_jitter_seconds', fallback=0.0)
+        self.fake_failure_rate = parser.getfloat('Fake', 'failure_rate', fallback=0.0)
+        self.fake_pacing_rejection_rate = parser.getfloat('Fake', 'pacing_rejection_rate', fallback=0.0)
+        self.fake_pacing_limit = parser.getint('Fake', 'pacing_limit', fallback=0)
+        self.fake_pacing_window_seconds = parser.getfloat('Fake', 'pacing_window_seconds', fallback=600)
+        self.fake_seed = parser.getint('Fake', 'seed', fallback=0)
+        self.fake_stream_interval_seconds = parser.getfloat('Fake', 'stream_interval_seconds', fallback=0.0)
+        self.live_flush_seconds = parser.getfloat('Live', 'flush_seconds', fallback=5.0)
+        self.metrics_host = parser.get('Metrics', 'host', fallback='127.0.0.1')
+        self.metrics_port = parser.getint('Metrics', 'port', fallback=0)
+        self.metrics_snapshot_file = parser.get('Metrics', 'snapshot_file', fallback='')
+        self.metrics_snapshot_seconds = parser.getint('Metrics', 'snapshot_seconds', fallback=60)
+        self.profiler = parser.get('Metrics', 'profiler', fallback='cprofile')
+        self.throughput_log_seconds = parser.getint('Pacing', 'throughput_log_seconds', fallback=60)
+        self.pacing = {provider: self._read_pacing(parser, provider, defaults) for provider, defaults in PACING_DEFAULTS.items()}
+
+    # Business Logic --------------------------------------------------------
+    def get_pacing(self, provider: str) -> dict:
+        """Returns pacing budget for provider, falling back to the IBKR budget for unknown providers"""
+        return self.pacing.get(provider, self.pacing['ibkr'])
+
+    # Misc ------------------------------------------------------------------
+    def _read_pacing(self, parser, provider: str, defaults: dict) -> dict:
+        """Reads {provider}_{setting} keys of the [Pacing] section over the defaults"""
+        return {key: parser.getfloat('Pacing', f'{provider}_{key}', fallback=value) if 'seconds' in key else parser.getint('Pacing', f'{provider}_{key}', fallback=value)
+                for key, value in defaults.items()}
@@ -1,15 +1,34 @@
 import json
 from pathlib import Path
 
+from src.resampler import get_source_granularity
+
 class DownloadRequestsParser:
     """Parses download_requests.json configuration file"""
 
     # LifeCycle -------------------------------------------------------------
     def __init__(self, config):
         self.download_requests_file = Path(config.download_requests_file)
+        self.reported = set()
 
     # Business Logic --------------------------------------------------------
     def get_download_requests(self):
-        """Returns list of download request dictionaries from download_requests.json"""
+        """Returns list of download request dictionaries from download_requests.json; derived granularities that cannot be built are reported once and dropped"""
         with open(self.download_requests_file, 'r') as f:
-            return json.load(f)
+            download_requests = json.load(f)
+        for download_request in download_requests:
+            if 'derived_granularities' in download_request:
+                download_request['derived_granularities'] = [target for target in download_request['derived_granularities'] if self._is_derivable(download_request, target)]
+        return download_requests
+
+    def _is_derivable(self, download_request, target):
+        """Returns True if target can be built from the request's granularities, printing why not the first time it is seen"""
+        try:
+            get_source_granularity(target, download_request['granularities'])
+            return True
+        except ValueError as e:
+            message = f"SKIPPED: derived granularity {target} of {download_request.get('provider', 'ibkr')} request for {', '.join(download_request['tickers'])} - {e}"
+            if message not in self.reported:
+                self.reported.add(message)
+                print(message)
+            return False
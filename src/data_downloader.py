@@ -1,12 +1,22 @@
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import asyncio
+import time
+import pandas as pd
 
 from src.configuration.config import Config
 from src.configuration.download_requests_parser import DownloadRequestsParser
+from src.download_scheduler import DownloadScheduler, DownloadUnit
 from src.file_manager import FileManager
+from src.metrics import METRICS
 from src.normalization_tracker import NormalizationTracker
 from src.providers.base_client import ProviderClient
+from src.resampler import Resampler
+from src.retry_tracker import RetryTracker
+from src.trading_calendar import TradingCalendar
+from src.watermark_tracker import WatermarkTracker
+from src.work_queue import WorkQueue
+from src.write_pipeline import WritePipeline
 
 class DataDownloader:
     """Orchestrates data download from multiple providers"""
@@ -18,72 +28,216 @@ class DataDownloader:
         self.download_requests_parser = download_requests_parser
         self.config = config
         self.normalization_trackers = normalization_trackers
+        self.scheduler = DownloadScheduler(config)
+        self.trading_calendar = TradingCalendar(config.trading_calendar_file)
+        self.watermark_tracker = WatermarkTracker(config.raw_data_dir)
+        self.retry_tracker = RetryTracker(config.raw_data_dir, config.retry_base_seconds, config.retry_max_seconds)
+        self.write_pipeline = WritePipeline(config.write_workers, config.write_queue_size)
+        self.resampler = Resampler(file_manager)
 
     # Business Logic --------------------------------------------------------
-    def _generate_date_ranges(self, granularity, starting_date):
-        """Generates list of date strings for files to download"""
+    def _generate_date_ranges(self, granularity, starting_date, after=None, exchange=None):
+        """Generates list of date strings for files to download, starting after the watermark and skipping non-trading days"""
         start = datetime.strptime(starting_date, '%Y-%m-%d')
         yesterday = datetime.now() - timedelta(days=1)
         dates = []
         if self._is_major_granularity(granularity):
-            year = start.year
+            year = max(start.year, int(after) + 1) if after else start.year
             while year <= yesterday.year:
                 dates.append(str(year))
                 year += 1
         else:
-            current = start
+            current = max(start, datetime.strptime(after, '%Y-%m-%d') + timedelta(days=1)) if after else start
             while current <= yesterday:
-                dates.append(current.strftime('%Y-%m-%d'))
+                if exchange is None or self.trading_calendar.is_trading_day(exchange, current):
+                    dates.append(current.strftime('%Y-%m-%d'))
                 current += timedelta(days=1)
         return dates
 
-    def _should_download(self, file_path):
-        """Returns True if file needs to be downloaded"""
-        status = self.file_manager.get_file_status(file_path)
-        return status != 'completed' and status!= 'not_available'
-
     def _is_major_granularity(self, granularity):
         """Returns True if granularity is 1D or larger"""
         return granularity.endswith('D') or granularity.endswith('W')
 
-    async def download_request(self, download_request):
-        """Downloads all data for a single download request"""
-        currency = download_request.get('currency', 'USD')
-        exchange = download_request.get('exchange', 'SMART')
-        contract_type = download_request.get('type', 'Stock')
-        what_to_show = download_request.get('whatToShow', 'TRADES')
+    def _plan_request(self, download_request) -> list[DownloadUnit]:
+        """Returns units still to download for a request, ordered ticker -> granularity -> newest date first; failed dates still in backoff are left out, due ones get single-date units"""
         provider = download_request.get('provider', 'ibkr')
-        client = self.provider_clients[provider]
-        normalization_tracker = self.normalization_trackers[(provider, what_to_show)]
+        what_to_show = download_request.get('whatToShow', 'TRADES')
+        exchange = download_request.get('exchange', 'SMART')
+        starting_date = download_request['starting_date']
+        units = []
         for ticker in download_request['tickers']:
             for granularity in download_request['granularities']:
-                dates = self._generate_date_ranges(granularity, download_request['starting_date'])[::-1]
-                for date_str in dates:
-                    raw_path = self.file_manager.get_file_path(ticker, granularity, date_str, True, what_to_show, provider)
-                    if not self._should_download(raw_path):
+                watermark = self.watermark_tracker.get(provider, what_to_show, ticker, granularity, starting_date)
+                dates = self._generate_date_ranges(granularity, starting_date, watermark, download_request.get('calendar', exchange))
+                pending = self.file_manager.get_pending_dates(ticker, granularity, dates, what_to_show, provider)
+                self._advance_watermark(provider, what_to_show, ticker, granularity, starting_date, dates, pending)
+                gaps = [date_str for date_str in self.file_manager.get_open_dates(ticker, granularity, what_to_show, provider)
+                        if watermark and starting_date[:len(date_str)] <= date_str <= watermark]
+                fresh, retries = self._split_retries(provider, what_to_show, granularity, ticker, sorted(set(pending + gaps), reverse=True))
+                # Retries go out one date each, so a window the provider rejects as a whole is not requested again in one piece
+                for retry, windows in [(False, self._coalesce_dates(provider, granularity, dates, fresh)), (True, [[date_str] for date_str in retries])]:
+                    for window in windows:
+                        units.append(DownloadUnit(provider, ticker, granularity, window, what_to_show, download_request.get('currency', 'USD'),
+                                                  exchange, download_request.get('type', 'Stock'), retry))
+        return units
+
+    def _split_retries(self, provider, what_to_show, granularity, ticker, pending_dates):
+        """Returns (fresh, retries): pending dates never failed, and failed dates whose backoff has expired; order is kept"""
+        now = time.time()
+        fresh, retries = [], []
+        for date_str in pending_dates:
+            retry = self.retry_tracker.get(provider, what_to_show, granularity, ticker, date_str)
+            if retry is None:
+                fresh.append(date_str)
+            elif retry['next_eligible'] <= now:
+                retries.append(date_str)
+        return fresh, retries
+
+    def _plan_requests(self, download_requests) -> list[DownloadUnit]:
+        """Returns units of all download requests with fresh units ahead of retries"""
+        units = [unit for download_request in download_requests for unit in self._plan_request(download_request)]
+        return sorted(units, key=lambda unit: unit.retry)
+
+    def _coalesce_dates(self, provider, granularity, dates, pending_dates):
+        """Groups pending dates (newest first) into windows of consecutive planned dates within the provider's max request span"""
+        max_window_days = 1 if self._is_major_granularity(granularity) else self.provider_clients[provider].get_max_window_days(granularity)
+        positions = {date_str: i for i, date_str in enumerate(dates)}
+        windows = []
+        for date_str in pending_dates:
+            # Yearly dates of daily bars are never coalesced, so the day span below is only computed for intraday dates
+            if windows and max_window_days > 1:
+                window = windows[-1]
+                adjacent = date_str in positions and window[0] in positions and positions[window[0]] - positions[date_str] == 1
+                if adjacent and self._get_window_days(date_str, window[-1]) <= max_window_days:
+                    window.insert(0, date_str)
+                    continue
+            windows.append([date_str])
+        return windows
+
+    def _get_window_days(self, first_date_str, last_date_str):
+        """Returns calendar days spanned by an intraday window"""
+        return (datetime.strptime(last_date_str, '%Y-%m-%d') - datetime.strptime(first_date_str, '%Y-%m-%d')).days + 1
+
+    def _advance_watermark(self, provider, what_to_show, ticker, granularity, starting_date, dates, pending):
+        """Moves the watermark to the last date before the first pending one; dates are ascending"""
+        if not dates:
+            return
+        if not pending:
+            self.watermark_tracker.set(provider, what_to_show, ticker, granularity, starting_date, dates[-1])
+            return
+        first_pending = dates.index(pending[0])
+        if first_pending > 0:
+            self.watermark_tracker.set(provider, what_to_show, ticker, granularity, starting_date, dates[first_pending - 1])
+
+    async def _download_unit(self, unit: DownloadUnit):
+        """Fetches a unit's window and writes raw file, processed file and status of each of its dates"""
+        client = self.provider_clients[unit.provider]
+        normalization_tracker = self.normalization_trackers[(unit.provider, unit.what_to_show)]
+        pacer = self.scheduler.get_pacer(unit.provider)
+
+        async def pace():
+            # Further calls of a unit (e.g. Saxo chart pages) count against the budget like the unit's first call
+            METRICS.observe('pacing_wait_seconds', await pacer.acquire(unit, page=True), provider=unit.provider)
+
+        # Dates whose final status is already set or left to their submitted write
+        handled = set()
+        try:
+            end_date = self._get_end_date(unit.granularity, unit.end_date_str)
+            duration_days = 1 if len(unit.dates) == 1 else self._get_window_days(unit.dates[0], unit.end_date_str)
+            with METRICS.timer('fetch_seconds', provider=unit.provider, granularity=unit.granularity):
+                data = await client.fetch_historical_data(unit.ticker, unit.granularity, end_date, unit.currency, unit.exchange, unit.contract_type, unit.what_to_show, duration_days, pace)
+            day_frames = self._split_by_date(unit, data)
+            for date_str in reversed(unit.dates):
+                frame = day_frames.get(date_str)
+                if frame is None or frame.empty:
+                    self.file_manager.set_status(unit.ticker, unit.granularity, date_str, unit.what_to_show, unit.provider, 'not_available')
+                    self.retry_tracker.record_success(unit.provider, unit.what_to_show, unit.granularity, unit.ticker, date_str)
+                    METRICS.inc('dates_total', provider=unit.provider, status='not_available')
+                    print(f"SKIPPED: {unit.name} {date_str} - no data")
+                    handled.add(date_str)
+                    continue
+
+                self.file_manager.set_status(unit.ticker, unit.granularity, date_str, unit.what_to_show, unit.provider, 'incomplete')
+                if normalization_tracker.update_entry(unit.ticker, unit.granularity, frame):
+                    METRICS.inc('normalization_versions_total', provider=unit.provider, granularity=unit.granularity)
+                await self.write_pipeline.submit(self._write_date, unit, date_str, frame, normalization_tracker)
+                handled.add(date_str)
+        except Exception as e:
+            failed = [date_str for date_str in unit.dates if date_str not in handled]
+            for date_str in failed:
+                self.file_manager.set_status(unit.ticker, unit.granularity, date_str, unit.what_to_show, unit.provider, 'corrupted')
+                self.retry_tracker.record_failure(unit.provider, unit.what_to_show, unit.granularity, unit.ticker, date_str, e)
+            METRICS.inc('dates_total', len(failed), provider=unit.provider, status='corrupted')
+            METRICS.inc('unit_failures_total', provider=unit.provider, error=type(e).__name__)
+            print(f"FAILED: {unit.name} - corrupted - {e}")
+
+    def _write_date(self, unit: DownloadUnit, date_str: str, frame: pd.DataFrame, normalization_tracker: NormalizationTracker):
+        """Normalizes and commits one date's raw and processed files; runs on the write pipeline's thread pool"""
+        try:
+            normalized = normalization_tracker.normalize_frame(unit.ticker, unit.granularity, frame)
+            self.file_manager.commit_data(unit.ticker, unit.granularity, date_str, unit.what_to_show, unit.provider, frame, normalized)
+            self.retry_tracker.record_success(unit.provider, unit.what_to_show, unit.granularity, unit.ticker, date_str)
+            METRICS.inc('dates_total', provider=unit.provider, status='completed')
+            print(f"SUCCESS: {unit.name} {date_str} - completed")
+        except Exception as e:
+            self.file_manager.set_status(unit.ticker, unit.granularity, date_str, unit.what_to_show, unit.provider, 'corrupted')
+            self.retry_tracker.record_failure(unit.provider, unit.what_to_show, unit.granularity, unit.ticker, date_str, e)
+            METRICS.inc('dates_total', provider=unit.provider, status='corrupted')
+            print(f"FAILED: {unit.name} {date_str} - corrupted - {e}")
+
+    def _split_by_date(self, unit: DownloadUnit, data) -> dict:
+        """Returns {date_str: DataFrame} of the unit's bars without copying a single-date batch; bars outside the unit's dates are dropped"""
+        frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        if len(unit.dates) == 1 or frame.empty:
+            return {unit.dates[0]: frame}
+        days = pd.to_datetime(frame['date']).dt.normalize()
+        return {day.strftime('%Y-%m-%d'): day_frame.reset_index(drop=True) for day, day_frame in frame.groupby(days, sort=False)
+                if day.strftime('%Y-%m-%d') in unit.dates}
+
+    async def _derive_request(self, download_request, tickers=None):
+        """Builds the request's derived_granularities from its downloaded finer bars for dates whose source date is done; tickers limits the tickers"""
+        provider = download_request.get('provider', 'ibkr')
+        what_to_show = download_request.get('whatToShow', 'TRADES')
+        starting_date = download_request['starting_date']
+        normalization_tracker = self.normalization_trackers[(provider, what_to_show)]
+        for target in download_request.get('derived_granularities', []):
+            source = self.resampler.get_source_granularity(target, download_request['granularities'])
+            for ticker in download_request['tickers']:
+                if tickers is not None and ticker not in tickers:
+                    continue
+                watermark = self.watermark_tracker.get(provider, what_to_show, ticker, target, starting_date)
+                dates = self._generate_date_ranges(target, starting_date, watermark, download_request.get('calendar', download_request.get('exchange', 'SMART')))
+                pending = self.file_manager.get_pending_dates(ticker, target, dates, what_to_show, provider)
+                self._advance_watermark(provider, what_to_show, ticker, target, starting_date, dates, pending)
+                gaps = [date_str for date_str in self.file_manager.get_open_dates(ticker, target, what_to_show, provider)
+                        if watermark and starting_date[:len(date_str)] <= date_str <= watermark]
+                source_statuses = {date_str: self.file_manager.get_status(ticker, source, date_str, what_to_show, provider) for date_str in set(pending + gaps)}
+                ready = [date_str for date_str in sorted(source_statuses, reverse=True) if source_statuses[date_str] in ('completed', 'not_available')]
+                frames = await asyncio.gather(*[asyncio.to_thread(self.resampler.derive_date, provider, what_to_show, ticker, source, target, date_str)
+                                                for date_str in ready])
+                derived = 0
+                for date_str, frame in zip(ready, frames):
+                    unit = DownloadUnit(provider, ticker, target, [date_str], what_to_show)
+                    if frame is None or frame.empty:
+                        if source_statuses[date_str] == 'not_available':
+                            self.file_manager.set_status(ticker, target, date_str, what_to_show, provider, 'not_available')
+                        else:
+                            # e.g. compaction was moving the source file; the date stays pending, so the watermark stops before it
+                            print(f"DERIVED: {provider}/{what_to_show}/{target}/{ticker}-{date_str} left pending - {source} bars could not be read")
                         continue
-                    try:
-                        end_date = self._get_end_date(granularity, date_str)
-                        data = await client.fetch_historical_data(ticker, granularity, end_date, currency, exchange, contract_type, what_to_show)
-                        if not data:
-                            self.file_manager.mark_status(raw_path, 'not_available')
-                            print(f"SKIPPED: {raw_path.name} - no data")
-                            continue
-
-                        self.file_manager.mark_status(raw_path, 'incomplete')
-                        self.file_manager.write_csv(raw_path, data, True)
-
-                        if not normalization_tracker.has_entry(ticker, granularity):
-                            normalization_tracker.add_entry(ticker, granularity, data)
-
-                        normalized = normalization_tracker.normalize_value(ticker, granularity, data)
-                        processed_path = self.file_manager.get_file_path(ticker, granularity, date_str, False, what_to_show, provider)
-                        self.file_manager.write_csv(processed_path, normalized, False)
-                        print(f"SUCCESS: {raw_path.name} - completed")
-                    except Exception as e:
-                        self.file_manager.mark_status(raw_path, 'corrupted')
-                        print(f"FAILED: {raw_path.name} - corrupted - {e}")
-                    await asyncio.sleep(self.config.request_delay_seconds)
+                    if normalization_tracker.update_entry(ticker, target, frame):
+                        METRICS.inc('normalization_versions_total', provider=provider, granularity=target)
+                    await self.write_pipeline.submit(self._write_date, unit, date_str, frame, normalization_tracker)
+                    derived += 1
+                if derived:
+                    print(f"DERIVED: {provider}/{what_to_show}/{target}/{ticker} - {derived} date(s) from {source}")
+
+    async def download_request(self, download_request):
+        """Downloads all data for a single download request"""
+        await self.scheduler.run(self._plan_request(download_request), self._download_unit)
+        await self.write_pipeline.drain()
+        await self._derive_request(download_request)
+        await self.write_pipeline.drain()
 
     def _get_end_date(self, granularity, date_str):
         """Returns end date for IBKR request"""
@@ -91,11 +245,86 @@ class DataDownloader:
             return f"{date_str}1231 23:59:59"
         return f"{date_str.replace('-', '')} 23:59:59"
 
-    async def run(self):
-        """Runs download for all download requests"""
+    def _get_ready_requests(self) -> list[dict]:
+        """Returns download requests whose provider client is up; the others wait for a later cycle"""
         download_requests = self.download_requests_parser.get_download_requests()
-        for download_request in download_requests:
-            await self.download_request(download_request)
+        waiting = [request for request in download_requests if request.get('provider', 'ibkr') not in self.provider_clients]
+        if waiting:
+            providers = sorted({request.get('provider', 'ibkr') for request in waiting})
+            print(f"SKIPPED: {len(waiting)} download request(s) of {', '.join(providers)} - provider not connected")
+        return [request for request in download_requests if request.get('provider', 'ibkr') in self.provider_clients]
+
+    async def run(self):
+        """Runs download for all download requests of connected providers"""
+        # Picks up dates other processes re-queued, e.g. python -m src.audit --requeue
+        self.file_manager.refresh_status()
+        download_requests = self._get_ready_requests()
+        units = self._plan_requests(download_requests)
+        try:
+            await self.scheduler.run(units, self._download_unit)
+            await self.write_pipeline.drain()
+            for download_request in download_requests:
+                await self._derive_request(download_request)
+        finally:
+            await self.write_pipeline.drain()
+            for normalization_tracker in self.normalization_trackers.values():
+                normalization_tracker.flush()
+            self.watermark_tracker.save()
+            self.retry_tracker.save()
+        self._report_stuck()
+        for provider, client in self.provider_clients.items():
+            for cache_name, stats in client.get_cache_stats().items():
+                print(f"CACHE: {provider} {cache_name} - {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['entries']} entries")
+
+    async def run_worker(self, work_queue: WorkQueue, worker_id: str):
+        """Plans and enqueues all download requests of connected providers, then claims and downloads their shards until none is left"""
+        # Taken before the refresh: units other workers finish after it stay done
+        planned_at = time.time()
+        self.file_manager.refresh_status()
+        download_requests = self._get_ready_requests()
+        await work_queue.enqueue(self._plan_requests(download_requests), planned_at)
+        heartbeat = asyncio.create_task(self._heartbeat(work_queue, worker_id))
+        try:
+            while True:
+                claimed = await work_queue.claim_shard(worker_id, list(self.provider_clients))
+                if not claimed:
+                    break
+                print(f"WORKER: {worker_id} claimed {len(claimed)} unit(s) of {claimed[0][1].provider}/{claimed[0][1].what_to_show}/{claimed[0][1].ticker}")
+                for normalization_tracker in self.normalization_trackers.values():
+                    normalization_tracker.refresh()
+                await self.scheduler.run([unit for _, unit in claimed], self._download_unit)
+                await self.write_pipeline.drain()
+                # Done only once written, so planners that see the unit done also see its dates' statuses
+                await work_queue.complete([unit_id for unit_id, _ in claimed])
+                # Derived bars of the shard's ticker are built by the worker holding its lease
+                for download_request in download_requests:
+                    if download_request.get('provider', 'ibkr') == claimed[0][1].provider and download_request.get('whatToShow', 'TRADES') == claimed[0][1].what_to_show:
+                        await self._derive_request(download_request, {claimed[0][1].ticker})
+                await self.write_pipeline.drain()
+                for normalization_tracker in self.normalization_trackers.values():
+                    normalization_tracker.flush()
+        finally:
+            heartbeat.cancel()
+            await self.write_pipeline.drain()
+            await work_queue.release(worker_id)
+            self.watermark_tracker.save()
+            self.retry_tracker.save()
+        self._report_stuck()
+        print(f"WORKER: {worker_id} found no claimable shard; queue {await work_queue.get_counts()}")
+
+    async def _heartbeat(self, work_queue: WorkQueue, worker_id: str):
+        """Extends this worker's leases periodically"""
+        while True:
+            await asyncio.sleep(self.config.worker_heartbeat_seconds)
+            await work_queue.heartbeat(worker_id)
 
     # IO --------------------------------------------------------------------
     # Misc ------------------------------------------------------------------
+    def _report_stuck(self, limit=20):
+        """Prints failed dates that reached the stuck threshold, most attempts first"""
+        stuck = self.retry_tracker.get_stuck(self.config.retry_stuck_attempts)
+        for (provider, what_to_show, granularity, ticker, date_str), retry in stuck[:limit]:
+            next_attempt = datetime.fromtimestamp(retry['next_eligible']).strftime('%Y-%m-%d %H:%M')
+            print(f"STUCK: {provider}/{what_to_show}/{granularity}/{ticker}-{date_str} - {retry['attempts']} attempt(s), last error {retry['last_error']}, next attempt {next_attempt}")
+        if len(stuck) > limit:
+            print(f"STUCK: ... and {len(stuck) - limit} more")
@@ -0,0 +1,170 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pandas as pd
+
+from src.file_manager import FileManager
+from src.normalization_tracker import NormalizationTracker
+from src.storage.base_storage import LOCATE_ATTEMPTS
+
+# Fewer files than this are read on the calling thread; handing them to the pool costs more than it saves
+PARALLEL_MIN_FILES = 16
+
+
+class DataReader:
+    """Query API over stored bars: selects dates from the status manifest, reads them file by file and keeps decoded dates in an LRU cache"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, config, file_manager: FileManager, normalization_trackers: dict[tuple[str, str], NormalizationTracker] = None):
+        self.file_manager = file_manager
+        self.normalization_trackers = normalization_trackers or {}
+        self.executor = ThreadPoolExecutor(max_workers=config.reader_workers, thread_name_prefix='reader')
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.max_cache_bytes = config.reader_cache_megabytes * 2 ** 20
+        self.cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        """Stops the read thread pool"""
+        self.executor.shutdown(wait=True)
+
+    # Business Logic --------------------------------------------------------
+    def read(self, provider: str, what_to_show: str, granularity: str, ticker: str, start: str, end: str, processed: bool = False, unnormalize: bool = False) -> pd.DataFrame:
+        """Returns bars of ticker between start and end (YYYY-MM-DD, inclusive) as one DataFrame sorted by date; unnormalize converts processed bars back to prices.
+        The frame is built anew on every call, so callers may modify it without touching the cache"""
+        self.file_manager.refresh_status()
+        dates = self.get_dates(provider, what_to_show, granularity, ticker, start, end)
+        series = (provider, what_to_show, granularity, ticker, not processed)
+        located = {date_str: self._locate(series, date_str) for date_str in dates}
+        frames = self._get_cached(series, located)
+        missing = {date_str: file_path for date_str, file_path in located.items() if date_str not in frames and file_path is not None}
+        read, frame = self._read_missing(series, missing) if missing else ({}, None)
+        # A cold read that came back in date order is already the answer; the cache holds copies of its dates
+        if frames or list(read) != sorted(read):
+            frames.update(read)
+            frames = [frames[date_str] for date_str in dates if date_str in frames]
+            frame = pd.concat(frames, ignore_index=True) if frames else None
+        if frame is None:
+            return pd.DataFrame()
+        if len(dates[0]) == 4:
+            # Yearly partitions of daily and weekly bars hold more than the requested range
+            frame = frame[(frame['date'] >= self._to_timestamp(start)) & (frame['date'] < self._to_timestamp(end) + pd.Timedelta(days=1))].reset_index(drop=True)
+        if processed and unnormalize:
+            normalization_tracker = self.normalization_trackers[(provider, what_to_show)]
+            normalization_tracker.refresh()
+            frame = normalization_tracker.unnormalize_frame(ticker, granularity, frame)
+        return frame
+
+    def get_dates(self, provider: str, what_to_show: str, granularity: str, ticker: str, start: str, end: str) -> list[str]:
+        """Returns completed dates (days, or years for daily and weekly bars) overlapping start..end, ascending"""
+        statuses = self.file_manager.status_store.get_dates(provider, what_to_show, granularity, ticker)
+        return sorted(date_str for date_str, status in list(statuses.items())
+                      if status == 'completed' and start[:len(date_str)] <= date_str <= end[:len(date_str)])
+
+    def get_cache_stats(self) -> dict:
+        """Returns partition cache hits, misses, entries and size"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.cache), 'megabytes': self.cache_bytes / 2 ** 20}
+
+    def clear_cache(self):
+        """Drops all cached partitions"""
+        with self.cache_lock:
+            self.cache.clear()
+            self.cache_bytes = 0
+
+    def _get_cached(self, series: tuple, located: dict) -> dict:
+        """Returns {date_str: bars} of dates ({date_str: file path or None}) cached since their file last changed; cached frames are shared and must be treated as read-only"""
+        stamps = {date_str: self._get_stamp(series, date_str, file_path) for date_str, file_path in located.items() if file_path is not None}
+        found = {}
+        with self.cache_lock:
+            for date_str, stamp in stamps.items():
+                cached = self.cache.get((*series, date_str))
+                if cached is not None and stamp is not None and cached[0] == stamp:
+                    self.cache.move_to_end((*series, date_str))
+                    found[date_str] = cached[1]
+            self.hits += len(found)
+            self.misses += len(stamps) - len(found)
+        return found
+
+    def _read_missing(self, series: tuple, located: dict) -> tuple[dict, pd.DataFrame]:
+        """Reads dates ({date_str: file path}) grouped by the file holding them, in parallel only when there are enough files, parses the dates of all of them at once and caches each date;
+        returns ({date_str: bars} in read order, all bars read or None)"""
+        groups = {}
+        for date_str, file_path in located.items():
+            groups.setdefault(file_path, []).append(date_str)
+        items = list(groups.items())
+        if len(items) >= PARALLEL_MIN_FILES:
+            results = self.executor.map(lambda item: self._read_group(series, *item), items)
+        else:
+            results = [self._read_group(series, *item) for item in items]
+        read = [(date_str, stamp, frame) for result in results for date_str, (stamp, frame) in result.items() if frame is not None and not frame.empty]
+        if not read:
+            return {}, None
+        frame = pd.concat([frame for _, _, frame in read], ignore_index=True)
+        frame['date'] = pd.to_datetime(frame['date'], utc=True, format='ISO8601')
+        # memory_usage() is measured once for all dates and shared out by rows; per date it would cost more than the read
+        bytes_per_row = frame.memory_usage(deep=False).sum() / len(frame)
+        parsed = frame['date'].array
+        frames = {}
+        position = 0
+        for date_str, stamp, day_frame in read:
+            # The cache keeps the frames as read, which own their memory, with a copy of their parsed dates; a view into the concatenated
+            # frame would keep all of it alive until every date of it is evicted
+            day_frame['date'] = parsed[position:position + len(day_frame)].copy()
+            frames[date_str] = day_frame
+            position += len(day_frame)
+            self._put((*series, date_str), stamp, frames[date_str], int(bytes_per_row * len(day_frame)))
+        return frames, frame
+
+    def _read_group(self, series: tuple, file_path: Path, dates: list[str]) -> dict:
+        """Returns {date_str: (stamp, bars)} of dates located in file_path; dates are located again if compaction removed the file meanwhile"""
+        for _ in range(LOCATE_ATTEMPTS):
+            try:
+                stamp = file_path.stat().st_mtime_ns
+                return {date_str: (stamp, frame) for date_str, frame in self.file_manager.read_located_data(file_path, dates).items()}
+            except FileNotFoundError:
+                file_path = self._locate(series, dates[0])
+                if file_path is None:
+                    break
+        # The dates moved to different files, e.g. a segment and a newer CSV; read them one by one
+        return {date_str: (self._get_stamp(series, date_str), self.file_manager.read_data(series[3], series[2], date_str, series[4], series[1], series[0])) for date_str in dates}
+
+    def _put(self, key: tuple, stamp: int, frame: pd.DataFrame, size: int):
+        """Caches a date's bars taking size bytes and evicts the least recently used ones beyond the memory limit"""
+        if size > self.max_cache_bytes:
+            return
+        with self.cache_lock:
+            previous = self.cache.pop(key, None)
+            if previous is not None:
+                self.cache_bytes -= previous[2]
+            self.cache[key] = (stamp, frame, size)
+            self.cache_bytes += size
+            while self.cache_bytes > self.max_cache_bytes:
+                _, (_, _, evicted_size) = self.cache.popitem(last=False)
+                self.cache_bytes -= evicted_size
+
+    # IO --------------------------------------------------------------------
+    def _locate(self, series: tuple, date_str: str) -> Path:
+        """Returns the file holding a date of series, or None"""
+        provider, what_to_show, granularity, ticker, is_raw = series
+        return self.file_manager.locate_data(ticker, granularity, date_str, is_raw, what_to_show, provider)
+
+    def _get_stamp(self, series: tuple, date_str: str, file_path: Path = None) -> int:
+        """Returns modification time of the file holding a date (file_path if already located), or None if it is not stored"""
+        for _ in range(LOCATE_ATTEMPTS):
+            file_path = file_path or self._locate(series, date_str)
+            if file_path is None:
+                return None
+            try:
+                return file_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                # Compacted since it was located
+                file_path = None
+        return None
+
+    # Misc ------------------------------------------------------------------
+    def _to_timestamp(self, date_str: str) -> pd.Timestamp:
+        """Returns midnight UTC of a YYYY-MM-DD date"""
+        return pd.Timestamp(date_str, tz='UTC')
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from src.configuration.config import Config
+from src.metrics import METRICS
+
+
+@dataclass
+class DownloadUnit:
+    """Single planned provider request: one ticker and granularity over a window of consecutive dates (ascending)"""
+    provider: str
+    ticker: str
+    granularity: str
+    dates: list[str]
+    what_to_show: str = 'TRADES'
+    currency: str = 'USD'
+    exchange: str = 'SMART'
+    contract_type: str = 'Stock'
+    retry: bool = False
+
+    @property
+    def end_date_str(self) -> str:
+        """Returns the last date of the window"""
+        return self.dates[-1]
+
+    @property
+    def name(self) -> str:
+        """Returns log label of the unit"""
+        window = self.dates[0] if len(self.dates) == 1 else f"{self.dates[0]}..{self.dates[-1]}"
+        return f"{self.provider}/{self.what_to_show}/{self.granularity}/{self.ticker}-{window}"
+
+    @property
+    def contract_key(self) -> tuple:
+        """Identifies the instrument the request is made for"""
+        return (self.provider, self.ticker, self.contract_type, self.exchange, self.currency)
+
+    @property
+    def request_key(self) -> tuple:
+        """Identifies an identical provider request (same contract, bar size, end date and data type)"""
+        return (*self.contract_key, self.granularity, self.dates[0], self.dates[-1], self.what_to_show)
+
+
+class SlidingWindowLimiter:
+    """Sliding-window log limiter allowing at most limit sends within any trailing window_seconds"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = max(1, limit)
+        self.window_seconds = window_seconds
+        self.sent = deque()
+
+    # Business Logic --------------------------------------------------------
+    def get_delay(self, now: float) -> float:
+        """Returns seconds until one more send fits the trailing window; forgets sends that left it"""
+        while self.sent and self.sent[0] <= now - self.window_seconds:
+            self.sent.popleft()
+        return 0.0 if len(self.sent) < self.limit else self.sent[0] + self.window_seconds - now
+
+    def record(self, now: float):
+        """Logs a send at now"""
+        self.sent.append(now)
+
+
+class ProviderPacer:
+    """Pacing budget of one provider: in-flight limit, global and per-contract sliding-window limits and identical-request cooldown"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, pacing: dict):
+        self.pacing = pacing
+        self.max_concurrent = max(1, pacing['max_concurrent_requests'])
+        self.limiter = SlidingWindowLimiter(pacing['requests_per_window'], pacing['window_seconds'])
+        self.contract_limiters = {}
+        self.identical_cooldown_seconds = pacing['identical_request_cooldown_seconds']
+        self.last_requests = {}
+
+    # Business Logic --------------------------------------------------------
+    async def acquire(self, unit: DownloadUnit, page: bool = False) -> float:
+        """Waits until unit may be sent to the provider and charges it; page charges a further call of an already paced unit, without the cooldown; returns seconds waited"""
+        started = time.monotonic()
+        contract_limiter = self.contract_limiters.get(unit.contract_key)
+        if contract_limiter is None:
+            contract_limiter = SlidingWindowLimiter(self.pacing['contract_requests_per_window'], self.pacing['contract_window_seconds'])
+            self.contract_limiters[unit.contract_key] = contract_limiter
+        while True:
+            now = time.monotonic()
+            last = None if page else self.last_requests.get(unit.request_key)
+            delay = max(contract_limiter.get_delay(now), self.limiter.get_delay(now), 0.0 if last is None else last + self.identical_cooldown_seconds - now)
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        # Checked and charged without an await in between, so concurrent workers cannot share the last slot or the same request's cooldown
+        contract_limiter.record(now)
+        self.limiter.record(now)
+        if not page:
+            self.last_requests[unit.request_key] = now
+        return now - started
+
+
+class DownloadScheduler:
+    """Runs queued download units concurrently per provider within each provider's pacing budget"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, config: Config):
+        self.config = config
+        self.pacers = {}
+
+    # Business Logic --------------------------------------------------------
+    def get_pacer(self, provider: str) -> ProviderPacer:
+        """Returns the pacer for provider; pacers persist across cycles so budgets carry over"""
+        if provider not in self.pacers:
+            self.pacers[provider] = ProviderPacer(self.config.get_pacing(provider))
+        return self.pacers[provider]
+
+    async def run(self, units: list[DownloadUnit], handler):
+        """Runs await handler(unit) for every unit, keeping queue order per provider"""
+        queues = {}
+        for unit in units:
+            queues.setdefault(unit.provider, asyncio.Queue()).put_nowait(unit)
+        if not queues:
+            return
+        stats = {provider: {'requests': 0, 'paced_seconds': 0.0} for provider in queues}
+        started = time.monotonic()
+        workers = []
+        for provider, queue in queues.items():
+            pacer = self.get_pacer(provider)
+            print(f"SCHEDULER: {provider} - {queue.qsize()} request(s) queued, {pacer.max_concurrent} concurrent")
+            workers += [asyncio.create_task(self._worker(queue, pacer, handler, stats[provider])) for _ in range(pacer.max_concurrent)]
+        reporter = asyncio.create_task(self._report_throughput(stats, started))
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for worker in workers:
+                worker.cancel()
+        self._log_throughput(stats, started)
+
+    async def _worker(self, queue: asyncio.Queue, pacer: ProviderPacer, handler, stats: dict):
+        """Takes units from queue until it is empty"""
+        while True:
+            try:
+                unit = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            METRICS.set_gauge('scheduler_queue_depth', queue.qsize(), provider=unit.provider)
+            waited = await pacer.acquire(unit)
+            METRICS.observe('pacing_wait_seconds', waited, provider=unit.provider)
+            stats['paced_seconds'] += waited
+            await handler(unit)
+            stats['requests'] += 1
+
+    async def _report_throughput(self, stats: dict, started: float):
+        """Logs throughput periodically while units are running"""
+        while True:
+            await asyncio.sleep(self.config.throughput_log_seconds)
+            self._log_throughput(stats, started)
+
+    # Misc ------------------------------------------------------------------
+    def _log_throughput(self, stats: dict, started: float):
+        """Prints requests/minute per provider since started"""
+        elapsed_minutes = max(time.monotonic() - started, 1e-9) / 60
+        for provider, provider_stats in stats.items():
+            rate = provider_stats['requests'] / elapsed_minutes
+            print(f"THROUGHPUT: {provider} - {provider_stats['requests']} request(s), {rate:.1f} requests/min, {provider_stats['paced_seconds']:.1f}s waiting on pacing")
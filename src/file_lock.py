@@ -0,0 +1,51 @@
+import fcntl
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class FileLock:
+    """Lock shared by processes through flock on a lock file; threads of one process also serialize on it"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, lock_path):
+        self.lock_path = Path(lock_path)
+        self.thread_lock = threading.Lock()
+        self.lock_file = None
+
+    # Business Logic --------------------------------------------------------
+    def acquire(self, shared: bool = False):
+        """Blocks until held; shared holders of other processes only exclude exclusive ones"""
+        self.thread_lock.acquire()
+        try:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            self.lock_file = open(self.lock_path, 'ab')
+            fcntl.flock(self.lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        except BaseException:
+            if self.lock_file:
+                self.lock_file.close()
+                self.lock_file = None
+            self.thread_lock.release()
+            raise
+
+    def release(self):
+        """Releases the lock; closing the lock file drops the flock"""
+        self.lock_file.close()
+        self.lock_file = None
+        self.thread_lock.release()
+
+    @contextmanager
+    def shared(self):
+        """Holds the lock shared for the with block"""
+        self.acquire(shared=True)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
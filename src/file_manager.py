@@ -1,54 +1,129 @@
 import os
+import threading
 import pandas as pd
 from pathlib import Path
 
+from src.file_lock import FileLock
+from src.metrics import METRICS
+from src.status_store import FILE_STEM_PATTERN, StatusStore
+from src.storage.base_storage import StorageBackend
+from src.storage.csv_storage import CsvStorage
+
 class FileManager:
-    """Manages CSV files and flag files for data downloads"""
+    """Manages stored bar data through a storage backend and the download status manifest"""
 
     # LifeCycle -------------------------------------------------------------
     def __init__(self, config):
         self.base_dir = Path(config.processed_data_dir)
         self.raw_data_dir = Path(config.raw_data_dir)
+        self.status_store = StatusStore(self.raw_data_dir)
+        self.storage = self._create_storage(config.storage_backend)
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+
+    def _create_storage(self, backend: str) -> StorageBackend:
+        """Returns storage backend by name; parquet is imported only when selected"""
+        if backend == 'csv':
+            return CsvStorage(self.raw_data_dir, self.base_dir)
+        if backend == 'parquet':
+            from src.storage.parquet_storage import ParquetStorage
+            return ParquetStorage(self.raw_data_dir, self.base_dir)
+        raise ValueError(f"Unsupported storage backend: {backend}")
 
     # Business Logic --------------------------------------------------------
-    def get_file_status(self, file_path):
+    def get_status(self, ticker: str, granularity: str, date_str: str, what_to_show: str, provider: str):
         """Returns 'completed', 'corrupted', 'incomplete', 'not_available', or None"""
-        path = Path(file_path)
-        if path.with_suffix('.cpl').exists():
-            return 'completed'
-        if path.with_suffix('.crp').exists():
-            return 'corrupted'
-        if path.with_suffix('.icl').exists():
-            return 'incomplete'
-        if path.with_suffix('.na').exists():
-            return 'not_available'
-        return None
+        return self.status_store.get(provider, what_to_show, granularity, ticker, date_str)
+
+    def set_status(self, ticker: str, granularity: str, date_str: str, what_to_show: str, provider: str, status):
+        """Sets status (completed/corrupted/incomplete/not_available, or None to clear)"""
+        self.status_store.set(provider, what_to_show, granularity, ticker, date_str, status)
+
+    def get_pending_dates(self, ticker: str, granularity: str, dates: list[str], what_to_show: str, provider: str) -> list[str]:
+        """Returns the dates, in order, that still need to be downloaded"""
+        return self.status_store.get_pending_dates(provider, what_to_show, granularity, ticker, dates)
+
+    def refresh_status(self):
+        """Loads status changes other processes appended to the shared manifest"""
+        self.status_store.refresh()
+
+    def get_open_dates(self, ticker: str, granularity: str, what_to_show: str, provider: str) -> set:
+        """Returns tracked dates that were attempted but are not done (corrupted/incomplete)"""
+        return self.status_store.get_open_dates(provider, what_to_show, granularity, ticker)
+
+    def get_file_status(self, file_path):
+        """Returns status of a CSV-layout file path: 'completed', 'corrupted', 'incomplete', 'not_available', or None"""
+        return self.get_status(*self._parse_file_path(file_path))
 
     def mark_status(self, file_path, status):
-        """Marks file with status flag (completed/corrupted/incomplete)"""
-        path = Path(file_path)
-        for ext in ['.cpl', '.crp', '.icl', '.na']:
-            path.with_suffix(ext).unlink(missing_ok=True)
-        if status == 'completed':
-            path.with_suffix('.cpl').touch()
-        elif status == 'corrupted':
-            path.with_suffix('.crp').touch()
-        elif status == 'incomplete':
-            path.with_suffix('.icl').touch()
-        elif status == 'not_available':
-            path.with_suffix('.na').touch()
+        """Marks CSV-layout file path with status (completed/corrupted/incomplete/not_available)"""
+        self.set_status(*self._parse_file_path(file_path), status)
 
     def get_file_path(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str):
-        """Returns path for CSV file based on provider, whatToShow and granularity"""
-        granularity_dir = (self.raw_data_dir if is_raw else self.base_dir) / provider / what_to_show / granularity
-        granularity_dir.mkdir(parents=True, exist_ok=True)
-        return granularity_dir / f"{ticker}-{date_str}.csv"
+        """Returns path of the file holding the bars of ticker on date_str in the configured backend"""
+        return self.storage.get_file_path(ticker, granularity, date_str, is_raw, what_to_show, provider)
+
+    def _parse_file_path(self, file_path) -> tuple:
+        """Returns (ticker, granularity, date_str, what_to_show, provider) of a path built by get_file_path"""
+        path = Path(file_path)
+        match = FILE_STEM_PATTERN.match(path.stem)
+        if not match:
+            raise ValueError(f"Not a data file path: {path}")
+        provider, what_to_show, granularity = path.parts[-4:-1]
+        return match['ticker'], granularity, match['date'], what_to_show, provider
 
 
     # IO --------------------------------------------------------------------
+    def write_data(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str, data) -> Path:
+        """Writes bars through the storage backend; raw writes mark the date completed"""
+        file_path = self.storage.write(ticker, granularity, date_str, is_raw, what_to_show, provider, data)
+        if is_raw:
+            self.set_status(ticker, granularity, date_str, what_to_show, provider, 'completed')
+        return file_path
+
+    def commit_data(self, ticker: str, granularity: str, date_str: str, what_to_show: str, provider: str, raw_data, processed_data, status: str = 'completed'):
+        """Stages raw and processed files, renames both into place and only then marks the date with status (incomplete for a partial day)"""
+        with self.get_write_lock(ticker, granularity, what_to_show, provider), METRICS.timer('write_seconds', provider=provider, granularity=granularity):
+            staged = []
+            try:
+                staged.append(self.storage.stage(ticker, granularity, date_str, True, what_to_show, provider, raw_data))
+                staged.append(self.storage.stage(ticker, granularity, date_str, False, what_to_show, provider, processed_data))
+            except Exception:
+                for tmp_path, _ in staged:
+                    tmp_path.unlink(missing_ok=True)
+                raise
+            METRICS.inc('bytes_written_total', sum(tmp_path.stat().st_size for tmp_path, _ in staged), provider=provider)
+            for tmp_path, file_path in staged:
+                os.replace(tmp_path, file_path)
+            self.set_status(ticker, granularity, date_str, what_to_show, provider, status)
+
+    def get_write_lock(self, ticker: str, granularity: str, what_to_show: str, provider: str) -> FileLock:
+        """Returns the lock serializing writes of one (provider, what_to_show, granularity, ticker) across threads and processes, compaction included"""
+        key = (provider, what_to_show, granularity, ticker)
+        with self.locks_lock:
+            if key not in self.locks:
+                self.locks[key] = FileLock(self.get_write_lock_path(ticker, granularity, what_to_show, provider))
+            return self.locks[key]
+
+    def get_write_lock_path(self, ticker: str, granularity: str, what_to_show: str, provider: str) -> Path:
+        """Returns the lock file behind get_write_lock, for processes that write without a FileManager"""
+        return self.raw_data_dir / 'locks' / f"{provider}_{what_to_show}_{granularity}_{ticker}.lock"
+
+    def locate_data(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> Path:
+        """Returns path of the file (CSV, segment or partition) holding ticker's bars on date_str, or None"""
+        return self.storage.locate(ticker, granularity, date_str, is_raw, what_to_show, provider)
+
+    def read_data(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> pd.DataFrame:
+        """Returns stored bars of ticker on date_str, or None"""
+        return self.storage.read(ticker, granularity, date_str, is_raw, what_to_show, provider)
+
+    def read_located_data(self, file_path: Path, dates: list[str]) -> dict:
+        """Returns {date_str: bars or None} of dates locate_data found in file_path, reading the file once where the backend allows"""
+        return self.storage.read_file_dates(file_path, dates)
+
     def write_csv(self, file_path, data, is_raw:bool):
         """Writes DataFrame to CSV and marks as complete"""
-        df = pd.DataFrame(data)
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
         df.to_csv(file_path, index=False)
         if is_raw:
             self.mark_status(file_path, 'completed')
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+
+from src.configuration.config import Config
+from src.configuration.download_requests_parser import DownloadRequestsParser
+from src.file_manager import FileManager
+from src.metrics import METRICS
+from src.normalization_tracker import NormalizationTracker
+from src.providers.base_client import ProviderClient
+from src.status_store import DONE_STATUSES
+
+
+class LiveStream:
+    """Streams finished intraday bars of live download requests into the current day's partition; closed days are left incomplete for the backfill"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, provider_clients: dict[str, ProviderClient], file_manager: FileManager, download_requests_parser: DownloadRequestsParser, config: Config, normalization_trackers: dict[tuple[str, str], NormalizationTracker]):
+        self.provider_clients = provider_clients
+        self.file_manager = file_manager
+        self.download_requests_parser = download_requests_parser
+        self.config = config
+        self.normalization_trackers = normalization_trackers
+        self.sessions = {}
+
+    # Business Logic --------------------------------------------------------
+    async def run(self):
+        """Follows every intraday ticker/granularity of requests with "live": true until cancelled; a stream starts once its provider is in provider_clients"""
+        streams = [(request, ticker, granularity) for request in self.download_requests_parser.get_download_requests()
+                   if request.get('live')
+                   for ticker in request['tickers'] for granularity in request['granularities'] if not self._is_major_granularity(granularity)]
+        if not streams:
+            print("LIVE: no download request has \"live\": true")
+            return
+        flusher = asyncio.create_task(self._flush_periodically())
+        try:
+            await asyncio.gather(*[self._follow(request, ticker, granularity) for request, ticker, granularity in streams])
+        finally:
+            flusher.cancel()
+            for key in list(self.sessions):
+                await self._flush(key)
+
+    async def _follow(self, download_request: dict, ticker: str, granularity: str):
+        """Consumes one bar stream, resubscribing after errors and waiting for the next day once a stream ends"""
+        provider = download_request.get('provider', 'ibkr')
+        what_to_show = download_request.get('whatToShow', 'TRADES')
+        key = (provider, what_to_show, granularity, ticker)
+        # provider_clients is filled as providers connect, so wait for this one
+        if provider not in self.provider_clients:
+            print(f"LIVE: waiting for {provider} to connect before subscribing {what_to_show}/{granularity}/{ticker}")
+        while provider not in self.provider_clients:
+            await asyncio.sleep(self.config.connection_retry_seconds)
+        client = self.provider_clients[provider]
+        while True:
+            try:
+                print(f"LIVE: subscribing {provider}/{what_to_show}/{granularity}/{ticker}")
+                async for bar in client.stream_bars(ticker, granularity, download_request.get('currency', 'USD'), download_request.get('exchange', 'SMART'),
+                                                    download_request.get('type', 'Stock'), what_to_show):
+                    await self._on_bar(key, bar)
+                await self._close_day(key)
+                await asyncio.sleep(self._get_seconds_until_tomorrow())
+            except NotImplementedError as e:
+                print(f"LIVE: {e}")
+                return
+            except Exception as e:
+                print(f"LIVE: {provider}/{what_to_show}/{granularity}/{ticker} stream failed - {e}; resubscribing in {self.config.connection_retry_seconds} seconds")
+                await asyncio.sleep(self.config.connection_retry_seconds)
+
+    async def _on_bar(self, key: tuple, bar: dict):
+        """Adds a finished bar to its day's session; a bar of a later day closes the previous day first"""
+        provider, what_to_show, granularity, ticker = key
+        date_str = pd.Timestamp(bar['date']).strftime('%Y-%m-%d')
+        session = self.sessions.get(key)
+        if session is not None and session['date_str'] != date_str:
+            await self._close_day(key)
+            session = None
+        if session is None:
+            if self.file_manager.get_status(ticker, granularity, date_str, what_to_show, provider) in DONE_STATUSES:
+                # Replayed bars of a day the backfill already completed
+                return
+            session = {'date_str': date_str, 'bars': {}, 'dirty': False, 'lock': asyncio.Lock()}
+            self.sessions[key] = session
+        session['bars'][bar['date']] = bar
+        session['dirty'] = True
+        METRICS.inc('live_bars_total', provider=provider, granularity=granularity)
+
+    async def _close_day(self, key: tuple):
+        """Writes the last bars of the session's day and hands the day to the backfill, which replaces it with the full historical day"""
+        session = self.sessions.get(key)
+        if session is None:
+            return
+        await self._flush(key)
+        del self.sessions[key]
+        provider, what_to_show, granularity, ticker = key
+        print(f"LIVE: {provider}/{what_to_show}/{granularity}/{ticker}-{session['date_str']} closed with {len(session['bars'])} bar(s), left incomplete for backfill")
+
+    async def _flush_periodically(self):
+        """Writes sessions with new bars every flush_seconds"""
+        while True:
+            await asyncio.sleep(self.config.live_flush_seconds)
+            for key in list(self.sessions):
+                await self._flush(key)
+
+    async def _flush(self, key: tuple):
+        """Rewrites the session's day partition with all bars received so far, marked incomplete"""
+        session = self.sessions.get(key)
+        if session is None:
+            return
+        async with session['lock']:
+            if not session['dirty']:
+                return
+            session['dirty'] = False
+            provider, what_to_show, granularity, ticker = key
+            if self.file_manager.get_status(ticker, granularity, session['date_str'], what_to_show, provider) in DONE_STATUSES:
+                return
+            frame = pd.DataFrame([session['bars'][bar_date] for bar_date in sorted(session['bars'])])
+            normalization_tracker = self.normalization_trackers[(provider, what_to_show)]
+            normalization_tracker.update_entry(ticker, granularity, frame)
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write_session, key, session['date_str'], frame, normalization_tracker)
+            except Exception as e:
+                session['dirty'] = True
+                print(f"LIVE: FAILED writing {provider}/{what_to_show}/{granularity}/{ticker}-{session['date_str']} - {e}")
+                return
+            METRICS.observe('live_flush_seconds', time.perf_counter() - started, provider=provider)
+
+    def _write_session(self, key: tuple, date_str: str, frame: pd.DataFrame, normalization_tracker: NormalizationTracker):
+        """Normalizes and commits a partial day as incomplete; runs in a worker thread"""
+        provider, what_to_show, granularity, ticker = key
+        normalized = normalization_tracker.normalize_frame(ticker, granularity, frame)
+        self.file_manager.commit_data(ticker, granularity, date_str, what_to_show, provider, frame, normalized, 'incomplete')
+
+    # Misc ------------------------------------------------------------------
+    def _is_major_granularity(self, granularity: str) -> bool:
+        """Returns True if granularity is 1D or larger"""
+        return granularity.endswith('D') or granularity.endswith('W')
+
+    def _get_seconds_until_tomorrow(self) -> float:
+        """Returns seconds until local midnight"""
+        now = datetime.now()
+        return (now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1) - now).total_seconds()
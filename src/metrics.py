@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Histogram bucket upper bounds in seconds, from fast cache hits to slow historical requests
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms keyed by metric name and label values"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, prefix: str = 'datahandler'):
+        self.prefix = prefix
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = {}
+        self.lock = threading.Lock()
+
+    # Business Logic --------------------------------------------------------
+    def inc(self, name: str, value: float = 1, **labels):
+        """Adds value to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Sets a gauge to value"""
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Records value in a histogram with LATENCY_BUCKETS"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = {'buckets': [0] * len(LATENCY_BUCKETS), 'count': 0, 'sum': 0.0}
+                self.histograms[key] = histogram
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['count'] += 1
+            histogram['sum'] += value
+
+    def describe(self, name: str, text: str):
+        """Sets the HELP text of a metric"""
+        self.help[name] = text
+
+    def timer(self, name: str, **labels):
+        """Returns a context manager observing the elapsed seconds of its block in histogram name"""
+        return Timer(self, name, labels)
+
+    def snapshot(self) -> dict:
+        """Returns all metrics as JSON-serializable {'counters', 'gauges', 'histograms'} lists"""
+        with self.lock:
+            return {'timestamp': time.time(),
+                    'counters': [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in self.counters.items()],
+                    'gauges': [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in self.gauges.items()],
+                    'histograms': [{'name': name, 'labels': dict(labels), 'count': histogram['count'], 'sum': histogram['sum'],
+                                    'buckets': dict(zip([str(bound) for bound in LATENCY_BUCKETS], histogram['buckets']))}
+                                   for (name, labels), histogram in self.histograms.items()]}
+
+    def to_prometheus(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for kind, metrics in [('counter', self.counters), ('gauge', self.gauges)]:
+                for name in sorted({name for name, _ in metrics}):
+                    lines += self._format_header(name, kind)
+                    lines += [f"{self.prefix}_{name}{self._format_labels(labels)} {value}" for (metric, labels), value in metrics.items() if metric == name]
+            for name in sorted({name for name, _ in self.histograms}):
+                lines += self._format_header(name, 'histogram')
+                for (metric, labels), histogram in self.histograms.items():
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS, histogram['buckets']):
+                        cumulative += count
+                        lines.append(f"{self.prefix}_{name}_bucket{self._format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                    lines.append(f"{self.prefix}_{name}_bucket{self._format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                    lines.append(f"{self.prefix}_{name}_sum{self._format_labels(labels)} {histogram['sum']}")
+                    lines.append(f"{self.prefix}_{name}_count{self._format_labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    # Misc ------------------------------------------------------------------
+    def _format_header(self, name: str, kind: str) -> list[str]:
+        """Returns the HELP and TYPE lines of a metric"""
+        header = [f"# HELP {self.prefix}_{name} {self.help[name]}"] if name in self.help else []
+        return header + [f"# TYPE {self.prefix}_{name} {kind}"]
+
+    def _format_labels(self, labels: tuple) -> str:
+        """Formats label pairs as {key="value",...}"""
+        if not labels:
+            return ''
+        escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in labels]
+        return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class Timer:
+    """Context manager recording the elapsed seconds of its block in a histogram"""
+
+    def __init__(self, registry: MetricsRegistry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+
+class MetricsExporter:
+    """Serves the registry as a Prometheus text endpoint on a local aiohttp server and writes periodic JSON snapshots"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, registry: MetricsRegistry, host: str, port: int, snapshot_file: str, snapshot_seconds: int):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.snapshot_file = Path(snapshot_file) if snapshot_file else None
+        self.snapshot_seconds = snapshot_seconds
+        self.runner = None
+        self.snapshot_task = None
+
+    async def start(self):
+        """Starts the HTTP endpoint if a port is configured and the snapshot task if a snapshot file is configured; aiohttp is imported only for the endpoint"""
+        if self.port:
+            from aiohttp import web
+            app = web.Application()
+            app.router.add_get('/metrics', self._handle_metrics)
+            app.router.add_get('/metrics.json', self._handle_snapshot)
+            self.runner = web.AppRunner(app, access_log=None)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, self.host, self.port).start()
+            print(f"METRICS: serving http://{self.host}:{self.port}/metrics")
+        if self.snapshot_file:
+            self.snapshot_task = asyncio.create_task(self._write_snapshots())
+
+    async def stop(self):
+        """Stops the HTTP endpoint and writes a last snapshot"""
+        if self.snapshot_task:
+            self.snapshot_task.cancel()
+            self.write_snapshot()
+        if self.runner:
+            await self.runner.cleanup()
+
+    # Business Logic --------------------------------------------------------
+    async def _handle_metrics(self, request):
+        """Returns metrics in the Prometheus text format"""
+        from aiohttp import web
+        return web.Response(text=self.registry.to_prometheus(), content_type='text/plain', charset='utf-8', headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def _handle_snapshot(self, request):
+        """Returns the JSON snapshot"""
+        from aiohttp import web
+        return web.json_response(self.registry.snapshot())
+
+    async def _write_snapshots(self):
+        """Writes the JSON snapshot every snapshot_seconds"""
+        while True:
+            await asyncio.sleep(self.snapshot_seconds)
+            self.write_snapshot()
+
+    # IO --------------------------------------------------------------------
+    def write_snapshot(self):
+        """Atomically writes the JSON snapshot"""
+        self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_file.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.registry.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.snapshot_file)
+
+
+# Process-wide registry the download hot path records into
+METRICS = MetricsRegistry()
+METRICS.describe('fetch_seconds', 'Provider historical data request latency')
+METRICS.describe('contract_lookup_seconds', 'Contract qualification / instrument lookup latency on cache misses')
+METRICS.describe('pacing_wait_seconds', 'Time a unit waited on its provider pacing budget')
+METRICS.describe('write_seconds', 'Time to stage and commit the raw and processed files of one date')
+METRICS.describe('bytes_written_total', 'Bytes of committed raw and processed files')
+METRICS.describe('dates_total', 'Dates finished per final status')
+METRICS.describe('unit_failures_total', 'Failed download units per provider and error class')
+METRICS.describe('write_queue_depth', 'Writes queued or running in the write pipeline')
+METRICS.describe('scheduler_queue_depth', 'Units waiting in the scheduler queue per provider')
+METRICS.describe('live_bars_total', 'Finished bars received from live streams')
+METRICS.describe('live_flush_seconds', 'Time to write a live session to its day partition')
+METRICS.describe('normalization_versions_total', 'Times a ticker-granularity max value grew, leaving earlier processed files to re-normalize')
+METRICS.describe('cycle_seconds', 'Duration of a download cycle')
+METRICS.describe('last_cycle_timestamp_seconds', 'Unix time the last download cycle finished')
@@ -1,72 +1,233 @@
 import json
+import os
+import time
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+from src.file_lock import FileLock
+
+# Bookkeeping keys stored next to the max values of an entry; never part of a max vector
+META_KEYS = ('version', 'renormalized_version')
+
 
 class NormalizationTracker:
     """Tracks normalization values for ticker-granularity combinations."""
 
     # LifeCycle
     # -------------------------------------------------------------------------
-    def __init__(self, base_dir: str, provider: str, what_to_show: str):
-        """Initialize tracker and load existing data from JSON file."""
+    def __init__(self, base_dir: str, provider: str, what_to_show: str, flush_interval_seconds: int = 60, compact_after_entries: int = 1000):
+        """Initialize tracker and load existing data from the JSON snapshot and its journal."""
         self.file_path = Path(base_dir) / provider / f"{what_to_show}_normalization.json"
+        self.journal_path = self.file_path.with_suffix('.journal')
+        self.flush_interval_seconds = flush_interval_seconds
+        self.compact_after_entries = compact_after_entries
         self.data = {}
-        if not self.file_path.exists():
-            self.file_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.file_path, 'w') as f:
-                json.dump([], f)
+        self.max_vectors = {}
+        self.pending = []
+        self.journal_entries = 0
+        self.journal_offset = 0
+        self.last_flush = time.monotonic()
+        # Appends and replays hold the lock shared, compaction exclusive; the loaded snapshot stays open so its inode identifies it until replaced
+        self.lock = FileLock(self.file_path.with_suffix('.lock'))
+        self.snapshot_file = None
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            if not self.file_path.exists():
+                with open(self.file_path, 'w') as f:
+                    json.dump([], f)
+        self.refresh()
 
-        with open(self.file_path, 'r') as f:
-            entries = json.load(f)
-            for entry in entries:
-                key = (entry['ticker'], entry['granularity'])
-                self.data[key] = {k: v for k, v in entry.items() if k not in ['ticker', 'granularity']}
+    def close(self):
+        """Close the loaded snapshot file; pending entries are not flushed."""
+        if self.snapshot_file:
+            self.snapshot_file.close()
+            self.snapshot_file = None
 
     # Business Logic
     # -------------------------------------------------------------------------
 
-    def normalize_value(self, ticker: str, granularity: str, values: list[dict]) -> float:
-        """Normalize a value based on stored normalization data."""
-        key = (ticker, granularity)
-        norm_data = self.data[key]
-
-        ret=[]
-        for value in values:
-            normalized={'date': value['date']}
-            normalized.update({k: value[k] / norm_data[k] * 2 - 1 for k in value.keys() if k!='date'})
-            ret.append(normalized)
-        return ret
-
-    def unnormalize_value(self, ticker: str, granularity: str, values: list[dict]) -> float:
-        """Unnormalize a value based on stored normalization data."""
-        key = (ticker, granularity)
-        norm_data = self.data[key]
-
-        ret=[]
-        for value in values:
-            normalized={'date': value['date']}
-            normalized.update({k: norm_data[k] * (value[k] + 1) / 2 for k in value.keys() if k!='date'})
-            ret.append(normalized)
-        return ret
+    def normalize_value(self, ticker: str, granularity: str, values: list[dict]) -> list[dict]:
+        """Normalize a list of bar dicts based on stored normalization data."""
+        if not values:
+            return []
+        return self.normalize_frame(ticker, granularity, pd.DataFrame(values)).to_dict('records')
+
+    def unnormalize_value(self, ticker: str, granularity: str, values: list[dict]) -> list[dict]:
+        """Unnormalize a list of bar dicts based on stored normalization data."""
+        if not values:
+            return []
+        return self.unnormalize_frame(ticker, granularity, pd.DataFrame(values)).to_dict('records')
+
+    def normalize_frame(self, ticker: str, granularity: str, frame):
+        """Normalize a DataFrame or dict of NumPy columns to [-1, 1] in one broadcast operation."""
+        columns = [col for col in frame.keys() if col != 'date']
+        scaled = self._to_matrix(frame, columns) / self._get_max_vector(ticker, granularity, columns) * 2 - 1
+        return self._from_matrix(frame, columns, scaled)
+
+    def unnormalize_frame(self, ticker: str, granularity: str, frame):
+        """Unnormalize a DataFrame or dict of NumPy columns in one broadcast operation."""
+        columns = [col for col in frame.keys() if col != 'date']
+        scaled = self._get_max_vector(ticker, granularity, columns) * (self._to_matrix(frame, columns) + 1) / 2
+        return self._from_matrix(frame, columns, scaled)
+
+    def _get_max_vector(self, ticker: str, granularity: str, columns: list[str]) -> np.ndarray:
+        """Return cached max values of ticker-granularity as a NumPy vector ordered like columns."""
+        key = (ticker, granularity, tuple(columns))
+        if key not in self.max_vectors:
+            norm_data = self.get_max_values(ticker, granularity)
+            self.max_vectors[key] = np.array([norm_data[col] for col in columns], dtype=np.float64)
+        return self.max_vectors[key]
+
+    def _to_matrix(self, frame, columns: list[str]) -> np.ndarray:
+        """Stack value columns of a DataFrame or dict of arrays into a float matrix."""
+        if isinstance(frame, pd.DataFrame):
+            return frame[columns].to_numpy(dtype=np.float64)
+        return np.column_stack([np.asarray(frame[col], dtype=np.float64) for col in columns])
+
+    def _from_matrix(self, frame, columns: list[str], matrix: np.ndarray):
+        """Rebuild the input container type with date column and scaled value columns."""
+        if isinstance(frame, pd.DataFrame):
+            result = pd.DataFrame(matrix, columns=columns, index=frame.index)
+            result.insert(0, 'date', frame['date'])
+            return result
+        return {'date': frame['date'], **{col: matrix[:, i] for i, col in enumerate(columns)}}
 
     def has_entry(self, ticker: str, granularity: str) -> bool:
         """Check if normalization entry exists for ticker-granularity combination."""
         return (ticker, granularity) in self.data
 
-    def add_entry(self, ticker: str, granularity: str, bar_data: list[dict]):
-        """Add normalization entry and save to JSON."""
-        df = pd.DataFrame(bar_data)
+    def get_max_values(self, ticker: str, granularity: str) -> dict:
+        """Return {column: max value} of ticker-granularity without the bookkeeping keys."""
+        return {k: v for k, v in self.data[(ticker, granularity)].items() if k not in META_KEYS}
+
+    def get_version(self, ticker: str, granularity: str) -> int:
+        """Return the version of ticker-granularity's max values; it grows each time a max value grows."""
+        return self.data[(ticker, granularity)]['version']
+
+    def get_stale_pairs(self) -> list[tuple[str, str]]:
+        """Return (ticker, granularity) pairs whose max values changed since their processed files were last re-normalized."""
+        return [key for key, norm_data in self.data.items() if norm_data['version'] != norm_data['renormalized_version']]
+
+    def add_entry(self, ticker: str, granularity: str, bar_data):
+        """Add normalization entry from a DataFrame (used as is) or list of bar dicts; it is journaled at once, before files scaled with it are written."""
+        df = bar_data if isinstance(bar_data, pd.DataFrame) else pd.DataFrame(bar_data)
         max_values = {col: float(df[col].max()) or 1.0 for col in df.columns if col != 'date'}
-        self.data[(ticker, granularity)] = max_values
-        self._save()
+        self._record(ticker, granularity, {**max_values, 'version': 1, 'renormalized_version': 1}, durable=True)
+
+    def update_entry(self, ticker: str, granularity: str, bar_data) -> bool:
+        """Add the entry, or raise its max values to the running max of bar_data under a new version journaled at once; return True if the version changed."""
+        if not self.has_entry(ticker, granularity):
+            self.add_entry(ticker, granularity, bar_data)
+            return False
+        df = bar_data if isinstance(bar_data, pd.DataFrame) else pd.DataFrame(bar_data)
+        norm_data = self.data[(ticker, granularity)]
+        bar_max = {col: float(df[col].max()) for col in df.columns if col != 'date'}
+        grown = {col: value for col, value in bar_max.items() if col not in norm_data or value > norm_data[col]}
+        if not grown:
+            return False
+        self._record(ticker, granularity, {**norm_data, **grown, 'version': norm_data['version'] + 1}, durable=True)
+        return True
+
+    def mark_renormalized(self, ticker: str, granularity: str, version: int):
+        """Record that all processed files of ticker-granularity are normalized with the max values of version.
+        Only a marker is journaled and merged into the current entry, so max values another process raised meanwhile are kept and the pair stays stale."""
+        with self.lock.shared():
+            self._replay()
+            entry = {'ticker': ticker, 'granularity': granularity, 'renormalized_version': version}
+            self._apply_entry(entry)
+            self.pending.append(entry)
+        if time.monotonic() - self.last_flush >= self.flush_interval_seconds:
+            self.flush()
 
+    def _record(self, ticker: str, granularity: str, values: dict, durable: bool = False):
+        """Apply an entry in memory and queue it for the next batch flush; durable flushes at once."""
+        entry = {'ticker': ticker, 'granularity': granularity, **values}
+        self._apply_entry(entry)
+        self.pending.append(entry)
+        # Processed files scaled with new max values are committed right after; if the entry were lost in a crash,
+        # its version would restart and get_stale_pairs could never flag those files
+        if durable or time.monotonic() - self.last_flush >= self.flush_interval_seconds:
+            self.flush()
+
+    def _apply_entry(self, entry: dict):
+        """Merge a JSON entry (a full entry or a renormalized marker) into memory and drop its cached max vectors; entries written before versioning start at version 1."""
+        key = (entry['ticker'], entry['granularity'])
+        norm_data = {**self.data.get(key, {}), **{k: v for k, v in entry.items() if k not in ['ticker', 'granularity']}}
+        norm_data.setdefault('version', 1)
+        norm_data.setdefault('renormalized_version', norm_data['version'])
+        self.data[key] = norm_data
+        self.max_vectors = {vector_key: vector for vector_key, vector in self.max_vectors.items() if vector_key[:2] != key}
 
     # IO
     # -------------------------------------------------------------------------
-    def _save(self):
-        """Write in-memory data to JSON file."""
-        entries = [{'ticker': k[0], 'granularity': k[1], **v} for k, v in self.data.items()]
-        self.file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.file_path, 'w') as f:
-            json.dump(entries, f, indent=2)
+    def refresh(self):
+        """Replay journal lines appended since the last load, including other processes' lines; reloads everything if another process compacted."""
+        with self.lock.shared():
+            self._replay()
+
+    def flush(self):
+        """Append pending entries to the journal in one write; compact once the journal grows large (never when compact_after_entries is 0)."""
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+        with self.lock.shared():
+            # Replay first so the offset stays at a line boundary, then read our own lines back in journal order
+            self._replay()
+            with open(self.journal_path, 'a') as f:
+                f.write(''.join(json.dumps(entry) + '\n' for entry in self.pending))
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending = []
+            self._replay()
+        if self.compact_after_entries and self.journal_entries >= self.compact_after_entries:
+            self.compact()
+
+    def compact(self):
+        """Atomically rewrite the JSON snapshot and remove the journal under the exclusive lock, after replaying what other processes appended."""
+        with self.lock:
+            self._replay()
+            self.pending = []
+            entries = [{'ticker': k[0], 'granularity': k[1], **v} for k, v in self.data.items()]
+            tmp_path = self.file_path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_path)
+            self.journal_path.unlink(missing_ok=True)
+            self.snapshot_file.close()
+            self.snapshot_file = open(self.file_path, 'r')
+            self.journal_entries = 0
+            self.journal_offset = 0
+
+    def _replay(self):
+        """Reload the snapshot if compaction replaced it, then apply complete journal lines past the offset; a torn last line is left for later. Caller holds the lock."""
+        reloaded = self.snapshot_file is None or os.fstat(self.snapshot_file.fileno()).st_ino != os.stat(self.file_path).st_ino
+        if reloaded:
+            self._load_snapshot()
+        if self.journal_path.exists():
+            with open(self.journal_path, 'rb') as f:
+                f.seek(self.journal_offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    self._apply_entry(json.loads(line))
+                    self.journal_entries += 1
+                    self.journal_offset += len(line)
+        if reloaded:
+            # Entries recorded here but not flushed yet still apply on top
+            for entry in self.pending:
+                self._apply_entry(entry)
+
+    def _load_snapshot(self):
+        """Replace in-memory entries with the snapshot and rewind the journal offset. Caller holds the lock."""
+        if self.snapshot_file:
+            self.snapshot_file.close()
+        self.snapshot_file = open(self.file_path, 'r')
+        self.data = {}
+        self.max_vectors = {}
+        for entry in json.load(self.snapshot_file):
+            self._apply_entry(entry)
+        self.journal_entries = 0
+        self.journal_offset = 0
@@ -0,0 +1,34 @@
+import cProfile
+import io
+import pstats
+
+
+async def profile_cycle(run, output_file: str, profiler: str = 'cprofile'):
+    """Awaits run() under cProfile or yappi, writes the stats to output_file and prints the top entries"""
+    if profiler == 'yappi':
+        try:
+            import yappi
+        except ImportError as err:
+            raise ImportError("The yappi profiler requires yappi; install it with: pip install yappi") from err
+        # Wall clock so time spent awaiting the network is attributed to the waiting coroutines
+        yappi.set_clock_type('wall')
+        yappi.start()
+        try:
+            await run()
+        finally:
+            yappi.stop()
+            stats = yappi.get_func_stats()
+            stats.save(output_file, type='pstat')
+            yappi.clear_stats()
+    else:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await run()
+        finally:
+            profile.disable()
+            profile.dump_stats(output_file)
+    report = io.StringIO()
+    pstats.Stats(output_file, stream=report).sort_stats('cumulative').print_stats(25)
+    print(f"PROFILE: {profiler} stats of one cycle written to {output_file}")
+    print(report.getvalue())
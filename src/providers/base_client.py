@@ -1,4 +1,9 @@
 from abc import ABC, abstractmethod
+import pandas as pd
+
+# Columns of the bar batches providers return, in stored file order
+BAR_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'average', 'barCount']
+
 
 class ProviderClient(ABC):
     """Base class for data provider clients"""
@@ -13,7 +18,25 @@ class ProviderClient(ABC):
         """Disconnects from the provider"""
         pass
 
+    async def warm_up(self, download_requests: list[dict]):
+        """Resolves instruments of the download requests ahead of the first fetch; no-op by default"""
+        pass
+
+    def get_cache_stats(self) -> dict:
+        """Returns {cache name: {'entries', 'hits', 'misses'}} of the client's lookup caches"""
+        return {}
+
+    def get_max_window_days(self, granularity: str) -> int:
+        """Returns the most calendar days of intraday bars one request may cover; 1 disables coalescing"""
+        return 1
+
+    async def stream_bars(self, ticker: str, granularity: str, currency: str = 'USD', exchange: str = 'SMART', contract_type: str = 'Stock', what_to_show: str = 'TRADES'):
+        """Async iterator of finished bars (dicts with OHLCV fields) of the current session as they complete; providers without streaming raise NotImplementedError"""
+        raise NotImplementedError(f"{type(self).__name__} does not support live streaming")
+        yield
+
     @abstractmethod
-    async def fetch_historical_data(self, ticker: str, granularity: str, end_date: str, currency: str = 'USD', exchange: str = 'SMART', contract_type: str = 'Stock', what_to_show: str = 'TRADES') -> list[dict]:
-        """Fetches historical data; returns list of dicts with OHLCV fields"""
+    async def fetch_historical_data(self, ticker: str, granularity: str, end_date: str, currency: str = 'USD', exchange: str = 'SMART', contract_type: str = 'Stock', what_to_show: str = 'TRADES', duration_days: int = 1, pace=None) -> pd.DataFrame:
+        """Fetches historical data covering duration_days up to end_date; returns one columnar batch of BAR_COLUMNS with datetime64 dates, built without per-bar dicts.
+        Clients that need several provider calls for one request await pace(), if given, before each call after the first, so every call is charged against the pacing budget"""
         pass
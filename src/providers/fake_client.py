@@ -0,0 +1,113 @@
+import asyncio
+import random
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from src.providers.base_client import BAR_COLUMNS, ProviderClient
+
+
+class FakeClient(ProviderClient):
+    """Deterministic offline provider producing synthetic bars, for local runs, worker tests and benchmarks without a live gateway"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random(config.fake_seed)
+        self.request_times = deque()
+
+    async def connect(self):
+        """Nothing to connect to"""
+        print("Fake Client connected")
+
+    async def disconnect(self):
+        """Nothing to disconnect from"""
+        pass
+
+    # Business Logic --------------------------------------------------------
+    def _get_bar_seconds(self, granularity: str) -> int:
+        """Maps granularity to bar length in seconds"""
+        mapping = {'1S': 1, '5S': 5, '15S': 15, '30S': 30, '1M': 60, '5M': 300, '15M': 900, '30M': 1800, '1H': 3600, '1D': 86400, '1W': 604800}
+        return mapping.get(granularity, 86400)
+
+    def get_max_window_days(self, granularity: str) -> int:
+        """Mirrors IBKR's largest durations per bar size"""
+        mapping = {'5M': 7, '15M': 7, '30M': 30, '1H': 30}
+        return mapping.get(granularity, 1)
+
+    def _make_day(self, ticker: str, day: datetime, bar_seconds: int, what_to_show: str = 'TRADES') -> pd.DataFrame:
+        """Returns the regular-session bars of one day as a columnar batch, seeded by ticker and date so repeated calls match"""
+        rng = np.random.default_rng(zlib.crc32(f"{ticker}-{day:%Y-%m-%d}".encode()))
+        session_start = day.replace(hour=9, minute=30, second=0, microsecond=0)
+        count = max(1, 23400 // bar_seconds)
+        # U-shaped intraday activity: busy open and close, quiet lunch
+        activity = 1 + 2 * (np.linspace(-1, 1, count) ** 2)
+        step = 0.0004 * np.sqrt(bar_seconds / 60) * activity
+        base = 20 + zlib.crc32(ticker.encode()) % 480
+        closes = base * np.exp(np.cumsum(rng.normal(0, step)))
+        opens = np.concatenate([[base], closes[:-1]])
+        highs = np.maximum(opens, closes) * (1 + np.abs(rng.normal(0, step / 2)))
+        lows = np.minimum(opens, closes) * (1 - np.abs(rng.normal(0, step / 2)))
+        volumes = (rng.lognormal(6, 0.8, count) * activity * bar_seconds / 60).astype(np.int64)
+        averages = (highs + lows + closes) / 3
+        bar_counts = np.maximum(1, volumes // rng.integers(50, 200, count))
+        if what_to_show == 'BID_ASK':
+            # IBKR BID_ASK bars: open = average bid, high = max ask, low = min bid, close = average ask, no volume
+            spread = np.maximum(0.01, closes * 0.0002)
+            opens, highs, lows, closes = averages - spread / 2, highs + spread / 2, lows - spread / 2, averages + spread / 2
+            volumes = averages = bar_counts = np.full(count, -1)
+        return pd.DataFrame({'date': pd.date_range(session_start, periods=count, freq=f'{bar_seconds}s'), 'open': opens.round(2), 'high': highs.round(2),
+                             'low': lows.round(2), 'close': closes.round(2), 'volume': volumes.astype(np.int64), 'average': averages.round(4),
+                             'barCount': bar_counts.astype(np.int64)}, copy=False)
+
+    def _make_daily(self, ticker: str, day: datetime, what_to_show: str) -> dict:
+        """Returns one daily bar aggregated from the day's synthetic session"""
+        bars = self._make_day(ticker, day, 60, what_to_show)
+        return {'date': day.replace(hour=0, minute=0, second=0, microsecond=0), 'open': bars['open'].iat[0], 'high': bars['high'].max(), 'low': bars['low'].min(),
+                'close': bars['close'].iat[-1], 'volume': bars['volume'].sum() if bars['volume'].iat[0] >= 0 else -1,
+                'average': round(bars['average'].mean(), 4), 'barCount': bars['barCount'].sum() if bars['barCount'].iat[0] >= 0 else -1}
+
+    def _check_request(self):
+        """Raises like a live provider would: random failures and pacing rejections above the configured request rate"""
+        now = time.monotonic()
+        self.request_times.append(now)
+        while self.request_times[0] < now - self.config.fake_pacing_window_seconds:
+            self.request_times.popleft()
+        if self.config.fake_pacing_limit and len(self.request_times) > self.config.fake_pacing_limit:
+            raise ConnectionError("Fake pacing violation: historical data request pacing limit exceeded")
+        if self.rng.random() < self.config.fake_pacing_rejection_rate:
+            raise ConnectionError("Fake pacing violation: request rejected")
+        if self.rng.random() < self.config.fake_failure_rate:
+            raise TimeoutError("Fake failure: request timed out")
+
+    async def stream_bars(self, ticker: str, granularity: str, currency: str = 'USD', exchange: str = 'SMART', contract_type: str = 'Stock', what_to_show: str = 'TRADES'):
+        """Replays today's synthetic session: bars already finished at once, then each bar when it finishes, or every stream_interval_seconds if set"""
+        bar_seconds = self._get_bar_seconds(granularity)
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        interval = self.config.fake_stream_interval_seconds
+        if not interval and today.weekday() >= 5:
+            return
+        for i, bar in enumerate(self._make_day(ticker, today, bar_seconds, what_to_show).to_dict('records')):
+            if interval:
+                await asyncio.sleep(interval if i else 0)
+            else:
+                remaining = (bar['date'] + timedelta(seconds=bar_seconds) - datetime.now()).total_seconds()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+            yield bar
+
+    async def fetch_historical_data(self, ticker: str, granularity: str, end_date: str, currency: str = 'USD', exchange: str = 'SMART', contract_type: str = 'Stock', what_to_show: str = 'TRADES', duration_days: int = 1, pace=None) -> pd.DataFrame:
+        """Returns synthetic weekday bars covering duration_days up to end_date (the whole year for daily and weekly bars)"""
+        await asyncio.sleep(max(0.0, self.config.fake_latency_seconds + self.rng.uniform(-1, 1) * self.config.fake_latency_jitter_seconds))
+        self._check_request()
+        end = min(datetime.strptime(end_date, '%Y%m%d %H:%M:%S'), datetime.now())
+        bar_seconds = self._get_bar_seconds(granularity)
+        if bar_seconds >= 86400:
+            days = [end.replace(month=1, day=1) + timedelta(days=i) for i in range((end - end.replace(month=1, day=1)).days + 1)]
+            return pd.DataFrame([self._make_daily(ticker, day, what_to_show) for day in days if day.weekday() < 5], columns=BAR_COLUMNS)
+        days = [end - timedelta(days=i) for i in range(duration_days - 1, -1, -1) if (end - timedelta(days=i)).weekday() < 5]
+        if not days:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        return pd.concat([self._make_day(ticker, day, bar_seconds, what_to_show) for day in days], ignore_index=True)
@@ -1,6 +1,16 @@
-from ib_async import IB, Stock, Index, CFD
+from ib_async import IB, Contract, Stock, Index, CFD, RequestError
 import asyncio
-from src.providers.base_client import ProviderClient
+import dataclasses
+import functools
+from operator import attrgetter
+import numpy as np
+import pandas as pd
+from src.metrics import METRICS
+from src.providers.base_client import BAR_COLUMNS, ProviderClient
+from src.providers.provider_cache import ProviderCache
+
+# IB error codes meaning the contract itself is wrong (no security definition, ambiguous contract), so its cached qualification is dropped
+CONTRACT_ERROR_CODES = {200}
 
 
 class IBKRClient(ProviderClient):
@@ -9,36 +19,74 @@ class IBKRClient(ProviderClient):
     # LifeCycle -------------------------------------------------------------
     def __init__(self, config):
         self.config = config
-        self.ib = IB()
-        self.ib.disconnectedEvent += self._on_disconnected
+        self.client_ids = config.client_ids or [config.client_id]
+        self.connections = [IB() for _ in self.client_ids]
+        self.in_flight = [0] * len(self.connections)
+        self.next_connection = 0
+        self.connecting = set()
+        for index, ib in enumerate(self.connections):
+            ib.disconnectedEvent += functools.partial(self._on_disconnected, index)
+        self.contract_cache = ProviderCache(config.contract_cache_file, config.contract_cache_ttl_seconds)
 
     async def connect(self):
-        """Connects to IBKR Gateway/TWS with retry logic"""
+        """Connects every client ID of the pool concurrently; fails only if no connection comes up"""
+        results = await asyncio.gather(*[self._connect_one(index) for index in range(len(self.connections))], return_exceptions=True)
+        if not any(ib.isConnected() for ib in self.connections):
+            raise next(result for result in results if isinstance(result, Exception))
+
+    async def _connect_one(self, index):
+        """Connects one pool connection to IBKR Gateway/TWS with retry logic"""
+        if index in self.connecting:
+            return
+        self.connecting.add(index)
         max_attempts = 10
         current_attempt = 0
         delay_secs = 60
+        client_id = self.client_ids[index]
 
-        while current_attempt < max_attempts:
-            try:
-                await self.ib.connectAsync(self.config.host, self.config.port, clientId=self.config.client_id, timeout=20, readonly=True)
-                print(f"IBKR Client connected with host={self.config.host}, port={self.config.port}, clientId={self.config.client_id}")
-                break
-            except Exception as err:
-                current_attempt += 1
-                if current_attempt < max_attempts:
-                    print(f"Connection failed, retrying in {delay_secs} seconds... (attempt {current_attempt}/{max_attempts})")
-                    await asyncio.sleep(delay_secs)
-                else:
-                    raise Exception(f"Max reconnection attempts ({max_attempts}) exceeded") from err
+        try:
+            while current_attempt < max_attempts:
+                try:
+                    await self.connections[index].connectAsync(self.config.host, self.config.port, clientId=client_id, timeout=20, readonly=True)
+                    print(f"IBKR Client connected with host={self.config.host}, port={self.config.port}, clientId={client_id}")
+                    break
+                except Exception as err:
+                    current_attempt += 1
+                    if current_attempt < max_attempts:
+                        print(f"Connection failed for clientId={client_id}, retrying in {delay_secs} seconds... (attempt {current_attempt}/{max_attempts})")
+                        await asyncio.sleep(delay_secs)
+                    else:
+                        raise Exception(f"Max reconnection attempts ({max_attempts}) exceeded for clientId={client_id}") from err
+        finally:
+            self.connecting.discard(index)
 
     async def disconnect(self):
-        """Disconnects from IBKR"""
-        self.ib.disconnect()
+        """Disconnects every pool connection from IBKR"""
+        for ib in self.connections:
+            ib.disconnect()
 
-    def _on_disconnected(self):
-        """Auto-reconnect handler when IB Gateway disconnects"""
-        print("Disconnected from IB Gateway. Attempting to reconnect...")
-        asyncio.create_task(self.connect())
+    def _on_disconnected(self, index):
+        """Auto-reconnect handler when one pool connection drops; other connections keep serving requests"""
+        print(f"Disconnected from IB Gateway (clientId={self.client_ids[index]}). Attempting to reconnect...")
+        asyncio.create_task(self._connect_one(index))
+
+    def _acquire_connection(self, in_flight: bool = True):
+        """Returns index of the connected pool connection to use next (least loaded or round robin), counting it in flight unless in_flight is False"""
+        connected = [index for index, ib in enumerate(self.connections) if ib.isConnected()]
+        if not connected:
+            raise ConnectionError("No IBKR connection available")
+        if self.config.ibkr_routing == 'round_robin':
+            index = min(connected, key=lambda i: (i - self.next_connection) % len(self.connections))
+        else:
+            index = min(connected, key=lambda i: (self.in_flight[i], (i - self.next_connection) % len(self.connections)))
+        self.next_connection = (index + 1) % len(self.connections)
+        if in_flight:
+            self.in_flight[index] += 1
+        return index
+
+    def _release_connection(self, index):
+        """Marks a request on pool connection index as finished"""
+        self.in_flight[index] -= 1
 
     # Business Logic --------------------------------------------------------
     def _get_bar_size(self, granularity):
@@ -46,32 +94,121 @@ class IBKRClient(ProviderClient):
         mapping = {'1S': '1 secs', '5S': '5 secs', '15S': '15 secs', '30S': '30 secs', '1M': '1 min', '5M': '5 mins', '15M': '15 mins', '30M': '30 mins', '1H': '1 hour', '1D': '1 day', '1W': '1 week'}
         return mapping.get(granularity, '1 day')
 
-    def _get_duration(self, granularity):
+    def _get_duration(self, granularity, duration_days=1):
         """Returns duration string for IBKR request"""
         if granularity in ['1S', '5S', '15S', '30S', '1M', '5M', '15M', '30M', '1H']:
-            return '1 D'
+            return f'{duration_days} D'
         return '1 Y'
 
-    async def fetch_historical_data(self, ticker, granularity, end_date, currency='USD', exchange='SMART', contract_type='Stock', what_to_show='TRADES'):
-        """Fetches historical data for ticker at granularity ending at end_date"""
-        
+    def get_max_window_days(self, granularity):
+        """Returns largest duration in days IBKR serves for the bar size, per its historical data step-size table (1 W needs bars of 3 mins or more, 1 M bars of 30 mins or more)"""
+        mapping = {'5M': 7, '15M': 7, '30M': 30, '1H': 30}
+        return mapping.get(granularity, 1)
+
+    def _build_contract(self, ticker, contract_type, exchange, currency):
+        """Returns unqualified contract for ticker"""
         if contract_type == 'Stock':
-            contract = Stock(ticker, exchange, currency)
+            return Stock(ticker, exchange, currency)
         elif contract_type == 'Index':
-            contract = Index(ticker, exchange, currency)
+            return Index(ticker, exchange, currency)
         elif contract_type == 'CFD':
-            contract = CFD(ticker, exchange, currency)
-        else:
-            raise ValueError(f"Unsupported contract type: {contract_type}")
-        
-        verified = await self.ib.qualifyContractsAsync(contract)
+            return CFD(ticker, exchange, currency)
+        raise ValueError(f"Unsupported contract type: {contract_type}")
+
+    async def _get_contract(self, ticker, contract_type, exchange, currency):
+        """Returns qualified contract from the cache, qualifying and caching it on a miss"""
+        key = (ticker, contract_type, exchange, currency)
+        cached = self.contract_cache.get(key)
+        if cached:
+            return Contract.create(**cached)
+        index = self._acquire_connection()
+        try:
+            with METRICS.timer('contract_lookup_seconds', provider='ibkr'):
+                verified = await self.connections[index].qualifyContractsAsync(self._build_contract(ticker, contract_type, exchange, currency))
+        finally:
+            self._release_connection(index)
         if not verified or not verified[0]:
             raise ValueError(f"Could not verify contract for ticker {ticker} on exchange {exchange} with currency {currency}")
-        
-        bars = await self.ib.reqHistoricalDataAsync(verified[0], endDateTime=end_date, durationStr=self._get_duration(granularity),
-                                                     barSizeSetting=self._get_bar_size(granularity), whatToShow=what_to_show, useRTH=True)
-        return [{'date': bar.date, 'open': bar.open, 'high': bar.high, 'low': bar.low, 'close': bar.close, 'volume': bar.volume, 
-                 'average': bar.average, 'barCount': bar.barCount} for bar in bars]
+        self.contract_cache.set(key, dataclasses.asdict(verified[0]))
+        return verified[0]
+
+    async def warm_up(self, download_requests):
+        """Qualifies all uncached contracts of the IBKR download requests in one batched call"""
+        keys = {(ticker, request.get('type', 'Stock'), request.get('exchange', 'SMART'), request.get('currency', 'USD'))
+                for request in download_requests if request.get('provider', 'ibkr') == 'ibkr' for ticker in request['tickers']}
+        keys = [key for key in keys if not self.contract_cache.contains(key)]
+        if not keys:
+            return
+        index = self._acquire_connection()
+        try:
+            verified = await self.connections[index].qualifyContractsAsync(*[self._build_contract(*key) for key in keys])
+        finally:
+            self._release_connection(index)
+        qualified = {key: dataclasses.asdict(contract) for key, contract in zip(keys, verified) if contract}
+        self.contract_cache.set_many(qualified)
+        print(f"IBKR contract cache warmed up: {len(qualified)}/{len(keys)} contract(s) qualified")
+
+    def get_cache_stats(self):
+        """Returns qualified-contract cache hit and miss counts"""
+        return {'contracts': self.contract_cache.get_stats()}
+
+    async def fetch_historical_data(self, ticker, granularity, end_date, currency='USD', exchange='SMART', contract_type='Stock', what_to_show='TRADES', duration_days=1, pace=None):
+        """Fetches historical data for ticker at granularity covering duration_days up to end_date"""
+        contract = await self._get_contract(ticker, contract_type, exchange, currency)
+        index = self._acquire_connection()
+        try:
+            bars = await self.connections[index].reqHistoricalDataAsync(contract, endDateTime=end_date, durationStr=self._get_duration(granularity, duration_days),
+                                                                         barSizeSetting=self._get_bar_size(granularity), whatToShow=what_to_show, useRTH=True)
+        except RequestError as e:
+            # Pacing violations, timeouts and dropped connections say nothing about the contract, so only definition errors requalify it
+            if e.code in CONTRACT_ERROR_CODES:
+                self.contract_cache.invalidate((ticker, contract_type, exchange, currency))
+            raise
+        finally:
+            self._release_connection(index)
+        return self._bars_to_frame(bars)
+
+    async def stream_bars(self, ticker, granularity, currency='USD', exchange='SMART', contract_type='Stock', what_to_show='TRADES'):
+        """Yields the session's finished bars, then each bar as keepUpToDate historical updates complete it; raises ConnectionError when the connection drops"""
+        contract = await self._get_contract(ticker, contract_type, exchange, currency)
+        # A stream lasts the whole session, so it is left out of the in-flight counts least_loaded routing compares
+        index = self._acquire_connection(in_flight=False)
+        ib = self.connections[index]
+        bars = None
+        queue = asyncio.Queue()
+
+        def on_update(updated_bars, has_new_bar):
+            # A new bar starts forming, so the one before it is final
+            if has_new_bar and len(updated_bars) > 1:
+                queue.put_nowait(self._bar_to_dict(updated_bars[-2]))
+        try:
+            bars = await ib.reqHistoricalDataAsync(contract, endDateTime='', durationStr='1 D', barSizeSetting=self._get_bar_size(granularity),
+                                                   whatToShow=what_to_show, useRTH=True, keepUpToDate=True)
+            for bar in bars[:-1]:
+                queue.put_nowait(self._bar_to_dict(bar))
+            bars.updateEvent += on_update
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=5)
+                except asyncio.TimeoutError:
+                    if not ib.isConnected():
+                        raise ConnectionError(f"IBKR connection clientId={self.client_ids[index]} dropped while streaming {ticker}")
+        finally:
+            if bars is not None and ib.isConnected():
+                bars.updateEvent -= on_update
+                ib.cancelHistoricalData(bars)
 
     # IO --------------------------------------------------------------------
     # Misc ------------------------------------------------------------------
+    @staticmethod
+    def _bars_to_frame(bars):
+        """Converts ib_async BarData objects to one columnar batch, reading each field straight into a NumPy array without per-bar dicts"""
+        columns = {'date': pd.to_datetime([bar.date for bar in bars])}
+        for col in BAR_COLUMNS[1:]:
+            columns[col] = np.fromiter(map(attrgetter(col), bars), dtype=np.int64 if col == 'barCount' else np.float64, count=len(bars))
+        return pd.DataFrame(columns, copy=False)
+
+    def _bar_to_dict(self, bar):
+        """Converts an ib_async BarData to the bar dict stored in files"""
+        return {'date': bar.date, 'open': bar.open, 'high': bar.high, 'low': bar.low, 'close': bar.close, 'volume': bar.volume,
+                'average': bar.average, 'barCount': bar.barCount}
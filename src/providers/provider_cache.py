@@ -0,0 +1,75 @@
+import json
+import os
+import time
+from pathlib import Path
+
+
+class ProviderCache:
+    """Persistent cache of provider lookups keyed by tuples, with TTL and explicit invalidation"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, file_path: str, ttl_seconds: int):
+        self.file_path = Path(file_path)
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    # Business Logic --------------------------------------------------------
+    def get(self, key: tuple):
+        """Returns cached value for key, or None when missing or older than the TTL"""
+        entry = self.entries.get(key)
+        if entry is not None and time.time() - entry['stored_at'] > self.ttl_seconds:
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['value']
+
+    def contains(self, key: tuple) -> bool:
+        """Returns True if key has an unexpired entry, without counting a hit or miss"""
+        entry = self.entries.get(key)
+        return entry is not None and time.time() - entry['stored_at'] <= self.ttl_seconds
+
+    def get_stats(self) -> dict:
+        """Returns entry, hit and miss counts"""
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+    def set(self, key: tuple, value):
+        """Stores value for key and persists the cache"""
+        self.set_many({key: value})
+
+    def set_many(self, values: dict):
+        """Stores several {key: value} pairs and persists the cache once"""
+        stored_at = time.time()
+        for key, value in values.items():
+            self.entries[key] = {'value': value, 'stored_at': stored_at}
+        self._save()
+
+    def invalidate(self, key: tuple = None):
+        """Removes key from the cache, or every entry when key is None"""
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+        self._save()
+
+    # IO --------------------------------------------------------------------
+    def _load(self):
+        """Loads cache entries from the JSON file if it exists"""
+        if not self.file_path.exists():
+            return
+        with open(self.file_path, 'r') as f:
+            for entry in json.load(f):
+                self.entries[tuple(entry['key'])] = {'value': entry['value'], 'stored_at': entry['stored_at']}
+
+    def _save(self):
+        """Atomically writes cache entries to the JSON file"""
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.file_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump([{'key': list(key), **entry} for key, entry in self.entries.items()], f)
+        os.replace(tmp_path, self.file_path)
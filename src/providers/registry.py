@@ -0,0 +1,68 @@
+import asyncio
+import dataclasses
+import importlib
+from typing import Callable
+
+from src.configuration.config import Config
+from src.normalization_tracker import NormalizationTracker
+from src.providers.base_client import ProviderClient
+
+
+@dataclasses.dataclass(frozen=True)
+class ProviderSpec:
+    """Where a provider client lives and how it is brought up; the module is imported only when a download request uses the provider"""
+    module: str
+    class_name: str
+    is_configured: Callable[[Config], bool]
+    retry_connect: bool
+
+
+PROVIDERS = {'ibkr': ProviderSpec('src.providers.ibkr_client', 'IBKRClient', lambda config: bool(config.client_id or config.client_ids), True),
+             'saxo': ProviderSpec('src.providers.saxo_client', 'SaxoClient', lambda config: bool(config.saxo_client_id and config.saxo_client_secret), False),
+             'fake': ProviderSpec('src.providers.fake_client', 'FakeClient', lambda config: True, False)}
+
+
+def get_referenced_providers(download_requests: list[dict]) -> list[str]:
+    """Returns providers the download requests use, in order of first use"""
+    return list(dict.fromkeys(request.get('provider', 'ibkr') for request in download_requests))
+
+
+def get_referenced_trackers(download_requests: list[dict]) -> list[tuple[str, str]]:
+    """Returns (provider, whatToShow) pairs the download requests use, in order of first use"""
+    return list(dict.fromkeys((request.get('provider', 'ibkr'), request.get('whatToShow', 'TRADES')) for request in download_requests))
+
+
+def create_provider_clients(config: Config, download_requests: list[dict]) -> dict[str, ProviderClient]:
+    """Imports and creates a client for each configured provider the download requests use; unconfigured providers are reported and left out"""
+    clients = {}
+    for provider in get_referenced_providers(download_requests):
+        spec = PROVIDERS.get(provider)
+        if spec is None:
+            raise ValueError(f"Unsupported provider: {provider}")
+        if not spec.is_configured(config):
+            print(f"SKIPPED: provider {provider} is not configured; its download requests are not downloaded")
+            continue
+        clients[provider] = getattr(importlib.import_module(spec.module), spec.class_name)(config)
+    return clients
+
+
+def create_normalization_trackers(config: Config, download_requests: list[dict], compact_after_entries: int = 1000) -> dict[tuple[str, str], NormalizationTracker]:
+    """Loads normalization trackers of the (provider, whatToShow) pairs the download requests use"""
+    return {(provider, what_to_show): NormalizationTracker(config.processed_data_dir, provider, what_to_show, config.normalization_flush_seconds, compact_after_entries)
+            for provider, what_to_show in get_referenced_trackers(download_requests)}
+
+
+async def connect_provider(provider: str, client: ProviderClient, download_requests: list[dict], config: Config):
+    """Connects a client and warms up its lookup caches; providers with retry_connect keep retrying, others raise on the first failure"""
+    while True:
+        try:
+            await client.connect()
+            print(f"Connected to {provider} successfully")
+            await client.warm_up(download_requests)
+            return
+        except Exception as e:
+            if not PROVIDERS[provider].retry_connect:
+                raise
+            print(f"\nFailed to connect to {provider}: {str(e) or 'Connection failed'}")
+            print(f"Retrying in {config.connection_retry_seconds} seconds...\n")
+            await asyncio.sleep(config.connection_retry_seconds)
@@ -3,11 +3,15 @@ import asyncio
 import json
 import base64
 import webbrowser
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from aiohttp import web
 from urllib.parse import urlencode
-from src.providers.base_client import ProviderClient
+import numpy as np
+import pandas as pd
+from src.metrics import METRICS
+from src.providers.base_client import BAR_COLUMNS, ProviderClient
+from src.providers.provider_cache import ProviderCache
 
 
 class SaxoClient(ProviderClient):
@@ -24,10 +28,12 @@ class SaxoClient(ProviderClient):
         self.auth_url = 'https://sim.logonvalidation.net/authorize'
         self.token_url = 'https://sim.logonvalidation.net/token'
         self.auth_code = None
+        self.chart_page_size = 1200
+        self.uic_cache = ProviderCache(config.saxo_uic_cache_file, config.saxo_uic_cache_ttl_seconds)
 
     async def connect(self):
         """Connects to Saxo OpenAPI and authenticates"""
-        self.session = aiohttp.ClientSession()
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.config.saxo_connection_limit))
         await self._authenticate()
         print(f"Saxo Client connected")
 
@@ -120,49 +126,111 @@ class SaxoClient(ProviderClient):
         mapping = {'Stock': 'Stock', 'Index': 'StockIndex', 'CFD': 'CfdOnIndex', 'ETF': 'Etf'}
         return mapping.get(contract_type, 'Stock')
 
-    async def fetch_historical_data(self, ticker: str, granularity: str, end_date: str, currency: str = 'USD', exchange: str = 'SMART', contract_type: str = 'Stock', what_to_show: str = 'TRADES') -> list[dict]:
-        """Fetches historical data for ticker at granularity ending at end_date"""
+    def get_max_window_days(self, granularity: str) -> int:
+        """Returns most calendar days one coalesced request may cover; the range is paged into sequential chart calls, each paced"""
+        return self.config.saxo_max_window_days
+
+    def _get_time_range(self, horizon: int, end_date: str, duration_days: int) -> tuple[datetime, datetime]:
+        """Returns UTC (start, end) of a request; daily and weekly bars cover the whole year of end_date"""
+        end = min(datetime.strptime(end_date, '%Y%m%d %H:%M:%S').replace(tzinfo=timezone.utc), datetime.now(timezone.utc))
+        if horizon >= 1440:
+            return end.replace(month=1, day=1, hour=0, minute=0, second=0), end
+        return (end - timedelta(days=duration_days - 1)).replace(hour=0, minute=0, second=0), end
+
+    async def fetch_historical_data(self, ticker: str, granularity: str, end_date: str, currency: str = 'USD', exchange: str = 'SMART', contract_type: str = 'Stock', what_to_show: str = 'TRADES', duration_days: int = 1, pace=None) -> pd.DataFrame:
+        """Fetches historical data for ticker at granularity covering duration_days up to end_date, one chart page after another; pages after the first await pace()"""
         horizon = self._get_horizon_minutes(granularity)
+        if horizon == 0:
+            print(f"Saxo does not provide {granularity} bars for ticker {ticker}")
+            return pd.DataFrame(columns=BAR_COLUMNS)
         asset_type = self._map_asset_type(contract_type)
-        uic = await self._lookup_uic(ticker, asset_type)
+        uic = await self._get_uic(ticker, asset_type)
         if not uic:
             print(f"Saxo UIC lookup failed for ticker {ticker}")
-            return []
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        start, end = self._get_time_range(horizon, end_date, duration_days)
+        step = timedelta(minutes=horizon * self.chart_page_size)
+        window_starts = []
+        window_start = start
+        while window_start <= end:
+            window_starts.append(window_start)
+            window_start += step
+        pages = []
+        for window_start in window_starts:
+            if pages and pace:
+                await pace()
+            pages.append(await self._fetch_chart_page(ticker, uic, asset_type, horizon, window_start))
+        bars = pd.DataFrame([bar for page in pages for bar in page])
+        if bars.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        bars['Time'] = pd.to_datetime(bars['Time'], utc=True, format='ISO8601')
+        # Adjacent pages may overlap; the later page's bar wins
+        bars = bars.drop_duplicates('Time', keep='last').sort_values('Time')
+        in_range = (bars['Time'] >= start.replace(microsecond=0)) & (bars['Time'] < end.replace(microsecond=0) + timedelta(seconds=1))
+        return self._convert_saxo_data(bars[in_range], what_to_show)
+
+    async def _fetch_chart_page(self, ticker: str, uic: int, asset_type: str, horizon: int, window_start: datetime) -> list[dict]:
+        """Fetches up to chart_page_size bars starting at window_start"""
         url = f"{self.base_url}/chart/v1/charts"
-        params = {'Uic': uic, 'AssetType': asset_type, 'Horizon': horizon, 'Count': 1200}
+        params = {'Uic': uic, 'AssetType': asset_type, 'Horizon': horizon, 'Count': self.chart_page_size, 'Mode': 'From',
+                  'Time': window_start.strftime('%Y-%m-%dT%H:%M:%SZ')}
         headers = {'Authorization': f'Bearer {self.access_token}'}
         async with self.session.get(url, params=params, headers=headers) as response:
             if response.status != 200:
-                print(f"Saxo data fetch failed for {ticker} with response {response}")
-                return []
+                raise Exception(f"Saxo data fetch failed for {ticker} with response {response.status}")
             data = await response.json()
-            return self._convert_saxo_data(data, what_to_show)
+            return data.get('Data', [])
+
+    async def _get_uic(self, ticker: str, asset_type: str) -> int:
+        """Returns UIC from the cache, looking it up and caching it on a miss"""
+        uic = self.uic_cache.get((ticker, asset_type))
+        if uic:
+            return uic
+        uic = await self._lookup_uic(ticker, asset_type)
+        if uic:
+            self.uic_cache.set((ticker, asset_type), uic)
+        return uic
+
+    async def warm_up(self, download_requests: list[dict]):
+        """Resolves UICs of all uncached Saxo tickers with one batch of concurrent instrument queries"""
+        keys = {(ticker, self._map_asset_type(request.get('type', 'Stock')))
+                for request in download_requests if request.get('provider', 'ibkr') == 'saxo' for ticker in request['tickers']}
+        keys = [key for key in keys if not self.uic_cache.contains(key)]
+        if not keys:
+            return
+        uics = await asyncio.gather(*[self._lookup_uic(ticker, asset_type) for ticker, asset_type in keys])
+        resolved = {key: uic for key, uic in zip(keys, uics) if uic}
+        self.uic_cache.set_many(resolved)
+        print(f"Saxo UIC cache warmed up: {len(resolved)}/{len(keys)} ticker(s) resolved")
+
+    def get_cache_stats(self) -> dict:
+        """Returns UIC cache hit and miss counts"""
+        return {'uics': self.uic_cache.get_stats()}
 
     async def _lookup_uic(self, ticker: str, asset_type: str) -> int:
         """Looks up UIC for ticker using Saxo instruments API"""
         url = f"{self.base_url}/ref/v1/instruments"
         params = {'Keywords': ticker, 'AssetTypes': asset_type}
         headers = {'Authorization': f'Bearer {self.access_token}'}
-        async with self.session.get(url, params=params, headers=headers) as response:
-            if response.status != 200:
-                return None
-            data = await response.json()
+        with METRICS.timer('contract_lookup_seconds', provider='saxo'):
+            async with self.session.get(url, params=params, headers=headers) as response:
+                if response.status != 200:
+                    return None
+                data = await response.json()
             if 'Data' in data and len(data['Data']) > 0:
                 return data['Data'][0]['Identifier']
             return None
 
-    def _convert_saxo_data(self, saxo_data: dict, what_to_show: str) -> list[dict]:
-        """Converts Saxo OHLC format to IBKR-compatible format"""
-        if 'Data' not in saxo_data:
-            return []
-        result = []
-        for bar in saxo_data['Data']:
-            if what_to_show == 'TRADES':
-                converted = {'date': datetime.fromisoformat(bar['Time'].replace('Z', '+00:00')), 'open': (bar['OpenBid'] + bar['OpenAsk']) / 2, 'high': (bar['HighBid'] + bar['HighAsk']) / 2, 'low': (bar['LowBid'] + bar['LowAsk']) / 2, 'close': (bar['CloseBid'] + bar['CloseAsk']) / 2, 'volume': 0, 'average': (bar['CloseBid'] + bar['CloseAsk']) / 2, 'barCount': 0}
-            else:
-                converted = {'date': datetime.fromisoformat(bar['Time'].replace('Z', '+00:00')), 'open': bar['OpenBid'], 'high': bar['HighBid'], 'low': bar['LowBid'], 'close': bar['CloseBid'], 'volume': 0, 'average': bar['CloseBid'], 'barCount': 0}
-            result.append(converted)
-        return result
+    @staticmethod
+    def _convert_saxo_data(bars: pd.DataFrame, what_to_show: str) -> pd.DataFrame:
+        """Converts Saxo bid/ask OHLC columns to IBKR-compatible bar columns in one vectorized pass; TRADES prices are bid/ask mid prices"""
+        fields = ['Open', 'High', 'Low', 'Close']
+        prices = bars[[f'{field}Bid' for field in fields]].to_numpy(dtype=np.float64)
+        if what_to_show == 'TRADES':
+            prices = (prices + bars[[f'{field}Ask' for field in fields]].to_numpy(dtype=np.float64)) / 2
+        zeros = np.zeros(len(bars), dtype=np.int64)
+        return pd.DataFrame({'date': bars['Time'].array, 'open': prices[:, 0], 'high': prices[:, 1], 'low': prices[:, 2], 'close': prices[:, 3],
+                             'volume': zeros, 'average': prices[:, 3], 'barCount': zeros}, copy=False)
 
     # IO --------------------------------------------------------------------
     def _load_tokens(self) -> bool:
@@ -0,0 +1,97 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.configuration.config import Config
+from src.configuration.download_requests_parser import DownloadRequestsParser
+from src.file_lock import FileLock
+from src.file_manager import FileManager
+from src.normalization_tracker import NormalizationTracker
+from src.providers import registry
+from src.storage.base_storage import StorageBackend
+
+
+class Renormalizer:
+    """Rewrites processed files of (ticker, granularity) pairs whose max values changed since they were written, from their raw files in a process pool"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, config: Config, file_manager: FileManager, normalization_trackers: dict[tuple[str, str], NormalizationTracker]):
+        self.config = config
+        self.file_manager = file_manager
+        self.normalization_trackers = normalization_trackers
+
+    # Business Logic --------------------------------------------------------
+    def run(self) -> dict:
+        """Re-normalizes every stale pair, one task per year of dates, and marks each pair renormalized at the version it used; returns throughput stats"""
+        started = time.perf_counter()
+        pairs = []
+        with ProcessPoolExecutor(max_workers=self.config.renormalize_workers or os.cpu_count()) as pool:
+            for (provider, what_to_show), normalization_tracker in self.normalization_trackers.items():
+                normalization_tracker.refresh()
+                for ticker, granularity in normalization_tracker.get_stale_pairs():
+                    version = normalization_tracker.get_version(ticker, granularity)
+                    max_values = normalization_tracker.get_max_values(ticker, granularity)
+                    years = {}
+                    for date_str in self._get_completed_dates(provider, what_to_show, granularity, ticker):
+                        years.setdefault(date_str[:4], []).append(date_str)
+                    lock_path = self.file_manager.get_write_lock_path(ticker, granularity, what_to_show, provider)
+                    futures = [pool.submit(_renormalize_dates, self.file_manager.storage, lock_path, provider, what_to_show, granularity, ticker, dates, max_values)
+                               for dates in years.values()]
+                    pairs.append((normalization_tracker, provider, what_to_show, granularity, ticker, version, futures))
+            dates_total = rows_total = failed = 0
+            for normalization_tracker, provider, what_to_show, granularity, ticker, version, futures in pairs:
+                try:
+                    results = [future.result() for future in futures]
+                except Exception as e:
+                    failed += 1
+                    print(f"RENORMALIZE: FAILED {provider}/{what_to_show}/{granularity}/{ticker} - {e}")
+                    continue
+                normalization_tracker.mark_renormalized(ticker, granularity, version)
+                dates_total += sum(dates for dates, _ in results)
+                rows_total += sum(rows for _, rows in results)
+        for normalization_tracker in self.normalization_trackers.values():
+            normalization_tracker.flush()
+        elapsed = time.perf_counter() - started
+        stats = {'pairs': len(pairs) - failed, 'failed_pairs': failed, 'dates': dates_total, 'rows': rows_total, 'seconds': elapsed,
+                 'dates_per_second': dates_total / elapsed, 'rows_per_second': rows_total / elapsed}
+        print(f"RENORMALIZE: {stats['pairs']} pair(s), {dates_total} date(s), {rows_total} rows in {elapsed:.1f}s - "
+              f"{stats['dates_per_second']:.0f} dates/s, {stats['rows_per_second']:.0f} rows/s" + (f", {failed} pair(s) failed" if failed else ""))
+        return stats
+
+    def _get_completed_dates(self, provider: str, what_to_show: str, granularity: str, ticker: str) -> list[str]:
+        """Returns dates of the pair whose raw and processed files are stored, ascending"""
+        statuses = self.file_manager.status_store.get_dates(provider, what_to_show, granularity, ticker)
+        return sorted(date_str for date_str, status in list(statuses.items()) if status == 'completed')
+
+
+def _renormalize_dates(storage: StorageBackend, lock_path: Path, provider: str, what_to_show: str, granularity: str, ticker: str, dates: list[str], max_values: dict) -> tuple[int, int]:
+    """Rewrites processed bars of dates (all of one year) from their raw bars scaled by max_values; runs in a worker process; returns (dates, rows).
+    Each date is read and written under the series write lock FileManager.commit_data and compaction hold, so a raw file committed meanwhile is not paired with stale processed bars"""
+    lock = FileLock(lock_path)
+    rows = 0
+    for date_str in dates:
+        with lock:
+            raw = storage.read(ticker, granularity, date_str, True, what_to_show, provider)
+            if raw is None:
+                continue
+            storage.write(ticker, granularity, date_str, False, what_to_show, provider, _scale(raw, max_values))
+        rows += len(raw)
+    return len(dates), rows
+
+
+def _scale(raw: pd.DataFrame, max_values: dict) -> pd.DataFrame:
+    """Returns raw bars with value columns scaled to [-1, 1] by max_values in one broadcast operation, like NormalizationTracker.normalize_frame"""
+    columns = [col for col in raw.columns if col in max_values]
+    scaled = raw[columns].to_numpy(dtype=np.float64) / np.array([max_values[col] for col in columns], dtype=np.float64) * 2 - 1
+    processed = pd.concat([raw.drop(columns=columns), pd.DataFrame(scaled, columns=columns, index=raw.index)], axis=1)
+    return processed[list(raw.columns)]
+
+
+if __name__ == '__main__':
+    config = Config()
+    # Downloaders may be appending to the same journals, so this process never compacts them
+    normalization_trackers = registry.create_normalization_trackers(config, DownloadRequestsParser(config).get_download_requests(), compact_after_entries=0)
+    Renormalizer(config, FileManager(config), normalization_trackers).run()
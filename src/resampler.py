@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from src.file_manager import FileManager
+
+# Bar length in seconds of each intraday granularity
+BAR_SECONDS = {'1S': 1, '5S': 5, '15S': 15, '30S': 30, '1M': 60, '5M': 300, '15M': 900, '30M': 1800, '1H': 3600}
+
+
+def get_source_granularity(target: str, granularities: list[str]) -> str:
+    """Returns the coarsest granularity of granularities target can be built from; raises ValueError if there is none"""
+    if target not in BAR_SECONDS:
+        raise ValueError(f"Only intraday granularities can be derived, not {target}")
+    sources = [granularity for granularity in granularities
+               if granularity in BAR_SECONDS and BAR_SECONDS[granularity] < BAR_SECONDS[target] and BAR_SECONDS[target] % BAR_SECONDS[granularity] == 0]
+    if not sources:
+        raise ValueError(f"No downloaded granularity in {granularities} divides {target}")
+    return max(sources, key=BAR_SECONDS.get)
+
+
+class Resampler:
+    """Builds coarser intraday bars from stored finer bars with vectorized aggregation"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, file_manager: FileManager):
+        self.file_manager = file_manager
+
+    # Business Logic --------------------------------------------------------
+    def get_source_granularity(self, target: str, granularities: list[str]) -> str:
+        """Returns the coarsest downloaded granularity target can be built from; raises ValueError if there is none"""
+        return get_source_granularity(target, granularities)
+
+    def derive_date(self, provider: str, what_to_show: str, ticker: str, source: str, target: str, date_str: str) -> pd.DataFrame:
+        """Returns target bars of one date built from the stored raw source bars, or None if the source date is not stored"""
+        frame = self.file_manager.read_data(ticker, source, date_str, True, what_to_show, provider)
+        if frame is None:
+            return None
+        return self.resample_frame(frame, target)
+
+    def resample_frame(self, frame: pd.DataFrame, target: str) -> pd.DataFrame:
+        """Aggregates bars into target buckets: open first, high max, low min, close last, volume and barCount summed, average volume-weighted;
+        buckets are aligned to the clock and labelled with their first bar, like IBKR labels a 1H bar starting 09:30"""
+        dates = pd.to_datetime(frame['date'], format='ISO8601')
+        buckets = dates.dt.floor(f"{BAR_SECONDS[target]}s").to_numpy()
+        # Bars are time ordered, so each bucket is one run of equal values
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(frame)] - 1
+        volume = frame['volume'].to_numpy(dtype=np.float64)
+        average = frame['average'].to_numpy(dtype=np.float64)
+        bar_count = frame['barCount'].to_numpy(dtype=np.float64)
+        volume_sum = np.add.reduceat(volume, starts)
+        # BID_ASK and MIDPOINT bars carry -1 volume and average, so they fall back to the plain mean
+        weighted = volume_sum > 0
+        average_mean = np.add.reduceat(average, starts) / np.diff(np.r_[starts, len(frame)])
+        vwap = np.divide(np.add.reduceat(average * volume, starts), volume_sum, out=average_mean.copy(), where=weighted)
+        return pd.DataFrame({'date': frame['date'].array[starts],
+                             'open': frame['open'].to_numpy()[starts],
+                             'high': np.maximum.reduceat(frame['high'].to_numpy(dtype=np.float64), starts),
+                             'low': np.minimum.reduceat(frame['low'].to_numpy(dtype=np.float64), starts),
+                             'close': frame['close'].to_numpy()[ends],
+                             'volume': np.where(volume[starts] < 0, -1, volume_sum).astype(frame['volume'].dtype),
+                             'average': np.where(average[starts] < 0, -1.0, vwap),
+                             'barCount': np.where(bar_count[starts] < 0, -1, np.add.reduceat(bar_count, starts)).astype(frame['barCount'].dtype)})
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.file_lock import FileLock
+
+
+class RetryTracker:
+    """Tracks failed units per (provider, what_to_show, granularity, ticker, date) with capped exponential backoff"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, data_dir: str, base_seconds: int, max_seconds: int):
+        self.file_path = Path(data_dir) / 'retries.json'
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.retries = self._load()
+        self.changed = set()
+        self.lock = threading.Lock()
+        self.file_lock = FileLock(self.file_path.with_suffix('.lock'))
+
+    # Business Logic --------------------------------------------------------
+    def record_failure(self, provider: str, what_to_show: str, granularity: str, ticker: str, date_str: str, error: Exception):
+        """Counts a failed attempt and schedules the next one base_seconds * 2^(attempts-1) later, capped at max_seconds"""
+        key = (provider, what_to_show, granularity, ticker, date_str)
+        with self.lock:
+            attempts = self.retries.get(key, {}).get('attempts', 0) + 1
+            delay = min(self.base_seconds * 2 ** (attempts - 1), self.max_seconds)
+            self.changed.add(key)
+            self.retries[key] = {'attempts': attempts, 'last_error': type(error).__name__, 'message': str(error)[:200], 'next_eligible': time.time() + delay}
+
+    def record_success(self, provider: str, what_to_show: str, granularity: str, ticker: str, date_str: str):
+        """Forgets the failure history of a unit that finished, including one another process recorded after this one loaded the file"""
+        key = (provider, what_to_show, granularity, ticker, date_str)
+        with self.lock:
+            self.retries.pop(key, None)
+            self.changed.add(key)
+
+    def get(self, provider: str, what_to_show: str, granularity: str, ticker: str, date_str: str) -> dict:
+        """Returns {'attempts', 'last_error', 'message', 'next_eligible'} of a failed unit, or None"""
+        return self.retries.get((provider, what_to_show, granularity, ticker, date_str))
+
+    def get_stuck(self, min_attempts: int) -> list[tuple[tuple, dict]]:
+        """Returns [(key, retry)] of units that failed at least min_attempts times, most attempts first"""
+        with self.lock:
+            stuck = [(key, retry) for key, retry in self.retries.items() if retry['attempts'] >= min_attempts]
+        return sorted(stuck, key=lambda item: -item[1]['attempts'])
+
+    # IO --------------------------------------------------------------------
+    def _load(self) -> dict:
+        """Returns {key: retry} stored in the JSON file"""
+        if not self.file_path.exists():
+            return {}
+        with open(self.file_path, 'r') as f:
+            return {tuple(entry['key']): {k: v for k, v in entry.items() if k != 'key'} for entry in json.load(f)}
+
+    def save(self):
+        """Atomically writes retry state to JSON; only keys changed here overwrite the file, so workers on other shards keep theirs.
+        The read-merge-write holds a lock file, so concurrent workers never drop each other's changes"""
+        with self.lock:
+            if not self.changed:
+                return
+            with self.file_lock:
+                retries = self._load()
+                for key in self.changed:
+                    if key in self.retries:
+                        retries[key] = self.retries[key]
+                    else:
+                        retries.pop(key, None)
+                entries = [{'key': list(key), **retry} for key, retry in retries.items()]
+                tmp_path = self.file_path.with_suffix('.json.tmp')
+                with open(tmp_path, 'w') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.file_path)
+            self.retries = retries
+            self.changed = set()
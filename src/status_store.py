@@ -0,0 +1,171 @@
+import os
+import re
+from pathlib import Path
+
+from src.file_lock import FileLock
+
+# Legacy flag file suffixes in get_file_status precedence order
+FLAG_SUFFIXES = {'.cpl': 'completed', '.crp': 'corrupted', '.icl': 'incomplete', '.na': 'not_available'}
+DONE_STATUSES = ('completed', 'not_available')
+FILE_STEM_PATTERN = re.compile(r'^(?P<ticker>.+)-(?P<date>\d{4}(?:-\d{2}-\d{2})?)$')
+
+
+class StatusStore:
+    """Download status manifest: append-only log with an in-memory index keyed by (provider, what_to_show, granularity, ticker, date).
+    Processes append and replay under a shared file lock; compaction holds it exclusively and replaces the log, which makes the others start over from the new file"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, data_dir: str):
+        self.data_dir = Path(data_dir)
+        self.log_path = self.data_dir / 'status.log'
+        self.index = {}
+        self.open_index = {}
+        self.log_entries = 0
+        self.log_offset = 0
+        self.lock = FileLock(self.data_dir / 'status.lock')
+        if not self.log_path.exists():
+            with self.lock:
+                if not self.log_path.exists():
+                    self._import_flag_files()
+        with self.lock.shared():
+            self.log_file = open(self.log_path, 'ab')
+            self._load()
+
+    def close(self):
+        """Closes the log file"""
+        self.log_file.close()
+
+    # Business Logic --------------------------------------------------------
+    def get(self, provider: str, what_to_show: str, granularity: str, ticker: str, date_str: str):
+        """Returns 'completed', 'corrupted', 'incomplete', 'not_available', or None"""
+        return self.index.get((provider, what_to_show, granularity, ticker), {}).get(date_str)
+
+    def set(self, provider: str, what_to_show: str, granularity: str, ticker: str, date_str: str, status):
+        """Sets status (None clears it) and appends the change to the log"""
+        key = (provider, what_to_show, granularity, ticker)
+        with self.lock.shared():
+            self._ensure_current()
+            if self.index.get(key, {}).get(date_str) == status:
+                return
+            self._update_index(key, date_str, status)
+            line = self._format_line(provider, what_to_show, granularity, ticker, date_str, status).encode()
+            self.log_file.write(line)
+            self.log_file.flush()
+            self.log_entries += 1
+
+    def get_dates(self, provider: str, what_to_show: str, granularity: str, ticker: str) -> dict:
+        """Returns {date: status} of every tracked date for one (provider, what_to_show, granularity, ticker)"""
+        return self.index.get((provider, what_to_show, granularity, ticker), {})
+
+    def get_open_dates(self, provider: str, what_to_show: str, granularity: str, ticker: str) -> set:
+        """Returns tracked dates whose status is neither completed nor not available (corrupted/incomplete)"""
+        return self.open_index.get((provider, what_to_show, granularity, ticker), set())
+
+    def get_pending_dates(self, provider: str, what_to_show: str, granularity: str, ticker: str, dates: list[str]) -> list[str]:
+        """Returns the dates, in the given order, that are neither completed nor not available"""
+        statuses = self.get_dates(provider, what_to_show, granularity, ticker)
+        return [date_str for date_str in dates if statuses.get(date_str) not in DONE_STATUSES]
+
+    # IO --------------------------------------------------------------------
+    def refresh(self):
+        """Replays lines appended to the log since the last load, including other processes' lines, in file order"""
+        with self.lock.shared():
+            self._ensure_current()
+            self._load()
+
+    def compact(self, force: bool = False) -> bool:
+        """Rewrites the log with one line per tracked date once superseded lines dominate it (or if force); returns True if rewritten"""
+        with self.lock:
+            self._ensure_current()
+            self._load()
+            if not force and self.log_entries <= 2 * self._count_entries() + 10000:
+                return False
+            tmp_path = self.log_path.with_suffix('.log.tmp')
+            with open(tmp_path, 'w') as f:
+                for (provider, what_to_show, granularity, ticker), dates in self.index.items():
+                    for date_str, status in dates.items():
+                        f.write(self._format_line(provider, what_to_show, granularity, ticker, date_str, status))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.log_path)
+            self.log_file.close()
+            self.log_file = open(self.log_path, 'ab')
+            self.log_entries = self._count_entries()
+            self.log_offset = self.log_path.stat().st_size
+        return True
+
+    def _ensure_current(self):
+        """Starts over from the current log if another process compacted it since it was opened, as offsets into the old file are meaningless; caller holds the lock"""
+        # The old file stays open until here, so its inode cannot have been reused by the new one
+        if os.fstat(self.log_file.fileno()).st_ino == os.stat(self.log_path).st_ino:
+            return
+        self.log_file.close()
+        self.log_file = open(self.log_path, 'ab')
+        self.index = {}
+        self.open_index = {}
+        self.log_entries = 0
+        self.log_offset = 0
+        self._load()
+
+    def _load(self):
+        """Replays the log from the last loaded offset into the index; a torn last line is left for the next load"""
+        with open(self.log_path, 'rb') as f:
+            f.seek(self.log_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._apply_line(line.decode())
+                self.log_offset += len(line)
+
+    def _apply_line(self, line: str):
+        """Applies one log line to the index"""
+        provider, what_to_show, granularity, ticker, date_str, status = line.rstrip('\n').split('\t')
+        self._update_index((provider, what_to_show, granularity, ticker), date_str, None if status == '-' else status)
+        self.log_entries += 1
+
+    def _update_index(self, key: tuple, date_str: str, status):
+        """Applies one status change to the index and the open-dates index"""
+        dates = self.index.setdefault(key, {})
+        open_dates = self.open_index.setdefault(key, set())
+        if status is None:
+            dates.pop(date_str, None)
+        else:
+            dates[date_str] = status
+        if status is None or status in DONE_STATUSES:
+            open_dates.discard(date_str)
+        else:
+            open_dates.add(date_str)
+
+    def _import_flag_files(self):
+        """One-time import of legacy .cpl/.crp/.icl/.na flag files found under data_dir"""
+        found = {}
+        for root, _, files in os.walk(self.data_dir):
+            relative = Path(root).relative_to(self.data_dir).parts
+            if len(relative) != 3:
+                continue
+            provider, what_to_show, granularity = relative
+            for name in files:
+                stem, suffix = os.path.splitext(name)
+                match = FILE_STEM_PATTERN.match(stem)
+                if suffix not in FLAG_SUFFIXES or not match:
+                    continue
+                key = (provider, what_to_show, granularity, match['ticker'], match['date'])
+                current = found.get(key)
+                if current is None or list(FLAG_SUFFIXES).index(suffix) < list(FLAG_SUFFIXES).index(current):
+                    found[key] = suffix
+        tmp_path = self.log_path.with_suffix('.log.tmp')
+        with open(tmp_path, 'w') as f:
+            for key, suffix in found.items():
+                f.write(self._format_line(*key, FLAG_SUFFIXES[suffix]))
+        os.replace(tmp_path, self.log_path)
+        if found:
+            print(f"Imported {len(found)} legacy status flag file(s) into {self.log_path}")
+
+    # Misc ------------------------------------------------------------------
+    def _count_entries(self) -> int:
+        """Returns number of tracked dates"""
+        return sum(len(dates) for dates in self.index.values())
+
+    def _format_line(self, provider, what_to_show, granularity, ticker, date_str, status) -> str:
+        """Formats one tab-separated log line; '-' records a cleared status"""
+        return f"{provider}\t{what_to_show}\t{granularity}\t{ticker}\t{date_str}\t{status or '-'}\n"
@@ -0,0 +1,72 @@
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+import pandas as pd
+
+# A reader may locate a file that compaction deletes before it is opened; the next locate finds the merged file
+LOCATE_ATTEMPTS = 3
+
+
+class StorageBackend(ABC):
+    """Base class for bar storage backends; one instance serves both the raw and the processed tree"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, raw_data_dir: str, processed_data_dir: str):
+        self.raw_data_dir = Path(raw_data_dir)
+        self.processed_data_dir = Path(processed_data_dir)
+        self.created_dirs = set()
+
+    # Business Logic --------------------------------------------------------
+    @abstractmethod
+    def get_file_path(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> Path:
+        """Returns path of the file holding the bars of ticker on date_str"""
+        pass
+
+    def get_root_dir(self, is_raw: bool) -> Path:
+        """Returns root directory of the raw or processed tree"""
+        return self.raw_data_dir if is_raw else self.processed_data_dir
+
+    # IO --------------------------------------------------------------------
+    @abstractmethod
+    def stage(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str, data) -> tuple[Path, Path]:
+        """Writes the file that will hold bars of ticker on date_str to a temp path; returns (temp path, final path)"""
+        pass
+
+    def write(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str, data) -> Path:
+        """Atomically writes bars of ticker on date_str, replacing previously stored bars of that date; returns written path"""
+        tmp_path, file_path = self.stage(ticker, granularity, date_str, is_raw, what_to_show, provider, data)
+        os.replace(tmp_path, file_path)
+        return file_path
+
+    def read(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> pd.DataFrame:
+        """Returns bars of ticker on date_str, or None if nothing is stored; locates the date again if its file is removed before it is read"""
+        for attempt in range(LOCATE_ATTEMPTS):
+            file_path = self.locate(ticker, granularity, date_str, is_raw, what_to_show, provider)
+            if file_path is None:
+                return None
+            try:
+                return self.read_file(file_path, date_str)
+            except FileNotFoundError:
+                if attempt == LOCATE_ATTEMPTS - 1:
+                    raise
+
+    @abstractmethod
+    def read_file(self, file_path: Path, date_str: str) -> pd.DataFrame:
+        """Returns bars of date_str from a file returned by locate, or None if it holds none"""
+        pass
+
+    def read_file_dates(self, file_path: Path, dates: list[str]) -> dict:
+        """Returns {date_str: bars or None} of dates located in the same file; backends storing several dates per file read it once"""
+        return {date_str: self.read_file(file_path, date_str) for date_str in dates}
+
+    def locate(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> Path:
+        """Returns path of the file read for ticker on date_str, or None if it does not exist"""
+        file_path = self.get_file_path(ticker, granularity, date_str, is_raw, what_to_show, provider)
+        return file_path if file_path.exists() else None
+
+    def _ensure_dir(self, directory: Path) -> Path:
+        """Creates directory once per process"""
+        if directory not in self.created_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self.created_dirs.add(directory)
+        return directory
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+
+from src.configuration.config import Config
+from src.file_manager import FileManager
+from src.status_store import DONE_STATUSES, FILE_STEM_PATTERN, FLAG_SUFFIXES
+from src.storage import segment_file
+from src.storage.csv_storage import CsvStorage
+
+
+class Compactor:
+    """Merges per-day files of closed months: CSV files into monthly segment files (removing the merged CSV and legacy flag files), Parquet fragments into their year's partition file"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, config: Config, file_manager: FileManager):
+        self.config = config
+        self.file_manager = file_manager
+
+    # Business Logic --------------------------------------------------------
+    async def run_periodically(self):
+        """Compacts closed months every compaction_interval_seconds on a worker thread"""
+        while True:
+            try:
+                await asyncio.to_thread(self.compact)
+            except Exception as e:
+                print(f"COMPACTION: failed - {e}")
+            await asyncio.sleep(self.config.compaction_interval_seconds)
+
+    def compact(self, before_month: str = None) -> int:
+        """Compacts the status manifest and completed intraday dates of months before before_month (YYYY-MM, default: the current month); returns number of merged files"""
+        if self.file_manager.status_store.compact():
+            print(f"COMPACTION: rewrote status manifest {self.file_manager.status_store.log_path} with one line per tracked date")
+        storage = self.file_manager.storage
+        before_month = before_month or datetime.now().strftime('%Y-%m')
+        merged = 0
+        for is_raw in [True, False]:
+            if isinstance(storage, CsvStorage):
+                groups = self._find_closed_days(storage.get_root_dir(is_raw), before_month)
+            else:
+                groups = self._find_closed_fragments(storage.get_root_dir(is_raw), before_month)
+            for (provider, what_to_show, granularity, ticker, period), dates in groups.items():
+                with self.file_manager.get_write_lock(ticker, granularity, what_to_show, provider):
+                    # Another process may have compacted the group since it was listed
+                    dates = [date_str for date_str in dates if storage.get_file_path(ticker, granularity, date_str, is_raw, what_to_show, provider).exists()]
+                    if not dates:
+                        continue
+                    if isinstance(storage, CsvStorage):
+                        merged += self._compact_month(storage, is_raw, provider, what_to_show, granularity, ticker, dates)
+                    else:
+                        merged += storage.merge_fragments(ticker, granularity, dates, is_raw, what_to_show, provider)
+            if groups:
+                target = 'segment(s)' if isinstance(storage, CsvStorage) else 'partition(s)'
+                print(f"COMPACTION: merged {sum(len(dates) for dates in groups.values())} day file(s) into {len(groups)} {target} under {storage.get_root_dir(is_raw)}")
+        return merged
+
+    def _find_closed_days(self, root_dir: Path, before_month: str) -> dict:
+        """Returns {(provider, what_to_show, granularity, ticker, month): [date_str]} of completed day CSV files in months before before_month"""
+        groups = {}
+        for root, _, files in os.walk(root_dir):
+            relative = Path(root).relative_to(root_dir).parts
+            if len(relative) != 3:
+                continue
+            provider, what_to_show, granularity = relative
+            for name in files:
+                match = FILE_STEM_PATTERN.match(Path(name).stem)
+                if not name.endswith('.csv') or not match or len(match['date']) != 10 or match['date'][:7] >= before_month:
+                    continue
+                if self.file_manager.get_status(match['ticker'], granularity, match['date'], what_to_show, provider) not in DONE_STATUSES:
+                    continue
+                groups.setdefault((provider, what_to_show, granularity, match['ticker'], match['date'][:7]), []).append(match['date'])
+        return groups
+
+    def _find_closed_fragments(self, root_dir: Path, before_month: str) -> dict:
+        """Returns {(provider, what_to_show, granularity, ticker, year): [date_str]} of completed Parquet day fragments in months before before_month"""
+        groups = {}
+        for root, _, files in os.walk(root_dir):
+            relative = Path(root).relative_to(root_dir).parts
+            if len(relative) != 5:
+                continue
+            provider, what_to_show, granularity, ticker, year = relative
+            for name in files:
+                date_str = name[:-len('.parquet')]
+                if not name.endswith('.parquet') or len(date_str) != 10 or not FILE_STEM_PATTERN.match(f"{ticker}-{date_str}") or date_str[:7] >= before_month:
+                    continue
+                if self.file_manager.get_status(ticker, granularity, date_str, what_to_show, provider) not in DONE_STATUSES:
+                    continue
+                groups.setdefault((provider, what_to_show, granularity, ticker, year), []).append(date_str)
+        return groups
+
+    # IO --------------------------------------------------------------------
+    def _compact_month(self, storage: CsvStorage, is_raw: bool, provider: str, what_to_show: str, granularity: str, ticker: str, dates: list[str]) -> int:
+        """Merges day CSV files into the month's segment (keeping days compacted earlier), then deletes them once the segment is on disk; caller holds the write lock"""
+        segment_path = storage.get_segment_path(ticker, granularity, dates[0], is_raw, what_to_show, provider)
+        days = segment_file.read_days(segment_path) if segment_path.exists() else {}
+        csv_paths = []
+        for date_str in dates:
+            csv_path = storage.get_file_path(ticker, granularity, date_str, is_raw, what_to_show, provider)
+            days[date_str] = pd.read_csv(csv_path)
+            csv_paths.append(csv_path)
+        segment_file.write_segment(segment_path, days)
+        for csv_path in csv_paths:
+            csv_path.unlink()
+            for suffix in FLAG_SUFFIXES:
+                csv_path.with_suffix(suffix).unlink(missing_ok=True)
+        return len(csv_paths)
+
+
+if __name__ == '__main__':
+    config = Config()
+    Compactor(config, FileManager(config)).compact()
@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+import pandas as pd
+
+from src.configuration.config import Config
+from src.status_store import FILE_STEM_PATTERN
+from src.storage.parquet_storage import ParquetStorage
+
+
+def convert_csv_tree(config: Config):
+    """Converts the raw and processed CSV trees into yearly Parquet partitions; CSV files are left in place"""
+    storage = ParquetStorage(config.raw_data_dir, config.processed_data_dir)
+    for is_raw in [True, False]:
+        root_dir = storage.get_root_dir(is_raw)
+        partitions = {}
+        for root, _, files in os.walk(root_dir):
+            relative = Path(root).relative_to(root_dir).parts
+            if len(relative) != 3:
+                continue
+            provider, what_to_show, granularity = relative
+            for name in files:
+                match = FILE_STEM_PATTERN.match(Path(name).stem)
+                if not name.endswith('.csv') or not match:
+                    continue
+                key = (match['ticker'], granularity, match['date'][:4], what_to_show, provider)
+                partitions.setdefault(key, []).append((match['date'], Path(root) / name))
+        converted = 0
+        for (ticker, granularity, year, what_to_show, provider), files in partitions.items():
+            # Daily and weekly bars have one file per year, which is the year's only fragment
+            if len(files[0][0]) == 4:
+                file_path = storage.get_file_path(ticker, granularity, year, is_raw, what_to_show, provider)
+            else:
+                file_path = storage.get_partition_path(ticker, granularity, year, is_raw, what_to_show, provider)
+            # Dates already stored in Parquet are newer than the CSV files left in place, so they are kept and their CSV files skipped
+            existing = pd.read_parquet(file_path) if file_path.exists() else None
+            stored_days = set(existing['day'].unique()) if existing is not None else set()
+            frames = [storage.to_frame(pd.read_csv(csv_path), date_str) for date_str, csv_path in files if storage.get_day(date_str) not in stored_days]
+            if not frames:
+                continue
+            storage.write_partition(file_path, pd.concat(([existing] if existing is not None else []) + frames, ignore_index=True))
+            converted += len(frames)
+        print(f"Converted {converted} CSV file(s) into {len(partitions)} partition(s) under {root_dir}")
+
+
+if __name__ == '__main__':
+    convert_csv_tree(Config())
@@ -0,0 +1,52 @@
+from pathlib import Path
+import pandas as pd
+
+from src.storage import segment_file
+from src.storage.base_storage import StorageBackend
+
+
+class CsvStorage(StorageBackend):
+    """Stores one CSV file per ticker per date under provider/what_to_show/granularity; closed months may be compacted into segment files"""
+
+    # Business Logic --------------------------------------------------------
+    def get_file_path(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> Path:
+        """Returns path for CSV file based on provider, whatToShow and granularity"""
+        granularity_dir = self._ensure_dir(self.get_root_dir(is_raw) / provider / what_to_show / granularity)
+        return granularity_dir / f"{ticker}-{date_str}.csv"
+
+    def get_segment_path(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> Path:
+        """Returns path of the monthly segment file a compacted intraday date_str belongs to"""
+        return self.get_root_dir(is_raw) / provider / what_to_show / granularity / f"{ticker}-{date_str[:7]}.seg"
+
+    def locate(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> Path:
+        """Returns the date's CSV file, else its segment file, or None if neither exists"""
+        file_path = self.get_file_path(ticker, granularity, date_str, is_raw, what_to_show, provider)
+        if file_path.exists():
+            return file_path
+        segment_path = self.get_segment_path(ticker, granularity, date_str, is_raw, what_to_show, provider)
+        return segment_path if len(date_str) == 10 and segment_path.exists() else None
+
+    # IO --------------------------------------------------------------------
+    def stage(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str, data) -> tuple[Path, Path]:
+        """Writes bars to a temp file next to the date's CSV file"""
+        file_path = self.get_file_path(ticker, granularity, date_str, is_raw, what_to_show, provider)
+        tmp_path = file_path.with_suffix('.csv.tmp')
+        self.write_csv(tmp_path, data)
+        return tmp_path, file_path
+
+    def write_csv(self, file_path, data):
+        """Writes list of dicts or DataFrame to CSV; a DataFrame is written as is"""
+        (data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)).to_csv(file_path, index=False)
+
+    def read_file(self, file_path: Path, date_str: str) -> pd.DataFrame:
+        """Returns bars from the date's CSV file or its compacted segment"""
+        if file_path.suffix == '.seg':
+            return segment_file.read_day(file_path, date_str)
+        return pd.read_csv(file_path)
+
+    def read_file_dates(self, file_path: Path, dates: list[str]) -> dict:
+        """Returns {date_str: bars or None} of dates located in the same file, decoding a segment's index once"""
+        if file_path.suffix != '.seg':
+            return super().read_file_dates(file_path, dates)
+        days = segment_file.read_days(file_path, dates)
+        return {date_str: days.get(date_str) for date_str in dates}
@@ -0,0 +1,97 @@
+import os
+from pathlib import Path
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError as err:
+    raise ImportError("Parquet storage requires pyarrow; install it with: pip install -e .[parquet]") from err
+
+from src.storage.base_storage import StorageBackend
+
+
+# Name of the merged file in a year's partition directory, next to the day fragments not yet merged
+PARTITION_FILE = 'partition.parquet'
+
+
+class ParquetStorage(StorageBackend):
+    """Stores bars as zstd-compressed Parquet partitions per provider/what_to_show/granularity/ticker/year; each date is written as its own fragment file,
+    and compaction merges fragments of closed months into the year's partition file"""
+
+    # Business Logic --------------------------------------------------------
+    def get_file_path(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> Path:
+        """Returns path of the fragment file of date_str in its year's partition directory"""
+        year_dir = self._ensure_dir(self.get_root_dir(is_raw) / provider / what_to_show / granularity / ticker / date_str[:4])
+        return year_dir / f"{date_str}.parquet"
+
+    def get_partition_path(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> Path:
+        """Returns path of the merged partition file of date_str's year"""
+        year_dir = self._ensure_dir(self.get_root_dir(is_raw) / provider / what_to_show / granularity / ticker / date_str[:4])
+        return year_dir / PARTITION_FILE
+
+    def locate(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str) -> Path:
+        """Returns the date's fragment file, else its year's partition file, or None if neither exists"""
+        file_path = self.get_file_path(ticker, granularity, date_str, is_raw, what_to_show, provider)
+        if file_path.exists():
+            return file_path
+        partition_path = file_path.with_name(PARTITION_FILE)
+        return partition_path if partition_path.exists() else None
+
+    def get_day(self, date_str: str) -> int:
+        """Returns the day key stored with each row, e.g. 20240102 for daily files and 2024 for yearly files"""
+        return int(date_str.replace('-', ''))
+
+    def to_frame(self, data, date_str: str) -> pd.DataFrame:
+        """Returns typed DataFrame with UTC timestamps and the day key column; a DataFrame passed in is shallow-copied, never modified"""
+        df = data.copy(deep=False) if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        df['date'] = pd.to_datetime(df['date'], utc=True)
+        df['day'] = self.get_day(date_str)
+        return df
+
+    # IO --------------------------------------------------------------------
+    def stage(self, ticker: str, granularity: str, date_str: str, is_raw: bool, what_to_show: str, provider: str, data) -> tuple[Path, Path]:
+        """Writes bars of date_str as the date's fragment file to a temp file; the partition file is left alone until compaction"""
+        file_path = self.get_file_path(ticker, granularity, date_str, is_raw, what_to_show, provider)
+        tmp_path = file_path.with_suffix('.parquet.tmp')
+        self.to_frame(data, date_str).sort_values('date').to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+        return tmp_path, file_path
+
+    def write_partition(self, file_path: Path, df: pd.DataFrame):
+        """Atomically writes a whole partition sorted by timestamp"""
+        tmp_path = file_path.with_suffix('.parquet.tmp')
+        df.sort_values('date').to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+        # Compaction deletes the merged fragments next, so the partition must be on disk first
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+
+    def merge_fragments(self, ticker: str, granularity: str, dates: list[str], is_raw: bool, what_to_show: str, provider: str) -> int:
+        """Merges fragment files of dates (all of one year) into the year's partition file, replacing earlier bars of those dates, then deletes them; returns number merged"""
+        partition_path = self.get_partition_path(ticker, granularity, dates[0], is_raw, what_to_show, provider)
+        fragment_paths = [self.get_file_path(ticker, granularity, date_str, is_raw, what_to_show, provider) for date_str in dates]
+        frames = [pd.read_parquet(fragment_path) for fragment_path in fragment_paths]
+        if partition_path.exists():
+            existing = pd.read_parquet(partition_path)
+            frames.insert(0, existing[~existing['day'].isin([self.get_day(date_str) for date_str in dates])])
+        self.write_partition(partition_path, pd.concat(frames, ignore_index=True))
+        for fragment_path in fragment_paths:
+            fragment_path.unlink()
+        return len(fragment_paths)
+
+    def read_file(self, file_path: Path, date_str: str) -> pd.DataFrame:
+        """Returns bars of date_str from its fragment or its year's partition, or None if none are stored"""
+        if file_path.name == PARTITION_FILE:
+            df = pd.read_parquet(file_path, filters=[('day', '==', self.get_day(date_str))])
+        else:
+            df = pd.read_parquet(file_path)
+        if df.empty:
+            return None
+        return df.drop(columns='day').reset_index(drop=True)
+
+    def read_file_dates(self, file_path: Path, dates: list[str]) -> dict:
+        """Returns {date_str: bars or None} of dates located in the same file, reading a partition once for all of them"""
+        if file_path.name != PARTITION_FILE:
+            return super().read_file_dates(file_path, dates)
+        df = pd.read_parquet(file_path, filters=[('day', 'in', [self.get_day(date_str) for date_str in dates])])
+        days = {day: group.drop(columns='day').reset_index(drop=True) for day, group in df.groupby('day', sort=False)}
+        return {date_str: days.get(self.get_day(date_str)) for date_str in dates}
@@ -0,0 +1,128 @@
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Segment layout: one zlib-compressed block per day, the JSON index, then a trailer of the 8-byte little-endian
+# index length and MAGIC. The index maps each date to [block offset, block length, rows, [[column, dtype, bytes], ...]];
+# a block holds numeric columns as raw little-endian arrays and text columns ('text') as a one-byte-per-row null mask, little-endian
+# uint32 byte lengths and the concatenated UTF-8 values. Blocks of older segments may hold newline-joined 'str' columns, which are still read.
+MAGIC = b'DHSEG1\n'
+TRAILER = struct.Struct('<Q')
+
+
+def read_index(file_path: Path) -> dict:
+    """Returns {date_str: [offset, length, rows, columns]} of a segment file"""
+    with open(file_path, 'rb') as f:
+        return _read_index(f)
+
+
+def read_day(file_path: Path, date_str: str) -> pd.DataFrame:
+    """Returns bars of one date from a segment file with a single seek, or None if the date is not in it"""
+    with open(file_path, 'rb') as f:
+        entry = _read_index(f).get(date_str)
+        if entry is None:
+            return None
+        offset, length, rows, columns = entry
+        f.seek(offset)
+        return _decode_block(zlib.decompress(f.read(length)), rows, columns)
+
+
+def read_days(file_path: Path, dates: list[str] = None) -> dict:
+    """Returns {date_str: DataFrame} of every date in a segment file, or of those of dates it holds"""
+    with open(file_path, 'rb') as f:
+        index = _read_index(f)
+        if dates is not None:
+            index = {date_str: index[date_str] for date_str in dates if date_str in index}
+        days = {}
+        for date_str, (offset, length, rows, columns) in index.items():
+            f.seek(offset)
+            days[date_str] = _decode_block(zlib.decompress(f.read(length)), rows, columns)
+        return days
+
+
+def write_segment(file_path: Path, days: dict):
+    """Atomically writes {date_str: DataFrame} as one segment file with days in date order"""
+    index = {}
+    tmp_path = file_path.with_suffix('.seg.tmp')
+    with open(tmp_path, 'wb') as f:
+        for date_str in sorted(days):
+            block, columns = _encode_block(days[date_str])
+            compressed = zlib.compress(block, 6)
+            index[date_str] = [f.tell(), len(compressed), len(days[date_str]), columns]
+            f.write(compressed)
+        index_bytes = json.dumps(index).encode()
+        f.write(index_bytes + TRAILER.pack(len(index_bytes)) + MAGIC)
+        # Compaction deletes the merged day files next, so the segment must be on disk first
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def _read_index(f) -> dict:
+    """Reads the index from the trailer of an open segment file"""
+    f.seek(-(TRAILER.size + len(MAGIC)), os.SEEK_END)
+    trailer = f.read()
+    if trailer[TRAILER.size:] != MAGIC:
+        raise ValueError(f"Not a segment file: {f.name}")
+    (length,) = TRAILER.unpack(trailer[:TRAILER.size])
+    f.seek(-(length + TRAILER.size + len(MAGIC)), os.SEEK_END)
+    return json.loads(f.read(length))
+
+
+def _encode_block(frame: pd.DataFrame) -> tuple[bytes, list]:
+    """Encodes a DataFrame column by column; returns (block, [[column, dtype, bytes], ...])"""
+    parts = []
+    columns = []
+    for col in frame.columns:
+        values = frame[col]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            data = values.to_numpy().astype(values.dtype.newbyteorder('<')).tobytes()
+            dtype = values.dtype.str
+        else:
+            data = _encode_text(values)
+            dtype = 'text'
+        parts.append(data)
+        columns.append([col, dtype, len(data)])
+    return b''.join(parts), columns
+
+
+def _decode_block(block: bytes, rows: int, columns: list) -> pd.DataFrame:
+    """Decodes a block written by _encode_block"""
+    data = {}
+    position = 0
+    for col, dtype, size in columns:
+        chunk = block[position:position + size]
+        position += size
+        if dtype == 'text':
+            data[col] = _decode_text(chunk, rows)
+        elif dtype == 'str':
+            data[col] = chunk.decode().split('\n') if rows else []
+        else:
+            data[col] = np.frombuffer(chunk, dtype=np.dtype(dtype)).copy()
+    return pd.DataFrame(data)
+
+
+def _encode_text(values: pd.Series) -> bytes:
+    """Encodes a text column as null mask, uint32 lengths and UTF-8 values, so any string and missing values round-trip"""
+    nulls = values.isna().to_numpy()
+    encoded = [b'' if null else str(value).encode() for value, null in zip(values, nulls)]
+    lengths = np.array([len(value) for value in encoded], dtype='<u4')
+    return nulls.astype(np.uint8).tobytes() + lengths.tobytes() + b''.join(encoded)
+
+
+def _decode_text(chunk: bytes, rows: int) -> list:
+    """Decodes a column written by _encode_text; missing values come back as None"""
+    nulls = np.frombuffer(chunk, dtype=np.uint8, count=rows)
+    lengths = np.frombuffer(chunk, dtype='<u4', count=rows, offset=rows)
+    ends = np.cumsum(lengths) + rows * 5
+    values = []
+    start = rows * 5
+    for null, end in zip(nulls, ends):
+        values.append(None if null else chunk[start:end].decode())
+        start = end
+    return values
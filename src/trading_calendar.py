@@ -0,0 +1,41 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+
+class TradingCalendar:
+    """Exchange trading calendars (weekend days, holidays and regular session hours) from a local holiday table"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, calendar_file: str):
+        self.calendars = {}
+        self.aliases = {}
+        calendar_path = Path(calendar_file)
+        if not calendar_path.exists():
+            print(f"Trading calendar file {calendar_path} not found; only weekends will be skipped")
+            return
+        with open(calendar_path, 'r') as f:
+            table = json.load(f)
+        self.aliases = table.get('aliases', {})
+        for name, calendar in table['calendars'].items():
+            self.calendars[name] = {'weekend': set(calendar.get('weekend', [5, 6])), 'holidays': set(calendar.get('holidays', [])),
+                                    'timezone': calendar.get('timezone'), 'session': calendar.get('session'), 'early_closes': calendar.get('early_closes', {})}
+
+    # Business Logic --------------------------------------------------------
+    def get_calendar(self, exchange: str) -> dict:
+        """Returns calendar of exchange (or of its alias); unknown exchanges only skip weekends"""
+        name = self.aliases.get(exchange, exchange)
+        return self.calendars.get(name, {'weekend': {5, 6}, 'holidays': set(), 'timezone': None, 'session': None, 'early_closes': {}})
+
+    def is_trading_day(self, exchange: str, day: datetime) -> bool:
+        """Returns True if exchange is open on day"""
+        calendar = self.get_calendar(exchange)
+        return day.weekday() not in calendar['weekend'] and day.strftime('%Y-%m-%d') not in calendar['holidays']
+
+    def get_session(self, exchange: str, date_str: str) -> tuple[str, str, str]:
+        """Returns (timezone, open, close) of exchange's regular session on date_str with HH:MM local times, or None if the calendar has no session hours"""
+        calendar = self.get_calendar(exchange)
+        if not calendar['timezone'] or not calendar['session']:
+            return None
+        session_open, session_close = calendar['session']
+        return calendar['timezone'], session_open, calendar['early_closes'].get(date_str, session_close)
@@ -0,0 +1,46 @@
+import json
+import os
+from pathlib import Path
+
+
+class WatermarkTracker:
+    """Tracks per (provider, what_to_show, ticker, granularity) the last date up to which every planned date is done"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, data_dir: str):
+        self.file_path = Path(data_dir) / 'watermarks.json'
+        self.watermarks = {}
+        self.changed = False
+        if self.file_path.exists():
+            with open(self.file_path, 'r') as f:
+                for entry in json.load(f):
+                    key = (entry['provider'], entry['what_to_show'], entry['ticker'], entry['granularity'])
+                    self.watermarks[key] = {'date': entry['date'], 'starting_date': entry['starting_date']}
+
+    # Business Logic --------------------------------------------------------
+    def get(self, provider: str, what_to_show: str, ticker: str, granularity: str, starting_date: str):
+        """Returns watermark date, or None when unset or computed for a later starting_date"""
+        watermark = self.watermarks.get((provider, what_to_show, ticker, granularity))
+        if watermark is None or watermark['starting_date'] > starting_date:
+            return None
+        return watermark['date']
+
+    def set(self, provider: str, what_to_show: str, ticker: str, granularity: str, starting_date: str, date_str: str):
+        """Moves the watermark to date_str"""
+        key = (provider, what_to_show, ticker, granularity)
+        if self.watermarks.get(key) != {'date': date_str, 'starting_date': starting_date}:
+            self.watermarks[key] = {'date': date_str, 'starting_date': starting_date}
+            self.changed = True
+
+    # IO --------------------------------------------------------------------
+    def save(self):
+        """Atomically writes watermarks to JSON if any changed"""
+        if not self.changed:
+            return
+        entries = [{'provider': k[0], 'what_to_show': k[1], 'ticker': k[2], 'granularity': k[3], **v} for k, v in self.watermarks.items()]
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.file_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.file_path)
+        self.changed = False
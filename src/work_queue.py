@@ -0,0 +1,134 @@
+import asyncio
+import dataclasses
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.download_scheduler import DownloadUnit
+
+
+class WorkQueue:
+    """Shared SQLite queue of download units with shard leases and heartbeats, for several worker processes.
+    Database calls run on a worker thread with a short busy timeout and are retried while other workers hold the lock, so the event loop never waits on it"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, queue_file: str, lease_seconds: int, busy_timeout_seconds: float = 1.0):
+        self.lease_seconds = lease_seconds
+        Path(queue_file).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(queue_file, timeout=busy_timeout_seconds, isolation_level=None, check_same_thread=False)
+        self.db_lock = threading.Lock()
+        self.db.execute('''CREATE TABLE IF NOT EXISTS units (
+            id INTEGER PRIMARY KEY, unit_key TEXT UNIQUE NOT NULL, shard TEXT NOT NULL, payload TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued', lease_owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, completed_at REAL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS units_shard ON units (shard, state)')
+        if 'completed_at' not in {row[1] for row in self.db.execute('PRAGMA table_info(units)')}:
+            self.db.execute('ALTER TABLE units ADD COLUMN completed_at REAL')
+
+    def close(self):
+        """Closes the database connection"""
+        self.db.close()
+
+    # Business Logic --------------------------------------------------------
+    async def enqueue(self, units: list[DownloadUnit], planned_at: float):
+        """Adds units planned from a status snapshot taken at planned_at; queued and leased units are kept, and done ones are queued again
+        only if they finished before the snapshot, so a unit another worker just finished is not downloaded twice"""
+        rows = [(self._get_unit_key(unit), self._get_shard(unit), json.dumps(dataclasses.asdict(unit)), planned_at) for unit in units]
+        await self._run(self._enqueue, rows)
+
+    def _enqueue(self, rows: list[tuple]):
+        """Upserts (unit_key, shard, payload, planned_at) rows"""
+        with self._transaction():
+            self.db.executemany('''INSERT INTO units (unit_key, shard, payload) VALUES (?1, ?2, ?3)
+                ON CONFLICT(unit_key) DO UPDATE SET state = 'queued', payload = excluded.payload, lease_owner = NULL, lease_expires = NULL, completed_at = NULL
+                WHERE units.state = 'done' AND COALESCE(units.completed_at, 0) < ?4''', rows)
+
+    async def claim_shard(self, worker_id: str, providers: list[str] = None) -> list[tuple[int, DownloadUnit]]:
+        """Leases every claimable unit of one shard no other live worker holds, of providers only if given; expired leases are recovered; returns [(id, unit)]"""
+        return await self._run(self._claim_shard, worker_id, providers)
+
+    def _claim_shard(self, worker_id: str, providers: list[str]) -> list[tuple[int, DownloadUnit]]:
+        """Leases one shard's claimable units in one transaction"""
+        now = time.time()
+        provider_filter = f"AND substr(shard, 1, instr(shard, '/') - 1) IN ({', '.join('?' * len(providers))})" if providers is not None else ''
+        with self._transaction():
+            row = self.db.execute(f'''SELECT shard FROM units AS u
+                WHERE (state = 'queued' OR (state = 'leased' AND lease_expires < ?)) {provider_filter}
+                AND NOT EXISTS (SELECT 1 FROM units AS o WHERE o.shard = u.shard AND o.state = 'leased' AND o.lease_expires >= ? AND o.lease_owner != ?)
+                ORDER BY id LIMIT 1''', (now, *(providers or []), now, worker_id)).fetchone()
+            if row is None:
+                return []
+            self.db.execute('''UPDATE units SET state = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE shard = ? AND (state = 'queued' OR (state = 'leased' AND lease_expires < ?))''', (worker_id, now + self.lease_seconds, row[0], now))
+            rows = self.db.execute("SELECT id, payload FROM units WHERE shard = ? AND state = 'leased' AND lease_owner = ? ORDER BY id",
+                                   (row[0], worker_id)).fetchall()
+        return [(unit_id, DownloadUnit(**json.loads(payload))) for unit_id, payload in rows]
+
+    async def heartbeat(self, worker_id: str):
+        """Extends the leases held by worker_id"""
+        await self._run(self._execute, "UPDATE units SET lease_expires = ? WHERE lease_owner = ? AND state = 'leased'", (time.time() + self.lease_seconds, worker_id))
+
+    async def complete(self, unit_ids: list[int]):
+        """Marks leased units as done; call it once their files and statuses are written"""
+        completed_at = time.time()
+        await self._run(self._execute_many, "UPDATE units SET state = 'done', lease_owner = NULL, lease_expires = NULL, completed_at = ? WHERE id = ?",
+                        [(completed_at, unit_id) for unit_id in unit_ids])
+
+    async def release(self, worker_id: str):
+        """Returns units still leased by worker_id to the queue"""
+        await self._run(self._execute, "UPDATE units SET state = 'queued', lease_owner = NULL, lease_expires = NULL WHERE lease_owner = ? AND state = 'leased'", (worker_id,))
+
+    async def get_counts(self) -> dict:
+        """Returns number of units per state"""
+        return dict(await self._run(lambda: self.db.execute('SELECT state, COUNT(*) FROM units GROUP BY state').fetchall()))
+
+    # IO --------------------------------------------------------------------
+    async def _run(self, func, *args):
+        """Runs func(*args) on a worker thread, retrying with backoff while another process holds the database lock"""
+        delay = 0.05
+        while True:
+            try:
+                return await asyncio.to_thread(self._call, func, *args)
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) and 'busy' not in str(e):
+                    raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+    def _call(self, func, *args):
+        """Calls func(*args) holding the connection, which threads of this process share"""
+        with self.db_lock:
+            return func(*args)
+
+    def _execute(self, sql: str, params: tuple):
+        """Runs one statement in its own transaction"""
+        with self._transaction():
+            self.db.execute(sql, params)
+
+    def _execute_many(self, sql: str, rows: list[tuple]):
+        """Runs one statement per row in a single transaction"""
+        with self._transaction():
+            self.db.executemany(sql, rows)
+
+    @contextmanager
+    def _transaction(self):
+        """Runs the with block in one IMMEDIATE transaction so concurrent workers serialize on the database lock; rolled back if it or the commit fails"""
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+            self.db.execute('COMMIT')
+        except BaseException:
+            if self.db.in_transaction:
+                self.db.execute('ROLLBACK')
+            raise
+
+    # Misc ------------------------------------------------------------------
+    def _get_unit_key(self, unit: DownloadUnit) -> str:
+        """Returns identity of a unit across planning cycles and workers"""
+        return f"{unit.provider}/{unit.what_to_show}/{unit.granularity}/{unit.ticker}/{unit.dates[0]}/{unit.dates[-1]}"
+
+    def _get_shard(self, unit: DownloadUnit) -> str:
+        """Returns shard of a unit; one ticker's units stay on one worker so its files and normalization entry have a single writer"""
+        return f"{unit.provider}/{unit.what_to_show}/{unit.ticker}"
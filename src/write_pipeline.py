@@ -0,0 +1,47 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.metrics import METRICS
+
+
+class WritePipeline:
+    """Bounded write queue served by a thread pool; submit waits while max_pending writes are queued or running"""
+
+    # LifeCycle -------------------------------------------------------------
+    def __init__(self, max_workers: int, max_pending: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='writer')
+        self.max_pending = max_pending
+        self.slots = None
+        self.pending = set()
+
+    def close(self):
+        """Waits for running writes and stops the thread pool"""
+        self.executor.shutdown(wait=True)
+
+    # Business Logic --------------------------------------------------------
+    @property
+    def queue_depth(self) -> int:
+        """Returns number of writes queued or running"""
+        return len(self.pending)
+
+    async def submit(self, func, *args) -> asyncio.Future:
+        """Schedules func(*args) on the thread pool, waiting for a free slot first (backpressure)"""
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_pending)
+        await self.slots.acquire()
+        future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        self.pending.add(future)
+        METRICS.set_gauge('write_queue_depth', len(self.pending))
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: asyncio.Future):
+        """Frees the slot of a finished write"""
+        self.pending.discard(future)
+        METRICS.set_gauge('write_queue_depth', len(self.pending))
+        self.slots.release()
+
+    async def drain(self):
+        """Waits until every submitted write has finished"""
+        while self.pending:
+            await asyncio.gather(*list(self.pending), return_exceptions=True)
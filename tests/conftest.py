@@ -0,0 +1,26 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.configuration.config import Config
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def config(tmp_path) -> Config:
+    """Config with every data path under tmp_path, no download requests and a latency-free fake provider"""
+    settings = {'IBKR': {'host': '127.0.0.1', 'port': '4002', 'client_id': '', 'contract_cache_file': tmp_path / 'ibkr_contracts.json'},
+                'SAXO': {'uic_cache_file': tmp_path / 'saxo_uics.json'},
+                'Paths': {'processed_data_dir': tmp_path / 'processed-data', 'raw_data_dir': tmp_path / 'raw-data',
+                          'download_requests_file': tmp_path / 'download_requests.json', 'trading_calendar_file': REPO_DIR / 'config' / 'trading_calendars.json'},
+                'Timing': {'connection_retry_seconds': 1, 'download_cycle_seconds': 1800, 'error_retry_seconds': 1},
+                'Workers': {'queue_file': tmp_path / 'work-queue.sqlite'},
+                'Fake': {'latency_seconds': 0}}
+    with open(tmp_path / 'config.ini', 'w') as f:
+        for section, values in settings.items():
+            f.write(f"[{section}]\n" + ''.join(f"{key} = {value}\n" for key, value in values.items()) + "\n")
+    with open(tmp_path / 'download_requests.json', 'w') as f:
+        json.dump([], f)
+    return Config(str(tmp_path / 'config.ini'))
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from src.audit import audit_frame
+
+SESSION = ('America/New_York', '09:30', '16:00')
+
+
+def make_bars(times: list[str], volume: list[int] = None) -> pd.DataFrame:
+    dates = pd.DatetimeIndex([f"2024-01-02 {clock}" for clock in times]).tz_localize('America/New_York')
+    return pd.DataFrame({'date': dates.strftime('%Y-%m-%d %H:%M:%S%z'), 'volume': volume if volume is not None else np.full(len(times), 100)})
+
+
+def session_times(seconds: int) -> list[str]:
+    return [f"{t:%H:%M:%S}" for t in pd.date_range('2024-01-02 09:30', '2024-01-02 15:59:59', freq=f"{seconds}s")]
+
+
+def test_full_session_is_clean():
+    assert audit_frame(make_bars(session_times(300)), '2024-01-02', 300, SESSION, 3) == {}
+
+
+def test_inner_leading_and_trailing_gaps_are_counted():
+    times = session_times(300)
+    # Drop the first bar, two inner bars and the last three bars
+    kept = times[1:10] + times[12:-3]
+    issues = audit_frame(make_bars(kept), '2024-01-02', 300, SESSION, 3)
+    assert issues['missing_bars'] == 6
+    assert issues['gaps'] == [['09:30:00', 1], ['10:20:00', 2], ['15:45:00', 3]]
+
+
+def test_duplicates_unordered_and_outside_session():
+    times = ['09:30:00', '09:35:00', '09:35:00', '09:45:00', '09:40:00', '16:05:00']
+    issues = audit_frame(make_bars(times), '2024-01-02', 300, ('America/New_York', '09:30', '09:50'), 3)
+    assert issues['duplicates'] == 1
+    assert issues['unordered'] == 1
+    assert issues['outside_session'] == 1
+    assert 'missing_bars' not in issues
+
+
+def test_zero_volume_runs_at_least_threshold_are_reported():
+    times = session_times(300)[:10]
+    volume = [100, 0, 0, 0, 100, 0, 0, 100, 0, 0]
+    issues = audit_frame(make_bars(times, volume), '2024-01-02', 300, ('America/New_York', '09:30', '10:20'), 3)
+    assert issues == {'zero_volume': [['09:35:00', 3]]}
+
+
+def test_missing_volume_is_not_zero_volume():
+    times = session_times(300)[:6]
+    assert audit_frame(make_bars(times, [-1] * 6), '2024-01-02', 300, ('America/New_York', '09:30', '10:00'), 2) == {}
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from src.configuration.download_requests_parser import DownloadRequestsParser
+from src.data_downloader import DataDownloader
+from src.download_scheduler import DownloadUnit
+from src.file_manager import FileManager
+from src.providers import registry
+from src.providers.fake_client import FakeClient
+from src.providers.ibkr_client import IBKRClient
+
+JANUARY = [f"2024-01-{day:02d}" for day in [2, 3, 4, 5, 8, 9, 10, 11, 12, 16, 17, 18, 19, 22, 23, 24, 25, 26, 29, 30, 31]]
+
+
+def make_downloader(config, download_request) -> DataDownloader:
+    file_manager = FileManager(config)
+    return DataDownloader({'fake': FakeClient(config)}, file_manager, DownloadRequestsParser(config), config, registry.create_normalization_trackers(config, [download_request]))
+
+
+def test_derived_date_with_unreadable_source_stays_pending(config):
+    starting_date = (datetime.now() - timedelta(days=14)).strftime('%Y-%m-%d')
+    download_request = {'provider': 'fake', 'tickers': ['AAA'], 'granularities': ['5M'], 'derived_granularities': ['15M'], 'starting_date': starting_date}
+    downloader = make_downloader(config, download_request)
+    file_manager = downloader.file_manager
+    dates = downloader._generate_date_ranges('15M', starting_date, exchange='SMART')
+    # The first source date is done but its bars cannot be read, the second was never available
+    file_manager.set_status('AAA', '5M', dates[0], 'TRADES', 'fake', 'completed')
+    file_manager.set_status('AAA', '5M', dates[1], 'TRADES', 'fake', 'not_available')
+    asyncio.run(downloader._derive_request(download_request))
+    asyncio.run(downloader._derive_request(download_request))
+    assert file_manager.get_status('AAA', '15M', dates[0], 'TRADES', 'fake') is None
+    assert file_manager.get_status('AAA', '15M', dates[1], 'TRADES', 'fake') == 'not_available'
+    assert downloader.watermark_tracker.get('fake', 'TRADES', 'AAA', '15M', starting_date) is None
+
+
+def test_ibkr_window_days_follow_step_table(config):
+    client = IBKRClient(config)
+    assert [client.get_max_window_days(granularity) for granularity in ['1M', '5M', '15M', '30M', '1H']] == [1, 7, 7, 30, 30]
+
+
+def test_pending_dates_coalesce_into_consecutive_windows(config):
+    downloader = make_downloader(config, {'provider': 'fake', 'tickers': ['AAA'], 'granularities': ['5M']})
+    pending = [date_str for date_str in reversed(JANUARY) if date_str != '2024-01-24']
+    windows = downloader._coalesce_dates('fake', '5M', JANUARY, pending)
+    # Newest first, at most 7 calendar days each, and never across the missing 2024-01-24
+    assert windows == [['2024-01-25', '2024-01-26', '2024-01-29', '2024-01-30', '2024-01-31'], ['2024-01-17', '2024-01-18', '2024-01-19', '2024-01-22', '2024-01-23'],
+                       ['2024-01-10', '2024-01-11', '2024-01-12', '2024-01-16'], ['2024-01-03', '2024-01-04', '2024-01-05', '2024-01-08', '2024-01-09'], ['2024-01-02']]
+    assert downloader._coalesce_dates('fake', '30M', JANUARY, list(reversed(JANUARY))) == [JANUARY]
+    assert downloader._coalesce_dates('fake', '1D', ['2023', '2024'], ['2024', '2023']) == [['2024'], ['2023']]
+
+
+def test_window_bars_are_split_back_into_days(config):
+    downloader = make_downloader(config, {'provider': 'fake', 'tickers': ['AAA'], 'granularities': ['5M']})
+    fake = downloader.provider_clients['fake']
+    days = [fake._make_day('AAA', datetime.fromisoformat(date_str), 300) for date_str in ['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']]
+    unit = DownloadUnit('fake', 'AAA', '5M', ['2024-01-02', '2024-01-03', '2024-01-04'])
+    # 2024-01-05 lies outside the unit's window and 2024-01-03 came back empty
+    day_frames = downloader._split_by_date(unit, pd.concat([days[0], days[2], days[3]], ignore_index=True))
+    assert sorted(day_frames) == ['2024-01-02', '2024-01-04']
+    assert day_frames['2024-01-04']['date'].tolist() == days[2]['date'].tolist()
+    assert day_frames['2024-01-04'].index[0] == 0
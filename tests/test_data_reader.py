@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.data_reader import DataReader
+from src.file_manager import FileManager
+
+
+def make_bars(date_str: str, rows: int, close: float = 1.0) -> pd.DataFrame:
+    return pd.DataFrame({'date': pd.date_range(f"{date_str} 09:30", periods=rows, freq='5min', tz='America/New_York').strftime('%Y-%m-%d %H:%M:%S%z'),
+                         'open': close, 'high': close, 'low': close, 'close': np.full(rows, close), 'volume': 100})
+
+
+def store_days(file_manager: FileManager, dates: list[str], rows: int = 78):
+    for date_str in dates:
+        bars = make_bars(date_str, rows)
+        file_manager.commit_data('T', '5M', date_str, 'TRADES', 'fake', bars, bars)
+
+
+DATES = ['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']
+
+
+def test_read_returns_sorted_range_and_caches_dates(config):
+    file_manager = FileManager(config)
+    store_days(file_manager, DATES)
+    reader = DataReader(config, file_manager)
+    frame = reader.read('fake', 'TRADES', '5M', 'T', '2024-01-03', '2024-01-04')
+    assert len(frame) == 156 and frame['date'].is_monotonic_increasing and str(frame['date'].dt.tz) == 'UTC'
+    assert reader.get_cache_stats()['misses'] == 2
+    frame['close'] = -1.0
+    again = reader.read('fake', 'TRADES', '5M', 'T', '2024-01-03', '2024-01-04')
+    assert reader.get_cache_stats()['hits'] == 2
+    assert (again['close'] == 1.0).all()
+    reader.close()
+
+
+def test_changed_file_is_read_again(config):
+    file_manager = FileManager(config)
+    store_days(file_manager, DATES[:2])
+    reader = DataReader(config, file_manager)
+    reader.read('fake', 'TRADES', '5M', 'T', DATES[0], DATES[1])
+    bars = make_bars(DATES[1], 78, close=2.0)
+    file_manager.commit_data('T', '5M', DATES[1], 'TRADES', 'fake', bars, bars)
+    file_path = file_manager.locate_data('T', '5M', DATES[1], True, 'TRADES', 'fake')
+    # Make sure the rewrite is visible even on file systems with coarse timestamps
+    stat = file_path.stat()
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    frame = reader.read('fake', 'TRADES', '5M', 'T', DATES[0], DATES[1])
+    assert reader.get_cache_stats()['hits'] == 1
+    assert frame['close'].tolist() == [1.0] * 78 + [2.0] * 78
+    reader.close()
+
+
+def test_cache_evicts_least_recently_used_dates(config):
+    file_manager = FileManager(config)
+    store_days(file_manager, DATES, rows=2000)
+    reader = DataReader(config, file_manager)
+    reader.read('fake', 'TRADES', '5M', 'T', DATES[0], DATES[0])
+    day_bytes = reader.get_cache_stats()['megabytes'] * 2 ** 20
+    # Room for two dates
+    reader.max_cache_bytes = int(day_bytes * 2.5)
+    reader.read('fake', 'TRADES', '5M', 'T', DATES[1], DATES[1])
+    reader.read('fake', 'TRADES', '5M', 'T', DATES[0], DATES[0])
+    reader.read('fake', 'TRADES', '5M', 'T', DATES[2], DATES[2])
+    cached = {key[-1] for key in reader.cache}
+    assert cached == {DATES[0], DATES[2]}
+    assert reader.get_cache_stats()['megabytes'] * 2 ** 20 <= reader.max_cache_bytes
+    reader.close()
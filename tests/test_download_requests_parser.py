@@ -0,0 +1,18 @@
+import json
+
+from src.configuration.download_requests_parser import DownloadRequestsParser
+
+REQUESTS = [{'provider': 'fake', 'tickers': ['AAA'], 'granularities': ['5M', '1D'], 'derived_granularities': ['15M', '1H', '1D', '7M'], 'starting_date': '2024-01-02'},
+            {'provider': 'fake', 'tickers': ['BBB'], 'granularities': ['5M'], 'starting_date': '2024-01-02'}]
+
+
+def test_underivable_granularities_are_reported_once_and_dropped(config, capsys):
+    with open(config.download_requests_file, 'w') as f:
+        json.dump(REQUESTS, f)
+    parser = DownloadRequestsParser(config)
+    first = parser.get_download_requests()
+    assert first[0]['derived_granularities'] == ['15M', '1H']
+    assert 'derived_granularities' not in first[1]
+    assert capsys.readouterr().out.count('SKIPPED') == 2
+    assert parser.get_download_requests() == first
+    assert capsys.readouterr().out == ''
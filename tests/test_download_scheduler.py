@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from src.download_scheduler import DownloadUnit, ProviderPacer, SlidingWindowLimiter
+
+
+def test_limiter_never_exceeds_limit_in_any_window():
+    limiter = SlidingWindowLimiter(limit=60, window_seconds=600)
+    now = 0.0
+    sends = []
+    # Greedy sender over 30 simulated minutes, starting without any earlier sends
+    while now < 1800:
+        delay = limiter.get_delay(now)
+        if delay > 0:
+            now += delay
+            continue
+        limiter.record(now)
+        sends.append(now)
+        now += 1
+    assert len(sends) == 180
+    for i, start in enumerate(sends):
+        assert sum(1 for sent in sends[i:] if sent < start + 600) <= 60
+
+
+def test_limiter_delay_points_at_oldest_send_leaving_window():
+    limiter = SlidingWindowLimiter(limit=2, window_seconds=10)
+    limiter.record(0.0)
+    limiter.record(4.0)
+    assert limiter.get_delay(5.0) == 5.0
+    assert limiter.get_delay(10.0) == 0.0
+
+
+def make_pacer(**overrides) -> ProviderPacer:
+    pacing = {'max_concurrent_requests': 4, 'requests_per_window': 3, 'window_seconds': 0.3,
+              'contract_requests_per_window': 100, 'contract_window_seconds': 1, 'identical_request_cooldown_seconds': 0}
+    pacing.update(overrides)
+    return ProviderPacer(pacing)
+
+
+def test_pacer_holds_concurrent_acquires_to_window_budget():
+    async def scenario():
+        pacer = make_pacer()
+        units = [DownloadUnit('fake', f"T{i}", '5M', ['2024-01-02']) for i in range(6)]
+        started = time.monotonic()
+        await asyncio.gather(*[pacer.acquire(unit) for unit in units])
+        return time.monotonic() - started, list(pacer.limiter.sent)
+    elapsed, sent = asyncio.run(scenario())
+    assert elapsed >= 0.3
+    assert all(later - earlier >= 0.3 - 1e-6 for earlier, later in zip(sent, sent[3:]))
+
+
+def test_pacer_cooldown_is_reserved_before_waiting():
+    async def scenario():
+        pacer = make_pacer(requests_per_window=100, identical_request_cooldown_seconds=0.2)
+        unit = DownloadUnit('fake', 'AAA', '5M', ['2024-01-02'])
+        await asyncio.gather(pacer.acquire(unit), pacer.acquire(unit))
+        return list(pacer.limiter.sent)
+    first, second = asyncio.run(scenario())
+    assert second - first >= 0.2 - 1e-6
+
+
+def test_pages_skip_the_cooldown_but_use_the_budget():
+    async def scenario():
+        pacer = make_pacer(requests_per_window=2, identical_request_cooldown_seconds=10)
+        unit = DownloadUnit('fake', 'AAA', '5M', ['2024-01-02'])
+        await pacer.acquire(unit)
+        await pacer.acquire(unit, page=True)
+        started = time.monotonic()
+        await pacer.acquire(unit, page=True)
+        return time.monotonic() - started
+    assert asyncio.run(scenario()) >= 0.25
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pandas as pd
+
+from src.configuration.download_requests_parser import DownloadRequestsParser
+from src.file_manager import FileManager
+from src.live_stream import LiveStream
+from src.providers import registry
+from src.providers.fake_client import FakeClient
+
+REQUESTS = [{'provider': 'fake', 'tickers': ['AAA'], 'granularities': ['5M', '1D'], 'starting_date': '2024-01-02', 'live': True}]
+
+
+class StreamingClient:
+    """Streams the given bars once, then stays subscribed without bars until the stream is cancelled"""
+
+    def __init__(self, bars: list[dict]):
+        self.bars = bars
+        self.subscriptions = 0
+        self.delivered = asyncio.Event()
+
+    async def stream_bars(self, ticker, granularity, currency, exchange, contract_type, what_to_show):
+        self.subscriptions += 1
+        for bar in self.bars:
+            yield bar
+        self.delivered.set()
+        await asyncio.Event().wait()
+
+
+def make_stream(config, bars: list[dict]):
+    with open(config.download_requests_file, 'w') as f:
+        json.dump(REQUESTS, f)
+    file_manager = FileManager(config)
+    provider_clients = {}
+    stream = LiveStream(provider_clients, file_manager, DownloadRequestsParser(config), config, registry.create_normalization_trackers(config, REQUESTS))
+    return stream, provider_clients, file_manager, StreamingClient(bars)
+
+
+def day_bars(config, day: str) -> list[dict]:
+    return FakeClient(config)._make_day('AAA', datetime.fromisoformat(day), 300).to_dict('records')
+
+
+async def stop_after_delivery(task: asyncio.Task, client: StreamingClient):
+    """Cancels the stream once the client has sent all its bars; cancelling flushes the open sessions"""
+    await asyncio.wait_for(client.delivered.wait(), 5)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def test_stream_waits_for_provider_and_writes_days_incomplete(config):
+    first, second = day_bars(config, '2024-01-02'), day_bars(config, '2024-01-03')
+    stream, provider_clients, file_manager, client = make_stream(config, first + second[:10])
+
+    async def scenario():
+        task = asyncio.create_task(stream.run())
+        await asyncio.sleep(0.1)
+        assert client.subscriptions == 0
+        provider_clients['fake'] = client
+        await stop_after_delivery(task, client)
+    asyncio.run(scenario())
+
+    # Only the intraday granularity is streamed
+    assert client.subscriptions == 1
+    assert file_manager.get_status('AAA', '5M', '2024-01-02', 'TRADES', 'fake') == 'incomplete'
+    assert file_manager.get_status('AAA', '5M', '2024-01-03', 'TRADES', 'fake') == 'incomplete'
+    assert len(file_manager.read_data('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake')) == len(first)
+    assert len(file_manager.read_data('AAA', '5M', '2024-01-03', True, 'TRADES', 'fake')) == 10
+
+
+def test_bars_of_completed_day_are_ignored(config):
+    bars = day_bars(config, '2024-01-02')
+    stream, provider_clients, file_manager, client = make_stream(config, bars)
+    frame = pd.DataFrame(bars[:5])
+    file_manager.commit_data('AAA', '5M', '2024-01-02', 'TRADES', 'fake', frame, frame)
+    provider_clients['fake'] = client
+
+    async def scenario():
+        await stop_after_delivery(asyncio.create_task(stream.run()), client)
+    asyncio.run(scenario())
+    assert file_manager.get_status('AAA', '5M', '2024-01-02', 'TRADES', 'fake') == 'completed'
+    assert len(file_manager.read_data('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake')) == 5
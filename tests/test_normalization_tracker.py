@@ -0,0 +1,73 @@
+import pandas as pd
+
+from src.normalization_tracker import NormalizationTracker
+
+
+def make_bars(close: float) -> pd.DataFrame:
+    return pd.DataFrame({'date': ['2024-01-02 09:30:00'], 'open': [close], 'high': [close], 'low': [close], 'close': [close], 'volume': [100]})
+
+
+def test_compaction_by_another_tracker_is_replayed(tmp_path):
+    compactor = NormalizationTracker(tmp_path, 'fake', 'TRADES', compact_after_entries=0)
+    follower = NormalizationTracker(tmp_path, 'fake', 'TRADES', compact_after_entries=0)
+    for i in range(5):
+        compactor.update_entry(f"T{i}", '5M', make_bars(10 + i))
+    follower.refresh()
+    assert follower.get_max_values('T4', '5M')['close'] == 14
+    follower.update_entry('F', '5M', make_bars(7))
+    # Compaction must keep the follower's entry it has not replayed yet and rewrite the journal the follower has read into
+    compactor.compact()
+    assert not compactor.journal_path.exists()
+    assert compactor.get_max_values('F', '5M')['close'] == 7
+    compactor.update_entry('T0', '5M', make_bars(50))
+    follower.refresh()
+    assert follower.get_max_values('T0', '5M')['close'] == 50
+    assert follower.get_max_values('F', '5M')['close'] == 7
+    assert NormalizationTracker(tmp_path, 'fake', 'TRADES').get_version('T0', '5M') == 2
+    compactor.close()
+    follower.close()
+
+
+def test_unflushed_entries_survive_a_reload(tmp_path):
+    compactor = NormalizationTracker(tmp_path, 'fake', 'TRADES', compact_after_entries=0)
+    follower = NormalizationTracker(tmp_path, 'fake', 'TRADES', flush_interval_seconds=3600, compact_after_entries=0)
+    follower.update_entry('F', '5M', make_bars(7))
+    follower.mark_renormalized('F', '5M', 1)
+    compactor.update_entry('T', '5M', make_bars(3))
+    compactor.compact()
+    follower.refresh()
+    assert follower.pending and follower.has_entry('T', '5M') and follower.has_entry('F', '5M')
+    follower.flush()
+    assert NormalizationTracker(tmp_path, 'fake', 'TRADES').has_entry('F', '5M')
+
+
+def test_raised_max_values_make_pair_stale(tmp_path):
+    tracker = NormalizationTracker(tmp_path, 'fake', 'TRADES')
+    tracker.update_entry('T', '5M', make_bars(10))
+    assert tracker.get_version('T', '5M') == 1 and tracker.get_stale_pairs() == []
+    assert not tracker.update_entry('T', '5M', make_bars(9))
+    assert tracker.update_entry('T', '5M', make_bars(12))
+    assert tracker.get_version('T', '5M') == 2
+    assert tracker.get_max_values('T', '5M')['close'] == 12
+    assert tracker.get_stale_pairs() == [('T', '5M')]
+    tracker.mark_renormalized('T', '5M', 2)
+    assert tracker.get_stale_pairs() == []
+    tracker.flush()
+    assert NormalizationTracker(tmp_path, 'fake', 'TRADES').get_stale_pairs() == []
+
+
+def test_renormalized_marker_keeps_max_values_raised_meanwhile(tmp_path):
+    downloader = NormalizationTracker(tmp_path, 'fake', 'TRADES', compact_after_entries=0)
+    renormalizer = NormalizationTracker(tmp_path, 'fake', 'TRADES', compact_after_entries=0)
+    downloader.update_entry('T', '5M', make_bars(10))
+    downloader.update_entry('T', '5M', make_bars(12))
+    renormalizer.refresh()
+    version = renormalizer.get_version('T', '5M')
+    # The downloader raises the max values while the renormalizer rewrites files with version 2
+    downloader.update_entry('T', '5M', make_bars(20))
+    renormalizer.mark_renormalized('T', '5M', version)
+    renormalizer.flush()
+    for tracker in (renormalizer, NormalizationTracker(tmp_path, 'fake', 'TRADES')):
+        assert tracker.get_max_values('T', '5M')['close'] == 20
+        assert tracker.get_version('T', '5M') == 3
+        assert tracker.get_stale_pairs() == [('T', '5M')]
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pandas as pd
+
+from src.storage.convert_storage import convert_csv_tree
+from src.storage.parquet_storage import PARTITION_FILE, ParquetStorage
+
+
+def make_bars(date_str: str, close: float, count: int = 3) -> pd.DataFrame:
+    dates = pd.date_range(f"{date_str} 09:30", periods=count, freq='5min', tz='America/New_York')
+    return pd.DataFrame({'date': dates.strftime('%Y-%m-%d %H:%M:%S%z'), 'open': close, 'high': close, 'low': close, 'close': close,
+                         'volume': 100, 'average': close, 'barCount': 1})
+
+
+def make_storage(config) -> ParquetStorage:
+    return ParquetStorage(config.raw_data_dir, config.processed_data_dir)
+
+
+def test_fragment_takes_precedence_until_merged(config):
+    storage = make_storage(config)
+    storage.write('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake', make_bars('2024-01-02', 1.0))
+    storage.write('AAA', '5M', '2024-01-03', True, 'TRADES', 'fake', make_bars('2024-01-03', 1.0))
+    assert storage.merge_fragments('AAA', '5M', ['2024-01-02', '2024-01-03'], True, 'TRADES', 'fake') == 2
+    assert storage.locate('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake').name == PARTITION_FILE
+
+    # A later write of a merged date is read from its fragment, then replaces the partition's bars of that date only
+    storage.write('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake', make_bars('2024-01-02', 2.0, count=2))
+    assert storage.locate('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake').name == '2024-01-02.parquet'
+    assert storage.read('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake')['close'].tolist() == [2.0, 2.0]
+    storage.merge_fragments('AAA', '5M', ['2024-01-02'], True, 'TRADES', 'fake')
+    assert not storage.get_file_path('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake').exists()
+    assert storage.read('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake')['close'].tolist() == [2.0, 2.0]
+    assert storage.read('AAA', '5M', '2024-01-03', True, 'TRADES', 'fake')['close'].tolist() == [1.0, 1.0, 1.0]
+    assert storage.read('AAA', '5M', '2024-01-04', True, 'TRADES', 'fake') is None
+
+
+def test_read_file_dates_reads_partition_once(config):
+    storage = make_storage(config)
+    for date_str in ['2024-01-02', '2024-01-03']:
+        storage.write('AAA', '5M', date_str, True, 'TRADES', 'fake', make_bars(date_str, 1.0))
+    storage.merge_fragments('AAA', '5M', ['2024-01-02', '2024-01-03'], True, 'TRADES', 'fake')
+    partition_path = storage.get_partition_path('AAA', '5M', '2024', True, 'TRADES', 'fake')
+    frames = storage.read_file_dates(partition_path, ['2024-01-03', '2024-01-04'])
+    assert len(frames['2024-01-03']) == 3 and 'day' not in frames['2024-01-03']
+    assert frames['2024-01-04'] is None
+
+
+def test_conversion_keeps_dates_already_in_the_partition(config):
+    csv_dir = Path(config.raw_data_dir) / 'fake' / 'TRADES' / '5M'
+    csv_dir.mkdir(parents=True)
+    make_bars('2024-01-02', 1.0).to_csv(csv_dir / 'AAA-2024-01-02.csv', index=False)
+    make_bars('2024-01-03', 1.0).to_csv(csv_dir / 'AAA-2024-01-03.csv', index=False)
+    storage = make_storage(config)
+    storage.write('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake', make_bars('2024-01-02', 2.0))
+    storage.merge_fragments('AAA', '5M', ['2024-01-02'], True, 'TRADES', 'fake')
+    convert_csv_tree(config)
+    assert storage.read('AAA', '5M', '2024-01-02', True, 'TRADES', 'fake')['close'].tolist() == [2.0, 2.0, 2.0]
+    assert storage.read('AAA', '5M', '2024-01-03', True, 'TRADES', 'fake')['close'].tolist() == [1.0, 1.0, 1.0]
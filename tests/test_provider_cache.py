@@ -0,0 +1,50 @@
+import asyncio
+import dataclasses
+import time
+
+import pytest
+from ib_async import RequestError, Stock
+
+from src.providers.ibkr_client import IBKRClient
+from src.providers.provider_cache import ProviderCache
+
+KEY = ('AAA', 'Stock', 'SMART', 'USD')
+
+
+def test_entries_persist_and_expire(tmp_path, monkeypatch):
+    cache = ProviderCache(tmp_path / 'cache.json', ttl_seconds=60)
+    cache.set(KEY, {'conId': 1})
+    reloaded = ProviderCache(tmp_path / 'cache.json', ttl_seconds=60)
+    assert reloaded.get(KEY) == {'conId': 1} and reloaded.contains(KEY)
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert not reloaded.contains(KEY)
+    assert reloaded.get(KEY) is None
+    assert reloaded.get_stats() == {'entries': 0, 'hits': 1, 'misses': 1}
+
+
+def test_invalidate_one_or_all(tmp_path):
+    cache = ProviderCache(tmp_path / 'cache.json', ttl_seconds=60)
+    cache.set_many({KEY: 1, ('BBB',): 2})
+    cache.invalidate(KEY)
+    assert ProviderCache(tmp_path / 'cache.json', ttl_seconds=60).entries.keys() == {('BBB',)}
+    cache.invalidate()
+    assert ProviderCache(tmp_path / 'cache.json', ttl_seconds=60).entries == {}
+
+
+@pytest.mark.parametrize('error, invalidated', [(RequestError(1, 200, 'No security definition has been found for the request'), True),
+                                                (RequestError(1, 162, 'Historical Market Data Service error message:API historical data query cancelled'), False),
+                                                (asyncio.TimeoutError(), False), (ConnectionError('Not connected'), False)])
+def test_fetch_drops_cached_contract_only_on_definition_errors(config, error, invalidated):
+    async def scenario():
+        client = IBKRClient(config)
+        client.contract_cache.set(KEY, dataclasses.asdict(Stock('AAA', 'SMART', 'USD', conId=1)))
+
+        async def fail(*args, **kwargs):
+            raise error
+        client.connections[0].reqHistoricalDataAsync = fail
+        client.connections[0].isConnected = lambda: True
+        with pytest.raises(type(error)):
+            await client.fetch_historical_data('AAA', '5M', '20240102 23:59:59')
+        return client.contract_cache.contains(KEY)
+    assert asyncio.run(scenario()) is not invalidated
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from src.file_manager import FileManager
+from src.normalization_tracker import NormalizationTracker
+from src.renormalizer import Renormalizer
+
+
+def make_bars(date_str: str, close: float) -> pd.DataFrame:
+    return pd.DataFrame({'date': [f"{date_str} 09:30:00", f"{date_str} 09:35:00"], 'open': [close / 2, close], 'high': [close, close],
+                         'low': [close / 2, close / 2], 'close': [close / 2, close], 'volume': [100, 200]})
+
+
+def test_stale_pair_is_rewritten_with_current_max_values(config):
+    file_manager = FileManager(config)
+    tracker = NormalizationTracker(config.processed_data_dir, 'fake', 'TRADES')
+    for date_str, close in [('2024-01-02', 10.0), ('2024-01-03', 40.0)]:
+        bars = make_bars(date_str, close)
+        tracker.update_entry('T', '5M', bars)
+        file_manager.commit_data('T', '5M', date_str, 'TRADES', 'fake', bars, tracker.normalize_frame('T', '5M', bars))
+    assert tracker.get_stale_pairs() == [('T', '5M')]
+    stats = Renormalizer(config, file_manager, {('fake', 'TRADES'): tracker}).run()
+    assert stats['pairs'] == 1 and stats['dates'] == 2
+    assert tracker.get_stale_pairs() == []
+    processed = file_manager.read_data('T', '5M', '2024-01-02', False, 'TRADES', 'fake')
+    # Scaled by the max close of 40 raised after the first date was written
+    assert np.allclose(processed['close'], [5 / 40 * 2 - 1, 10 / 40 * 2 - 1])
+    assert NormalizationTracker(config.processed_data_dir, 'fake', 'TRADES').get_stale_pairs() == []
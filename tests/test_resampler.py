@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.resampler import Resampler
+
+
+def make_bars(start: str, count: int, seconds: int, volume=None) -> pd.DataFrame:
+    dates = pd.date_range(start, periods=count, freq=f"{seconds}s", tz='America/New_York')
+    closes = 100 + np.arange(count, dtype=np.float64)
+    return pd.DataFrame({'date': dates.strftime('%Y-%m-%d %H:%M:%S%z'), 'open': closes - 0.5, 'high': closes + 1, 'low': closes - 1, 'close': closes,
+                         'volume': np.arange(1, count + 1) if volume is None else np.full(count, volume), 'average': closes,
+                         'barCount': np.full(count, 2 if volume is None else volume)})
+
+
+def test_ohlcv_aggregation_matches_pandas_resample():
+    bars = make_bars('2024-01-02 09:30', 78, 300)
+    result = Resampler(None).resample_frame(bars, '1H')
+    times = pd.to_datetime(bars['date'], format='ISO8601')
+    expected = bars.assign(date=times).set_index('date').resample('1h').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'barCount': 'sum'})
+    assert len(result) == 7
+    # Buckets are clock aligned and labelled with their first bar: 09:30 for the 09:00 hour
+    assert result['date'].iloc[0] == bars['date'].iloc[0] and result['date'].iloc[1] == bars['date'].iloc[6]
+    for col in ['open', 'high', 'low', 'close', 'volume', 'barCount']:
+        assert result[col].tolist() == expected[col].tolist(), col
+
+
+def test_average_is_volume_weighted():
+    bars = make_bars('2024-01-02 10:00', 3, 300)
+    bars['volume'] = [1, 1, 2]
+    bars['average'] = [10.0, 20.0, 40.0]
+    result = Resampler(None).resample_frame(bars, '15M')
+    assert result['average'].tolist() == [pytest.approx(27.5)]
+
+
+def test_bars_without_volume_keep_minus_one():
+    bars = make_bars('2024-01-02 10:00', 6, 300, volume=-1)
+    bars['average'] = -1.0
+    result = Resampler(None).resample_frame(bars, '15M')
+    assert result['volume'].tolist() == [-1, -1]
+    assert result['barCount'].tolist() == [-1, -1]
+    assert result['average'].tolist() == [-1.0, -1.0]
+
+
+def test_source_granularity_must_divide_target():
+    resampler = Resampler(None)
+    assert resampler.get_source_granularity('1H', ['1M', '5M', '15M', '1D']) == '15M'
+    assert resampler.get_source_granularity('15M', ['5M', '1M']) == '5M'
+    with pytest.raises(ValueError):
+        resampler.get_source_granularity('15M', ['30M'])
+    with pytest.raises(ValueError):
+        resampler.get_source_granularity('1D', ['1M'])
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from src.retry_tracker import RetryTracker
+
+UNIT = ('fake', 'TRADES', '5M', 'AAA')
+
+
+def test_backoff_doubles_up_to_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(time, 'time', lambda: 1000.0)
+    tracker = RetryTracker(tmp_path, base_seconds=60, max_seconds=300)
+    delays = []
+    for _ in range(5):
+        tracker.record_failure(*UNIT, '2024-01-02', TimeoutError('no data'))
+        delays.append(tracker.get(*UNIT, '2024-01-02')['next_eligible'] - 1000.0)
+    assert delays == [60, 120, 240, 300, 300]
+    retry = tracker.get(*UNIT, '2024-01-02')
+    assert retry['attempts'] == 5 and retry['last_error'] == 'TimeoutError' and retry['message'] == 'no data'
+    tracker.record_success(*UNIT, '2024-01-02')
+    assert tracker.get(*UNIT, '2024-01-02') is None
+
+
+def test_save_merges_changes_of_other_trackers(tmp_path):
+    first, second = RetryTracker(tmp_path, 60, 300), RetryTracker(tmp_path, 60, 300)
+    first.record_failure(*UNIT, '2024-01-02', ValueError('a'))
+    first.record_failure(*UNIT, '2024-01-03', ValueError('b'))
+    first.save()
+    # second loaded before first saved; its own changes must not drop first's entries
+    second.record_failure(*UNIT, '2024-01-04', ValueError('c'))
+    second.record_success(*UNIT, '2024-01-03')
+    second.save()
+    assert sorted(key[-1] for key in RetryTracker(tmp_path, 60, 300).retries) == ['2024-01-02', '2024-01-04']
+    assert sorted(key[-1] for key in second.retries) == ['2024-01-02', '2024-01-04']
+
+
+def test_concurrent_saves_keep_every_failure(tmp_path):
+    trackers = [RetryTracker(tmp_path, 60, 300) for _ in range(8)]
+
+    def fail_and_save(i, tracker):
+        for day in range(5):
+            tracker.record_failure(*UNIT, f"2024-0{i + 1}-{day + 1:02d}", ValueError('x'))
+            tracker.save()
+    threads = [threading.Thread(target=fail_and_save, args=(i, tracker)) for i, tracker in enumerate(trackers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(RetryTracker(tmp_path, 60, 300).retries) == 40
@@ -0,0 +1,48 @@
+import json
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.storage import segment_file
+
+
+def make_day(notes: list) -> pd.DataFrame:
+    count = len(notes)
+    return pd.DataFrame({'date': [f"2024-01-02 09:{30 + i}:00-05:00" for i in range(count)], 'close': np.arange(count, dtype=np.float64) + 0.5,
+                         'volume': np.arange(count, dtype=np.int64), 'note': pd.Series(notes, dtype=object)})
+
+
+def test_round_trip_keeps_values_dtypes_and_missing_text(tmp_path):
+    days = {'2024-01-03': make_day(['multi\nline', None, '', 'ünïcode', np.nan]), '2024-01-02': make_day(['a', 'b']), '2024-01-04': make_day([])}
+    file_path = tmp_path / 'AAA-2024-01.seg'
+    segment_file.write_segment(file_path, days)
+    assert list(segment_file.read_index(file_path)) == ['2024-01-02', '2024-01-03', '2024-01-04']
+    day = segment_file.read_day(file_path, '2024-01-03')
+    assert day['note'].isna().tolist() == [False, True, False, False, True]
+    assert day['note'].dropna().tolist() == ['multi\nline', '', 'ünïcode']
+    assert day['close'].tolist() == days['2024-01-03']['close'].tolist() and day['volume'].dtype == np.int64
+    assert day['date'].tolist() == days['2024-01-03']['date'].tolist()
+    assert segment_file.read_day(file_path, '2024-01-04').empty
+    assert segment_file.read_day(file_path, '2024-01-05') is None
+    assert list(segment_file.read_days(file_path, ['2024-01-02', '2024-01-05'])) == ['2024-01-02']
+
+
+def test_newline_joined_str_blocks_are_still_read(tmp_path):
+    closes = np.array([1.5, 2.5], dtype='<f8').tobytes()
+    dates = '\n'.join(['2024-01-02 09:30:00-05:00', '2024-01-02 09:35:00-05:00']).encode()
+    block = zlib.compress(dates + closes)
+    index = json.dumps({'2024-01-02': [0, len(block), 2, [['date', 'str', len(dates)], ['close', '<f8', len(closes)]]]}).encode()
+    file_path = tmp_path / 'AAA-2024-01.seg'
+    file_path.write_bytes(block + index + segment_file.TRAILER.pack(len(index)) + segment_file.MAGIC)
+    day = segment_file.read_day(file_path, '2024-01-02')
+    assert day['date'].tolist() == ['2024-01-02 09:30:00-05:00', '2024-01-02 09:35:00-05:00']
+    assert day['close'].tolist() == [1.5, 2.5]
+
+
+def test_other_files_are_rejected(tmp_path):
+    file_path = tmp_path / 'AAA-2024-01.seg'
+    file_path.write_bytes(b'date,close\n2024-01-02,1.0\n')
+    with pytest.raises(ValueError):
+        segment_file.read_index(file_path)
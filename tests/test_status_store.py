@@ -0,0 +1,89 @@
+from src.status_store import StatusStore
+
+SERIES = ('fake', 'TRADES', '5M', 'AAA')
+
+
+def test_status_survives_reopen(tmp_path):
+    store = StatusStore(tmp_path)
+    store.set(*SERIES, '2024-01-02', 'completed')
+    store.set(*SERIES, '2024-01-03', 'corrupted')
+    store.set(*SERIES, '2024-01-03', 'completed')
+    store.set(*SERIES, '2024-01-04', 'incomplete')
+    store.set(*SERIES, '2024-01-04', None)
+    store.close()
+    reopened = StatusStore(tmp_path)
+    assert reopened.get_dates(*SERIES) == {'2024-01-02': 'completed', '2024-01-03': 'completed'}
+    reopened.close()
+
+
+def test_refresh_replays_appends_of_other_instance(tmp_path):
+    writer, reader = StatusStore(tmp_path), StatusStore(tmp_path)
+    writer.set(*SERIES, '2024-01-02', 'completed')
+    assert reader.get(*SERIES, '2024-01-02') is None
+    reader.refresh()
+    assert reader.get(*SERIES, '2024-01-02') == 'completed'
+    writer.close()
+    reader.close()
+
+
+def test_compaction_keeps_appends_of_other_instance(tmp_path):
+    first, second = StatusStore(tmp_path), StatusStore(tmp_path)
+    for i in range(300):
+        first.set(*SERIES, f"2024-01-{i % 3 + 1:02d}", 'completed' if i % 2 else 'corrupted')
+    lines_before = len(first.log_path.read_text().splitlines())
+    assert second.compact(force=True)
+    assert len(first.log_path.read_text().splitlines()) == 3 < lines_before
+    # first still holds the replaced log open; its next append must land in the compacted one
+    first.set(*SERIES, '2024-01-05', 'completed')
+    second.set(*SERIES, '2024-01-06', 'not_available')
+    third = StatusStore(tmp_path)
+    assert third.get_dates(*SERIES) == {'2024-01-01': 'completed', '2024-01-02': 'corrupted', '2024-01-03': 'completed',
+                                        '2024-01-05': 'completed', '2024-01-06': 'not_available'}
+    first.refresh()
+    assert first.get_dates(*SERIES) == third.get_dates(*SERIES)
+    for store in (first, second, third):
+        store.close()
+
+
+def test_open_does_not_compact(tmp_path):
+    store = StatusStore(tmp_path)
+    for i in range(20):
+        store.set(*SERIES, '2024-01-02', 'completed' if i % 2 else 'corrupted')
+    size = store.log_path.stat().st_size
+    store.close()
+    StatusStore(tmp_path).close()
+    assert store.log_path.stat().st_size == size
+
+
+def test_torn_last_line_is_replayed_once_complete(tmp_path):
+    writer, reader = StatusStore(tmp_path), StatusStore(tmp_path)
+    writer.set(*SERIES, '2024-01-02', 'completed')
+    line = writer._format_line(*SERIES, '2024-01-03', 'incomplete')
+    with open(writer.log_path, 'a') as f:
+        f.write(line[:10])
+    reader.refresh()
+    assert reader.get_dates(*SERIES) == {'2024-01-02': 'completed'}
+    with open(writer.log_path, 'a') as f:
+        f.write(line[10:])
+    reader.refresh()
+    assert reader.get_dates(*SERIES) == {'2024-01-02': 'completed', '2024-01-03': 'incomplete'}
+    assert reader.get_open_dates(*SERIES) == {'2024-01-03'}
+    assert reader.get_pending_dates(*SERIES, ['2024-01-02', '2024-01-03', '2024-01-04']) == ['2024-01-03', '2024-01-04']
+    writer.close()
+    reader.close()
+
+
+def test_legacy_flag_files_are_imported_once(tmp_path):
+    flag_dir = tmp_path / 'fake' / 'TRADES' / '5M'
+    flag_dir.mkdir(parents=True)
+    # A completed flag wins over a stale corrupted flag of the same date; data files and unrelated names are ignored
+    for name in ['AAA-2024-01-02.cpl', 'AAA-2024-01-02.crp', 'AAA-2024-01-03.na', 'AAA-2024-01-04.icl', 'AAA-2024.cpl', 'AAA-2024-01-02.csv', 'notes.cpl']:
+        (flag_dir / name).touch()
+    (tmp_path / 'fake' / 'AAA-2024-01-05.cpl').touch()
+    store = StatusStore(tmp_path)
+    assert store.get_dates(*SERIES) == {'2024-01-02': 'completed', '2024-01-03': 'not_available', '2024-01-04': 'incomplete', '2024': 'completed'}
+    store.close()
+    (flag_dir / 'AAA-2024-01-06.cpl').touch()
+    reopened = StatusStore(tmp_path)
+    assert reopened.get(*SERIES, '2024-01-06') is None
+    reopened.close()
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from src.download_scheduler import DownloadUnit
+from src.work_queue import WorkQueue
+
+
+def make_units(ticker: str, days: int) -> list[DownloadUnit]:
+    return [DownloadUnit('fake', ticker, '5M', [f"2024-01-{day:02d}"]) for day in range(2, 2 + days)]
+
+
+def test_shard_is_leased_to_one_worker(tmp_path):
+    async def scenario():
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'), lease_seconds=60)
+        await queue.enqueue(make_units('AAA', 3) + make_units('BBB', 2), time.time())
+        first = await queue.claim_shard('w1')
+        second = await queue.claim_shard('w2')
+        assert {unit.ticker for _, unit in first} == {'AAA'} and len(first) == 3
+        assert {unit.ticker for _, unit in second} == {'BBB'} and len(second) == 2
+        assert await queue.claim_shard('w3') == []
+        queue.close()
+    asyncio.run(scenario())
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    async def scenario():
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'), lease_seconds=0.2)
+        await queue.enqueue(make_units('AAA', 2), time.time())
+        claimed = await queue.claim_shard('w1')
+        assert await queue.claim_shard('w2') == []
+        await asyncio.sleep(0.3)
+        reclaimed = await queue.claim_shard('w2')
+        assert [unit_id for unit_id, _ in reclaimed] == [unit_id for unit_id, _ in claimed]
+        assert await queue.get_counts() == {'leased': 2}
+        queue.close()
+    asyncio.run(scenario())
+
+
+def test_heartbeat_keeps_lease(tmp_path):
+    async def scenario():
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'), lease_seconds=0.3)
+        await queue.enqueue(make_units('AAA', 1), time.time())
+        await queue.claim_shard('w1')
+        for _ in range(3):
+            await asyncio.sleep(0.15)
+            await queue.heartbeat('w1')
+        assert await queue.claim_shard('w2') == []
+        queue.close()
+    asyncio.run(scenario())
+
+
+def test_done_units_are_requeued_only_by_newer_plans(tmp_path):
+    async def scenario():
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'), lease_seconds=60)
+        planned_at = time.time()
+        await queue.enqueue(make_units('AAA', 2), planned_at)
+        claimed = await queue.claim_shard('w1')
+        await queue.complete([unit_id for unit_id, _ in claimed])
+        # A plan from a status snapshot taken before the units finished must not queue them again
+        await queue.enqueue(make_units('AAA', 2), planned_at)
+        assert await queue.get_counts() == {'done': 2}
+        await queue.enqueue(make_units('AAA', 2), time.time() + 1)
+        assert await queue.get_counts() == {'queued': 2}
+        queue.close()
+    asyncio.run(scenario())
+
+
+def test_release_returns_units_to_queue(tmp_path):
+    async def scenario():
+        queue = WorkQueue(str(tmp_path / 'queue.sqlite'), lease_seconds=60)
+        await queue.enqueue(make_units('AAA', 2), time.time())
+        await queue.claim_shard('w1')
+        await queue.release('w1')
+        assert len(await queue.claim_shard('w2')) == 2
+        queue.close()
+    asyncio.run(scenario())